@@ -0,0 +1,52 @@
+import asyncio
+import multiprocessing
+import socket
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+BODY = b"\x89PNG" + b"\x00" * 4096
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    head = b"HTTP/1.1 200 OK\r\nContent-Type: image/png\r\nContent-Length: %d\r\n\r\n" % len(BODY)
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            while (await reader.readline()) not in (b"\r\n", b""):
+                pass
+            writer.write(head if request_line.startswith(b"HEAD ") else head + BODY)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def serve(sock: socket.socket) -> None:
+    async def main() -> None:
+        server = await asyncio.start_server(handle, sock=sock)
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+@contextmanager
+def stand_in_server() -> Iterator[str]:
+    """
+    Run a minimal keep-alive HTTP server in another process, returning its URL. Every request
+    gets the same small image, so only the cost of the client is measured.
+    """
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(128)
+    process = multiprocessing.get_context("fork").Process(target=serve, args=(sock,), daemon=True)
+    process.start()
+    host, port = sock.getsockname()
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        process.terminate()
+        process.join()
+        sock.close()
@@ -0,0 +1,18 @@
+import timeit
+from typing import Callable
+
+
+def bench(
+    name: str,
+    func: Callable[[], object],
+    number: int = 100_000,
+    repeat: int = 5,
+    items: int = 1,
+) -> float:
+    """
+    Time a function, printing and returning the best time in seconds per item. Functions which
+    process a batch should pass the batch size as `items`.
+    """
+    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number / items
+    print(f"{name:<48} {best * 1e9:>10.0f} ns/item")  # noqa:T201
+    return best
@@ -0,0 +1,39 @@
+"""
+Generating URLs for a large batch of sources with the same options.
+
+    python -m benchmarks.bulk
+"""
+
+from pyimgproxy import ImgProxy
+
+from ._utils import bench
+
+BATCH_SIZE = 10_000
+
+
+def main() -> None:
+    imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 64, salt="2" * 64)
+    source_urls = [f"https://example.org/images/{i}.jpg" for i in range(BATCH_SIZE)]
+    options = imgproxy.image("").resize("fill", 320, 240).format("webp").options
+
+    def image_urls() -> None:
+        for source_url in source_urls:
+            imgproxy.image(source_url).resize("fill", 320, 240).format("webp").url
+
+    def template_urls() -> None:
+        template = imgproxy.template(options)
+        for source_url in source_urls:
+            template(source_url)
+
+    def bulk_urls() -> None:
+        for _url in imgproxy.urls_for(source_urls, options):
+            pass
+
+    before = bench("Image.url", image_urls, number=5, items=BATCH_SIZE)
+    bench("URLTemplate", template_urls, number=5, items=BATCH_SIZE)
+    after = bench("ImgProxy.urls_for", bulk_urls, number=5, items=BATCH_SIZE)
+    print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Building option chains of increasing length, which should cost the same per option regardless of
+the length of the chain.
+
+    python -m benchmarks.chain
+"""
+
+from pyimgproxy import ImgProxy
+
+from ._utils import bench
+
+
+def main() -> None:
+    imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 64, salt="2" * 64)
+    image = imgproxy.image("https://example.org/images/product.jpg")
+
+    for length in (5, 20, 100):
+
+        def build_chain(length: int = length) -> None:
+            chain = image
+            for i in range(length):
+                chain = chain.quality(i)
+
+        bench(f"chain of {length} options", build_chain, number=2_000, items=length)
+
+    deep = image
+    for i in range(100):
+        deep = deep.quality(i)
+    bench("options of a chain of 100 options", lambda: deep.options, number=2_000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Fetching a batch of images from a local stand-in server, with a new connection for every request
+and with the pooled keep-alive connections of AsyncImgProxyClient.
+
+    python -m benchmarks.client
+"""
+
+import asyncio
+import urllib.request
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.client import AsyncImgProxyClient
+
+from ._server import stand_in_server
+from ._utils import bench
+
+BATCH_SIZE = 500
+
+
+def main() -> None:
+    with stand_in_server() as url:
+        imgproxy = ImgProxy(url=url, key="1" * 64, salt="2" * 64)
+        images = [
+            imgproxy.image(f"https://example.org/images/{i}.jpg").resize("fill", 320, 240)
+            for i in range(BATCH_SIZE)
+        ]
+
+        def urlopen_per_image() -> None:
+            for image in images:
+                with urllib.request.urlopen(image.url) as response:  # noqa:S310
+                    response.read()
+
+        def async_client() -> None:
+            async def fetch() -> None:
+                async with AsyncImgProxyClient(imgproxy, max_connections=10) as client:
+                    async for _image, _response in client.fetch_many(images):
+                        pass
+
+            asyncio.run(fetch())
+
+        before = bench("urlopen per image", urlopen_per_image, number=1, items=BATCH_SIZE)
+        after = bench("AsyncImgProxyClient.fetch_many", async_client, number=1, items=BATCH_SIZE)
+        print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
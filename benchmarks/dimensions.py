@@ -0,0 +1,43 @@
+"""
+Calculating output sizes for a large batch of sources, one at a time and with NumPy.
+
+    python -m benchmarks.dimensions
+"""
+
+import numpy as np
+
+from pyimgproxy.batch_dimensions import output_sizes
+from pyimgproxy.dimensions import output_size
+
+from ._utils import bench
+
+SCALAR_BATCH_SIZE = 100_000
+BATCH_SIZE = 5_000_000
+
+
+def main() -> None:
+    rng = np.random.default_rng(1)
+    widths = rng.integers(100, 8000, BATCH_SIZE)
+    heights = rng.integers(100, 8000, BATCH_SIZE)
+    options = ["resize:fill-down:640:480", "dpr:2", "min-width:320"]
+
+    scalar_widths = widths[:SCALAR_BATCH_SIZE].tolist()
+    scalar_heights = heights[:SCALAR_BATCH_SIZE].tolist()
+
+    def scalar() -> None:
+        for width, height in zip(scalar_widths, scalar_heights):
+            output_size(width, height, options)
+
+    before = bench("output_size", scalar, number=1, repeat=3, items=SCALAR_BATCH_SIZE)
+    after = bench(
+        "output_sizes",
+        lambda: output_sizes(widths, heights, options),
+        number=1,
+        repeat=3,
+        items=BATCH_SIZE,
+    )
+    print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
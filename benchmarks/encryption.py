@@ -0,0 +1,52 @@
+"""
+Generating URLs with plain, base64 and encrypted source URLs.
+
+    python -m benchmarks.encryption
+"""
+
+from typing import Callable
+
+from pyimgproxy import ImgProxy
+
+from ._utils import bench
+
+OPTIONS = ["resize:fill:320:240"]
+
+
+def make_template(
+    encrypt_source_urls: bool = False,
+    deterministic_iv: bool = False,
+    encryption_cache_size: int = 0,
+) -> Callable[[str], str]:
+    imgproxy = ImgProxy(
+        url="https://example.org/thumbnail",
+        key="1" * 64,
+        salt="2" * 64,
+        encryption_key="3" * 64,
+        encrypt_source_urls=encrypt_source_urls,
+        deterministic_iv=deterministic_iv,
+        encryption_cache_size=encryption_cache_size,
+    )
+    return imgproxy.template(OPTIONS)
+
+
+def main() -> None:
+    plain_url = "https://example.org/images/product.jpg"
+    base64_url = "https://example.org/images/product.jpg?version=2"
+
+    template = make_template()
+    bench("plain", lambda: template(plain_url))
+    bench("base64", lambda: template(base64_url))
+
+    random_iv = make_template(encrypt_source_urls=True)
+    bench("encrypted, random IV", lambda: random_iv(plain_url))
+
+    deterministic_iv = make_template(encrypt_source_urls=True, deterministic_iv=True)
+    bench("encrypted, deterministic IV", lambda: deterministic_iv(plain_url))
+
+    cached = make_template(encrypt_source_urls=True, encryption_cache_size=1024)
+    bench("encrypted, cached source URL", lambda: cached(plain_url))
+
+
+if __name__ == "__main__":
+    main()
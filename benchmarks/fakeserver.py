@@ -0,0 +1,85 @@
+"""
+Throughput of the fetch and prewarm paths against the fake imgproxy server running in another
+process, with a simulated processing latency of 10ms per image.
+
+    python -m benchmarks.fakeserver
+"""
+
+import asyncio
+import multiprocessing
+import multiprocessing.connection
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.client import AsyncImgProxyClient
+from pyimgproxy.fakeserver import FakeImgProxyServer
+from pyimgproxy.prewarm import Prewarmer
+
+from ._utils import bench
+
+BATCH_SIZE = 500
+LATENCY = 0.01
+
+
+def serve(connection: multiprocessing.connection.Connection) -> None:
+    async def main() -> None:
+        server = FakeImgProxyServer(
+            ImgProxy(url="http://imgproxy", key="1" * 64, salt="2" * 64), latency=LATENCY
+        )
+        await server.start()
+        connection.send(server.url)
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def main() -> None:
+    parent_connection, child_connection = multiprocessing.Pipe()
+    process = multiprocessing.get_context("fork").Process(
+        target=serve, args=(child_connection,), daemon=True
+    )
+    process.start()
+    try:
+        imgproxy = ImgProxy(url=parent_connection.recv(), key="1" * 64, salt="2" * 64)
+        images = [
+            imgproxy.image(f"https://example.org/images/{i}.jpg").resize("fill", 320, 240)
+            for i in range(BATCH_SIZE)
+        ]
+
+        for max_connections in (1, 10, 50):
+
+            def async_fetch_many() -> None:
+                async def fetch() -> None:
+                    async with AsyncImgProxyClient(
+                        imgproxy, max_connections=max_connections
+                    ) as client:
+                        async for _image, _response in client.fetch_many(images):
+                            pass
+
+                asyncio.run(fetch())
+
+            def fetch_many() -> None:
+                for _image, _response in imgproxy.fetch_many(images, max_workers=max_connections):
+                    pass
+
+            def prewarm() -> None:
+                Prewarmer(imgproxy, max_connections=max_connections).run(images)
+
+            for name, func in [
+                ("AsyncImgProxyClient.fetch_many", async_fetch_many),
+                ("ImgProxy.fetch_many", fetch_many),
+                ("Prewarmer.run", prewarm),
+            ]:
+                bench(
+                    f"{name} ({max_connections} connections)",
+                    func,
+                    number=1,
+                    repeat=1 if max_connections == 1 else 3,
+                    items=BATCH_SIZE,
+                )
+    finally:
+        process.terminate()
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Fetching a batch of images from a local stand-in server with a thread pool, with a new
+connection for every request and with the shared keep-alive connections of ImgProxy.fetch_many.
+
+    python -m benchmarks.fetch_many
+"""
+
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.image import Image
+
+from ._server import stand_in_server
+from ._utils import bench
+
+BATCH_SIZE = 500
+MAX_WORKERS = 10
+
+
+def main() -> None:
+    with stand_in_server() as url:
+        imgproxy = ImgProxy(url=url, key="1" * 64, salt="2" * 64)
+        images = [
+            imgproxy.image(f"https://example.org/images/{i}.jpg").resize("fill", 320, 240)
+            for i in range(BATCH_SIZE)
+        ]
+
+        def urlopen(image: Image) -> bytes:
+            with urllib.request.urlopen(image.url) as response:  # noqa:S310
+                return response.read()
+
+        def urlopen_thread_pool() -> None:
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                for _body in executor.map(urlopen, images):
+                    pass
+
+        def fetch_many() -> None:
+            for _image, _response in imgproxy.fetch_many(images, max_workers=MAX_WORKERS):
+                pass
+
+        before = bench("urlopen in a thread pool", urlopen_thread_pool, number=1, items=BATCH_SIZE)
+        after = bench("ImgProxy.fetch_many", fetch_many, number=1, items=BATCH_SIZE)
+        print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
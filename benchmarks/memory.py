@@ -0,0 +1,48 @@
+"""
+Memory used by each Image, measured with tracemalloc.
+
+    python -m benchmarks.memory
+"""
+
+import tracemalloc
+from typing import Callable
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.image import Image
+
+COUNT = 100_000
+
+
+def measure(name: str, make_image: Callable[[], Image]) -> float:
+    tracemalloc.start()
+    try:
+        start, _peak = tracemalloc.get_traced_memory()
+        images = [make_image() for _ in range(COUNT)]
+        end, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    bytes_per_image = (end - start) / len(images)
+    print(f"{name:<48} {bytes_per_image:>10.0f} bytes/image")  # noqa:T201
+    return bytes_per_image
+
+
+def main() -> None:
+    imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 64, salt="2" * 64)
+    image = imgproxy.image("https://example.org/images/product.jpg")
+    resized = image.resize("fill", 320, 240)
+
+    measure("Image", lambda: image.source_url("https://example.org/images/product.jpg"))
+    measure("Image with a shared option chain", lambda: resized.source_url(resized._source_url))
+    measure("Image with one new option", lambda: resized.format("webp"))
+
+    def image_with_url() -> Image:
+        new_image = resized.format("webp")
+        new_image.url
+        return new_image
+
+    measure("Image with one new option and its URL", image_with_url)
+
+
+if __name__ == "__main__":
+    main()
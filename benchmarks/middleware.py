@@ -0,0 +1,27 @@
+"""
+Signature checks in the middleware for a popular image, with and without the cache of verified
+paths.
+
+    python -m benchmarks.middleware
+"""
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.middleware import SignatureVerifier
+
+from ._utils import bench
+
+
+def main() -> None:
+    imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 64, salt="2" * 64)
+    url = imgproxy.image("https://example.org/images/product.jpg").resize("fill", 320, 240).url
+    path = url.removeprefix("https://example.org").encode()
+    uncached = SignatureVerifier(imgproxy, cache_size=0)
+    cached = SignatureVerifier(imgproxy)
+
+    before = bench("SignatureVerifier.status (no cache)", lambda: uncached.status(path))
+    after = bench("SignatureVerifier.status (cached)", lambda: cached.status(path))
+    print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Generating URLs for a very large batch of sources in one process and across a process pool.
+
+    python -m benchmarks.parallel
+"""
+
+import os
+from collections import deque
+
+from pyimgproxy import ImgProxy
+
+from ._utils import bench
+
+BATCH_SIZE = 500_000
+
+
+def main() -> None:
+    imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 64, salt="2" * 64)
+    source_urls = [f"https://example.org/images/{i}.jpg" for i in range(BATCH_SIZE)]
+    options = imgproxy.image("").resize("fill", 320, 240).format("webp").options
+
+    def single_process() -> None:
+        deque(imgproxy.urls_for(source_urls, options), maxlen=0)
+
+    before = bench("urls_for", single_process, number=1, repeat=3, items=BATCH_SIZE)
+    after = before
+
+    for chunk_size in (1_000, 10_000):
+
+        def process_pool(chunk_size: int = chunk_size) -> None:
+            urls = imgproxy.parallel_urls_for(source_urls, options, chunk_size=chunk_size)
+            deque(urls, maxlen=0)
+
+        after = bench(
+            f"parallel_urls_for ({os.cpu_count()} CPUs, chunks of {chunk_size})",
+            process_pool,
+            number=1,
+            repeat=3,
+            items=BATCH_SIZE,
+        )
+
+    print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Parsing and verifying a large batch of imgproxy URLs, such as lines from an access log.
+
+    python -m benchmarks.parser
+"""
+
+import base64
+import hashlib
+import hmac
+import re
+
+from pyimgproxy import ImgProxy
+
+from ._utils import bench
+
+BATCH_SIZE = 10_000
+
+
+def main() -> None:
+    imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 64, salt="2" * 64)
+    urls = [
+        imgproxy.image(source_url).resize("fill", 320, 240).format("webp").url
+        for source_url in (
+            [f"https://example.org/images/{i}.jpg" for i in range(BATCH_SIZE // 2)]
+            + [f"https://example.org/images/{i}.jpg?v=1" for i in range(BATCH_SIZE // 2)]
+        )
+    ]
+    url_regex = re.compile(r"^https://example\.org/thumbnail/([^/]+)((?:/[^/]+:[^/]*)*)/(.+)$")
+
+    def naive_parse() -> None:
+        for url in urls:
+            match = url_regex.match(url)
+            assert match is not None  # noqa:S101
+            signature, options_path, source = match.groups()
+            path = f"{options_path}/{source}".encode()
+            digest = hmac.new(
+                key=imgproxy.key, msg=imgproxy.salt + path, digestmod=hashlib.sha256
+            ).digest()
+            expected = base64.urlsafe_b64encode(digest).rstrip(b"=")
+            assert hmac.compare_digest(expected, signature.encode())  # noqa:S101
+            if source.startswith("plain/"):
+                source_url = source[6:]
+            else:
+                source_url = base64.urlsafe_b64decode(source + "=" * (-len(source) % 4)).decode()
+            imgproxy.image(source_url).options = options_path[1:].split("/")
+
+    def parse() -> None:
+        parser = imgproxy.parser()
+        for url in urls:
+            parser.parse(url)
+
+    def parse_no_verify() -> None:
+        parser = imgproxy.parser(verify=False)
+        for url in urls:
+            parser.parse(url)
+
+    before = bench("regex and hmac.new per URL", naive_parse, number=5, items=BATCH_SIZE)
+    after = bench("URLParser.parse", parse, number=5, items=BATCH_SIZE)
+    bench("URLParser.parse (verify=False)", parse_no_verify, number=5, items=BATCH_SIZE)
+    print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
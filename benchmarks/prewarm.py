@@ -0,0 +1,36 @@
+"""
+Prewarming a batch of images against a local stand-in server, reporting throughput and latency
+percentiles.
+
+    python -m benchmarks.prewarm
+"""
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.prewarm import Prewarmer
+
+from ._server import stand_in_server
+
+BATCH_SIZE = 2000
+
+
+def main() -> None:
+    with stand_in_server() as url:
+        imgproxy = ImgProxy(url=url, key="1" * 64, salt="2" * 64)
+        images = [
+            imgproxy.image(f"https://example.org/images/{i}.jpg").resize("fill", 320, 240)
+            for i in range(BATCH_SIZE)
+        ]
+
+        for max_connections in (1, 10, 50):
+            report = Prewarmer(imgproxy, max_connections=max_connections).run(images)
+            print(  # noqa:T201
+                f"max_connections={max_connections:<3} "
+                f"{report.throughput:>8.0f} req/s  "
+                f"p50 {report.latency_p50 * 1e3:.2f}ms  "
+                f"p90 {report.latency_p90 * 1e3:.2f}ms  "
+                f"p99 {report.latency_p99 * 1e3:.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Rendering thumbnails of a set of large JPEGs locally, with and without draft mode decoding, and
+across a process pool.
+
+    python -m benchmarks.render
+"""
+
+import os
+import tempfile
+from collections import deque
+
+from PIL import Image as PILImage
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.render import LocalRenderer
+
+from ._utils import bench
+
+FIXTURES = 24
+FIXTURE_SIZE = (2400, 1600)
+
+
+def create_fixtures(root: str) -> list[str]:
+    names = []
+    for i in range(FIXTURES):
+        # Noise over a gradient, so the JPEGs are as slow to decode as photos
+        noise = PILImage.effect_noise(FIXTURE_SIZE, 40 + i)
+        gradient = PILImage.linear_gradient("L").resize(FIXTURE_SIZE)
+        photo = PILImage.merge(
+            "RGB", (noise, gradient, gradient.transpose(PILImage.Transpose.FLIP_LEFT_RIGHT))
+        )
+        name = f"{i}.jpg"
+        photo.save(os.path.join(root, name), quality=90)
+        names.append(name)
+    return names
+
+
+def main() -> None:
+    imgproxy = ImgProxy(url="https://example.org/thumbnail")
+
+    with tempfile.TemporaryDirectory() as root:
+        names = create_fixtures(root)
+        images = [
+            imgproxy.image(f"local:///{name}").resize("fill", 320, 240).format("webp")
+            for name in names
+        ]
+
+        def render_all(renderer: LocalRenderer) -> None:
+            for image in images:
+                renderer.render(image)
+
+        before = bench(
+            "render (full decode)",
+            lambda: render_all(LocalRenderer(root, draft=False)),
+            number=1,
+            repeat=3,
+            items=len(images),
+        )
+        draft = bench(
+            "render (draft decode)",
+            lambda: render_all(LocalRenderer(root)),
+            number=1,
+            repeat=3,
+            items=len(images),
+        )
+        after = bench(
+            f"render_many ({os.cpu_count()} CPUs)",
+            lambda: deque(LocalRenderer(root).render_many(images), maxlen=0),
+            number=1,
+            repeat=3,
+            items=len(images),
+        )
+
+    print(f"draft speedup: {before / draft:.2f}x")  # noqa:T201
+    print(f"process pool speedup: {draft / after:.2f}x")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
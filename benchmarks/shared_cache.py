@@ -0,0 +1,61 @@
+"""
+Getting the URL of an image built again for each request from a warm SharedURLCache, compared
+with signing the URL and with a warm cache for each process.
+
+    python -m benchmarks.shared_cache
+"""
+
+import os
+import tempfile
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.cache import SharedURLCache
+
+from ._utils import bench
+
+IMAGES = 1000
+
+
+def main() -> None:
+    settings = {"url": "https://example.org/thumbnail", "key": "1" * 64, "salt": "2" * 64}
+    source_urls = [f"https://example.org/images/{i}.jpg" for i in range(IMAGES)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        shared_cache = SharedURLCache(os.path.join(temp_dir, "urls.cache"), slots=IMAGES * 4)
+        uncached = ImgProxy(**settings)
+        per_process = ImgProxy(**settings, url_cache_size=IMAGES)  # type: ignore[arg-type]
+        shared = ImgProxy(**settings, url_cache=shared_cache)  # type: ignore[arg-type]
+
+        def render(imgproxy: ImgProxy) -> None:
+            for source_url in source_urls:
+                imgproxy.image(source_url).resize("fill", 320, 240).url
+
+        # Fill both caches, so every lookup below is a hit
+        render(per_process)
+        render(shared)
+
+        def images() -> None:
+            for source_url in source_urls:
+                uncached.image(source_url).resize("fill", 320, 240)
+
+        options_path = uncached.options_path(uncached.image("").resize("fill", 320, 240).options)
+        paths = [options_path + uncached.source_path(source_url) for source_url in source_urls]
+
+        def sign() -> None:
+            for path in paths:
+                uncached.sign(path)
+
+        bench("creating the image only", images, number=100, items=IMAGES)
+        bench("signing the path only", sign, number=100, items=IMAGES)
+        before = bench("uncached", lambda: render(uncached), number=100, items=IMAGES)
+        after = bench("shared cache hit", lambda: render(shared), number=100, items=IMAGES)
+        bench("per process cache hit", lambda: render(per_process), number=100, items=IMAGES)
+        print(f"speedup of a shared cache hit: {before / after:.2f}x")  # noqa:T201
+
+        info = shared_cache.info()
+        print(f"hits: {info.hits}, misses: {info.misses}, evictions: {info.evictions}")  # noqa:T201
+        shared_cache.close()
+
+
+if __name__ == "__main__":
+    main()
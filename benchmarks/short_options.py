@@ -0,0 +1,41 @@
+"""
+URL length and URL generation time with full and abbreviated option names.
+
+    python -m benchmarks.short_options
+"""
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.image import Image
+
+from ._utils import bench
+
+
+def build(imgproxy: ImgProxy) -> Image:
+    return (
+        imgproxy.image("https://example.org/images/product.jpg")
+        .resizing_type("fill")
+        .width(320)
+        .height(240)
+        .gravity("sm")
+        .quality(80)
+        .format("webp")
+        .strip_metadata(True)
+        .sharpen(0.5)
+    )
+
+
+def main() -> None:
+    for short_options in (False, True):
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 64,
+            salt="2" * 64,
+            short_options=short_options,
+        )
+        name = "short" if short_options else "full"
+        print(f"{name} option names: {len(build(imgproxy).url)} characters")  # noqa:T201
+        bench(f"{name} option names", lambda: build(imgproxy).url)
+
+
+if __name__ == "__main__":
+    main()
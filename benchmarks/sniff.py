@@ -0,0 +1,72 @@
+"""
+Reading the sizes of a corpus of image files from their headers, compared with opening and
+decoding each image with Pillow.
+
+    python -m benchmarks.sniff
+"""
+
+import os
+import tempfile
+
+from PIL import Image as PILImage, features
+
+from pyimgproxy.sniff import sniff_file
+
+from ._utils import bench
+
+FIXTURE_SIZE = (2400, 1600)
+FORMATS = ["JPEG", "PNG", "GIF", "WEBP", "TIFF"]
+if features.check("avif"):
+    FORMATS.append("AVIF")
+
+
+def create_fixtures(root: str) -> list[str]:
+    noise = PILImage.effect_noise(FIXTURE_SIZE, 40)
+    gradient = PILImage.linear_gradient("L").resize(FIXTURE_SIZE)
+    photo = PILImage.merge(
+        "RGB", (noise, gradient, gradient.transpose(PILImage.Transpose.FLIP_LEFT_RIGHT))
+    )
+    exif = photo.getexif()
+    exif[0x0112] = 6
+
+    paths = []
+    for pil_format in FORMATS:
+        path = os.path.join(root, f"photo.{pil_format.lower()}")
+        options = {"exif": exif} if pil_format in ("JPEG", "WEBP", "TIFF") else {}
+        photo.save(path, format=pil_format, **options)
+        paths.append(path)
+    return paths
+
+
+def decode(path: str) -> tuple[int, int]:
+    with PILImage.open(path) as img:
+        img.load()
+        return img.size
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as root:
+        paths = create_fixtures(root)
+
+        before = bench(
+            "Pillow open and decode",
+            lambda: [decode(path) for path in paths],
+            number=1,
+            repeat=3,
+            items=len(paths),
+        )
+        after = bench(
+            "sniff_file",
+            lambda: [sniff_file(path) for path in paths],
+            number=1000,
+            items=len(paths),
+        )
+        for path in paths:
+            name = os.path.basename(path)
+            bench(f"sniff_file ({name})", lambda path=path: sniff_file(path), number=10_000)
+
+    print(f"speedup: {before / after:.1f}x")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
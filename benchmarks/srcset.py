@@ -0,0 +1,60 @@
+"""
+Generating responsive image sets of 6 widths and 2 formats for each source URL.
+
+    python -m benchmarks.srcset
+"""
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.image import Image
+
+from ._utils import bench
+
+WIDTHS = (320, 480, 640, 960, 1280, 1920)
+FORMATS = ("webp", "avif")
+VARIANTS = len(WIDTHS) * len(FORMATS)
+
+
+def srcset(image: Image) -> list[str]:
+    return [image.width(width).format(extension).url for width in WIDTHS for extension in FORMATS]
+
+
+def unshared_srcset(image: Image) -> list[str]:
+    # Starting each variant from a new source means every variant encodes the source URL again
+    return [
+        image.source_url(image._source_url).width(width).format(extension).url
+        for width in WIDTHS
+        for extension in FORMATS
+    ]
+
+
+def main() -> None:
+    source_url = "https://example.org/images/product.jpg?version=2"
+    imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 64, salt="2" * 64)
+    cached = ImgProxy(
+        url="https://example.org/thumbnail", key="1" * 64, salt="2" * 64, source_cache_size=1024
+    )
+
+    before = bench(
+        "source encoded per variant",
+        lambda: unshared_srcset(imgproxy.image(source_url)),
+        number=10_000,
+        items=VARIANTS,
+    )
+    after = bench(
+        "source encoded once per srcset",
+        lambda: srcset(imgproxy.image(source_url)),
+        number=10_000,
+        items=VARIANTS,
+    )
+    print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+    bench(
+        "source encoded per variant, source cache",
+        lambda: unshared_srcset(cached.image(source_url)),
+        number=10_000,
+        items=VARIANTS,
+    )
+
+
+if __name__ == "__main__":
+    main()
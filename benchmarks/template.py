@@ -0,0 +1,29 @@
+"""
+Generating URLs for many sources with the same options, with Image.url and with a template.
+
+    python -m benchmarks.template
+"""
+
+from pyimgproxy import ImgProxy
+
+from ._utils import bench
+
+
+def main() -> None:
+    imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 64, salt="2" * 64)
+    source_url = "https://example.org/images/product.jpg"
+    template = imgproxy.image(source_url).resize("fill", 320, 240).format("webp").compile()
+
+    def image_url() -> str:
+        return imgproxy.image(source_url).resize("fill", 320, 240).format("webp").url
+
+    def template_url() -> str:
+        return template(source_url)
+
+    before = bench("Image.url", image_url)
+    after = bench("URLTemplate", template_url)
+    print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Getting the URL of an image built again for each request, with and without the URL cache.
+
+    python -m benchmarks.url_cache
+"""
+
+from pyimgproxy import ImgProxy
+
+from ._utils import bench
+
+
+def main() -> None:
+    settings = {"url": "https://example.org/thumbnail", "key": "1" * 64, "salt": "2" * 64}
+    imgproxy = ImgProxy(**settings)
+    cached = ImgProxy(**settings, url_cache_size=1024)  # type: ignore[arg-type]
+
+    for name, source_url in [
+        ("short", "hero.jpg"),
+        ("long", "https://example.org/images/2024/spring-collection/hero-banner-large.jpg"),
+    ]:
+        before = bench(f"{name} URL, uncached", lambda: imgproxy.image(source_url).width(640).url)
+        after = bench(f"{name} URL, cached", lambda: cached.image(source_url).width(640).url)
+        print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+    info = cached.url_cache.info()  # type: ignore[union-attr]
+    print(f"hits: {info.hits}, misses: {info.misses}, evictions: {info.evictions}")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Rendering the same images after a restart, signing every URL again and loading URLs from a
+URLStore written before the restart. Then a hit once the URLs are loaded, compared with signing
+the same paths.
+
+    python -m benchmarks.url_store
+"""
+
+import os
+import tempfile
+import time
+from typing import Optional
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.store import URLStore
+
+from ._utils import bench
+
+IMAGES = 100_000
+HOT_IMAGES = 1000
+
+
+def render(url_cache: Optional[URLStore], encrypt_source_urls: bool) -> float:
+    imgproxy = ImgProxy(
+        url="https://example.org/thumbnail",
+        key="1" * 64,
+        salt="2" * 64,
+        encryption_key="3" * 64,
+        encrypt_source_urls=encrypt_source_urls,
+        # URLs encrypted with a random IV are never cached
+        deterministic_iv=True,
+        url_cache=url_cache,
+    )
+    start = time.perf_counter()
+    for i in range(IMAGES):
+        imgproxy.image(f"https://example.org/images/{i}.jpg").resize("fill", 320, 240).url
+    return (time.perf_counter() - start) / IMAGES
+
+
+def report(name: str, seconds: float) -> None:
+    print(f"{name:<48} {seconds * 1e9:>10.0f} ns/item")  # noqa:T201
+
+
+def main() -> None:
+    for encrypt_source_urls in (False, True):
+        suffix = ", encrypted" if encrypt_source_urls else ""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "urls.sqlite3")
+
+            before = render(url_cache=None, encrypt_source_urls=encrypt_source_urls)
+            report(f"cold start, no store{suffix}", before)
+
+            store = URLStore(path)
+            report(
+                f"cold start, filling the store{suffix}",
+                render(url_cache=store, encrypt_source_urls=encrypt_source_urls),
+            )
+            store.close()
+
+            # A new store after a restart, loading URLs from the database
+            store = URLStore(path)
+            after = render(url_cache=store, encrypt_source_urls=encrypt_source_urls)
+            store.close()
+            report(f"warm start, from the store{suffix}", after)
+            print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = URLStore(os.path.join(temp_dir, "urls.sqlite3"))
+        bench_hits(store)
+        store.close()
+
+
+def bench_hits(store: URLStore) -> None:
+    settings = {"url": "https://example.org/thumbnail", "key": "1" * 64, "salt": "2" * 64}
+    uncached = ImgProxy(**settings)
+    cached = ImgProxy(**settings, url_cache=store)  # type: ignore[arg-type]
+    source_urls = [f"https://example.org/images/{i}.jpg" for i in range(HOT_IMAGES)]
+
+    def render(imgproxy: ImgProxy) -> None:
+        for source_url in source_urls:
+            imgproxy.image(source_url).resize("fill", 320, 240).url
+
+    # Fill the store, so every lookup below is a hit
+    render(cached)
+
+    def images() -> None:
+        for source_url in source_urls:
+            uncached.image(source_url).resize("fill", 320, 240)
+
+    options_path = uncached.options_path(uncached.image("").resize("fill", 320, 240).options)
+    paths = [options_path + uncached.source_path(source_url) for source_url in source_urls]
+
+    def sign() -> None:
+        for path in paths:
+            uncached.sign(path)
+
+    images_time = bench("creating the image only", images, number=100, items=HOT_IMAGES)
+    sign_time = bench("signing the path only", sign, number=100, items=HOT_IMAGES)
+    bench("uncached", lambda: render(uncached), number=100, items=HOT_IMAGES)
+    hit_time = bench("store hit", lambda: render(cached), number=100, items=HOT_IMAGES)
+    print(f"a hit costs {(hit_time - images_time) / sign_time:.2f}x signing")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
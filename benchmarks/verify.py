@@ -0,0 +1,42 @@
+"""
+Signature verification cost with several key and salt pairs, before and after precomputing the
+salted HMAC state for each pair.
+
+    python -m benchmarks.verify
+"""
+
+import base64
+import hashlib
+import hmac
+
+from pyimgproxy import ImgProxy
+
+from ._utils import bench
+
+
+def main() -> None:
+    keys = ",".join(str(n) * 64 for n in range(1, 4))
+    salts = ",".join(str(n) * 64 for n in range(4, 7))
+    imgproxy = ImgProxy(url="https://example.org/thumbnail", key=keys, salt=salts)
+    path = b"/resize:fill:320:240/format:webp/plain/https://example.org/images/product.jpg"
+    # Signed with the last pair, so every pair is tried - the worst case during a rotation
+    oldest = ImgProxy(url="https://example.org/thumbnail", key="3" * 64, salt="6" * 64)
+    signature = oldest.sign(path)
+
+    def verify_per_url() -> bool:
+        for key, salt in imgproxy.key_pairs:
+            digest = hmac.new(key=key, msg=salt + path, digestmod=hashlib.sha256).digest()
+            if hmac.compare_digest(base64.urlsafe_b64encode(digest).rstrip(b"="), signature):
+                return True
+        return False
+
+    def verify_precomputed() -> bool:
+        return imgproxy.verify(path, signature)
+
+    before = bench("hmac.new per pair", verify_per_url)
+    after = bench("ImgProxy.verify (precomputed states)", verify_precomputed)
+    print(f"speedup: {before / after:.2f}x")  # noqa:T201
+
+
+if __name__ == "__main__":
+    main()
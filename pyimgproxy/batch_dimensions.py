@@ -0,0 +1,209 @@
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, Any, Optional
+
+from .dimensions import ORIENTATIONS, ProcessingOptions, calc_crop_size
+from .exceptions import ConfigurationError
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from numpy.typing import ArrayLike, NDArray
+
+    FloatArray = NDArray[np.float64]
+    IntArray = NDArray[np.int64]
+
+
+def scale_int(value: "FloatArray", scale: Any) -> "FloatArray":
+    """
+    Scale sizes and round them to the nearest integer, the same as dimensions.scale_int.
+    """
+    return np.where(value == 0, 0.0, np.floor(value * scale + 0.5))
+
+
+def min_non_zero(a: "FloatArray", b: "FloatArray") -> "FloatArray":
+    return np.where(a == 0, b, np.where(b == 0, a, np.minimum(a, b)))
+
+
+def calc_scale(
+    src_width: "FloatArray", src_height: "FloatArray", po: ProcessingOptions
+) -> tuple["FloatArray", "FloatArray", "FloatArray"]:
+    """
+    Return the horizontal scales, vertical scales and device pixel ratios for arrays of image
+    sizes, with exactly the same arithmetic as dimensions.calc_scale.
+    """
+    dst_width = np.full_like(src_width, po.width) if po.width else src_width
+    dst_height = np.full_like(src_height, po.height) if po.height else src_height
+    wshrink = np.where(dst_width == src_width, 1.0, src_width / dst_width)
+    hshrink = np.where(dst_height == src_height, 1.0, src_height / dst_height)
+
+    # When neither side changes both shrinks are 1, which every resizing type leaves alone - so
+    # unlike calc_scale there's no need to check for that first
+    if po.width == 0 and po.resizing_type != "force":
+        wshrink = hshrink
+    elif po.height == 0 and po.resizing_type != "force":
+        hshrink = wshrink
+    elif po.resizing_type == "fit":
+        wshrink = hshrink = np.maximum(wshrink, hshrink)
+    elif po.resizing_type in ("fill", "fill-down"):
+        wshrink = hshrink = np.minimum(wshrink, hshrink)
+    elif po.resizing_type == "auto":
+        same_orientation = (src_width - src_height >= 0) == (dst_width - dst_height >= 0)
+        wshrink = hshrink = np.where(
+            same_orientation, np.minimum(wshrink, hshrink), np.maximum(wshrink, hshrink)
+        )
+
+    wshrink = wshrink / po.zoom_width
+    hshrink = hshrink / po.zoom_height
+
+    dpr_scale = np.full_like(src_width, po.dpr)
+    if not po.enlarge:
+        min_shrink = np.minimum(wshrink, hshrink)
+        enlarged = min_shrink < 1
+        wshrink = np.where(enlarged, wshrink / min_shrink, wshrink)
+        hshrink = np.where(enlarged, hshrink / min_shrink, hshrink)
+        if not po.extend:
+            dpr_scale = np.where(enlarged, dpr_scale / min_shrink, dpr_scale)
+        dpr_scale = np.minimum(dpr_scale, np.minimum(wshrink, hshrink))
+
+    if po.min_width > 0:
+        min_shrink = src_width / po.min_width
+        too_narrow = min_shrink < wshrink
+        hshrink = np.where(too_narrow, hshrink / (wshrink / min_shrink), hshrink)
+        wshrink = np.where(too_narrow, min_shrink, wshrink)
+    if po.min_height > 0:
+        min_shrink = src_height / po.min_height
+        too_short = min_shrink < hshrink
+        wshrink = np.where(too_short, wshrink / (hshrink / min_shrink), wshrink)
+        hshrink = np.where(too_short, min_shrink, hshrink)
+
+    wshrink = np.minimum(wshrink / dpr_scale, src_width)
+    hshrink = np.minimum(hshrink / dpr_scale, src_height)
+
+    return 1 / wshrink, 1 / hshrink, dpr_scale
+
+
+def calc_crop_sizes(sizes: "FloatArray", crop: float) -> "FloatArray":
+    if 0 < crop < 1:
+        return np.maximum(1.0, scale_int(sizes, crop))
+    return np.full_like(sizes, calc_crop_size(0, crop))
+
+
+def extend_sizes(
+    width: "FloatArray",
+    height: "FloatArray",
+    extend_width: "FloatArray",
+    extend_height: "FloatArray",
+) -> tuple["FloatArray", "FloatArray"]:
+    unchanged = (extend_width <= width) & (extend_height <= height)
+    return (
+        np.where(unchanged | (extend_width == 0), width, extend_width),
+        np.where(unchanged | (extend_height == 0), height, extend_height),
+    )
+
+
+def output_sizes(
+    widths: "ArrayLike",
+    heights: "ArrayLike",
+    options: Iterable[str],
+    orientations: Optional["ArrayLike"] = None,
+) -> tuple["IntArray", "IntArray"]:
+    """
+    Return arrays of the sizes imgproxy returns for arrays of source image sizes which are all
+    processed with the same chain of options. The results are identical to calling
+    dimensions.output_size for each source, but the arithmetic is done with NumPy a whole array
+    at a time - which is much faster for millions of sources.
+
+    `orientations` is an optional array of EXIF orientations for the sources. Raises ValueError
+    for options imgproxy would reject.
+    """
+    if np is None:
+        raise ConfigurationError("Batch output sizes require NumPy, install pyimgproxy[numpy]")
+
+    po = ProcessingOptions(options)
+    width = np.asarray(widths, dtype=np.float64)
+    height = np.asarray(heights, dtype=np.float64)
+    if width.shape != height.shape:
+        raise ValueError("widths and heights must be the same shape")
+
+    # Swap the sides of sources which end up rotated by 90 or 270 degrees
+    angles = np.zeros(width.shape, dtype=np.int64)
+    if orientations is not None and po.auto_rotate:
+        lookup = np.zeros(max(ORIENTATIONS) + 1, dtype=np.int64)
+        for orientation, (angle, _) in ORIENTATIONS.items():
+            lookup[orientation] = angle
+        orientation_array = np.asarray(orientations, dtype=np.int64)
+        valid = (orientation_array >= 0) & (orientation_array < len(lookup))
+        angles = np.where(valid, lookup[np.where(valid, orientation_array, 0)], 0)
+    rotated = (angles + po.rotate) % 180 != 0
+    width, height = np.where(rotated, height, width), np.where(rotated, width, height)
+
+    crop_width = min_non_zero(calc_crop_sizes(width, po.crop_width), width)
+    crop_height = min_non_zero(calc_crop_sizes(height, po.crop_height), height)
+
+    # Intermediate values which are thrown away by np.where can divide by zero
+    with np.errstate(divide="ignore", invalid="ignore"):
+        wscale, hscale, dpr_scale = calc_scale(crop_width, crop_height, po)
+        target_width = scale_int(np.full_like(width, po.width), dpr_scale * po.zoom_width)
+        target_height = scale_int(np.full_like(height, po.height), dpr_scale * po.zoom_height)
+        scaled_width = np.maximum(1.0, scale_int(crop_width, wscale))
+        scaled_height = np.maximum(1.0, scale_int(crop_height, hscale))
+
+        result_width, result_height = target_width, target_height
+        if po.resizing_type == "fill-down" and not po.enlarge:
+            width_ratio = target_width / scaled_width
+            height_ratio = target_height / scaled_height
+            wider = (width_ratio > height_ratio) & (width_ratio > 1)
+            taller = ~wider & (height_ratio > width_ratio) & (height_ratio > 1)
+            result_width = np.where(
+                wider,
+                scaled_width,
+                np.where(
+                    taller, scale_int(scaled_height, target_width / target_height), target_width
+                ),
+            )
+            result_height = np.where(
+                wider,
+                scale_int(scaled_width, target_height / target_width),
+                np.where(taller, scaled_height, target_height),
+            )
+
+        width = min_non_zero(result_width, scaled_width)
+        height = min_non_zero(result_height, scaled_height)
+        if po.extend:
+            width, height = extend_sizes(width, height, target_width, target_height)
+
+        if po.extend_aspect_ratio:
+            out_width = min_non_zero(scaled_width, result_width)
+            out_height = min_non_zero(scaled_height, result_height)
+            width_ratio = target_width / out_width
+            height_ratio = target_height / out_height
+            has_target = (target_width > 0) & (target_height > 0)
+            taller = has_target & (height_ratio > width_ratio)
+            wider = has_target & (width_ratio > height_ratio)
+            aspect_ratio_width = np.where(
+                taller,
+                out_width,
+                np.where(wider, scale_int(out_height, target_width / target_height), 0.0),
+            )
+            aspect_ratio_height = np.where(
+                taller,
+                scale_int(out_width, target_height / target_width),
+                np.where(wider, out_height, 0.0),
+            )
+            extend = (aspect_ratio_width != 0) & (aspect_ratio_height != 0)
+            extended_width, extended_height = extend_sizes(
+                width, height, aspect_ratio_width, aspect_ratio_height
+            )
+            width = np.where(extend, extended_width, width)
+            height = np.where(extend, extended_height, height)
+
+    if po.padding is not None:
+        # np.rint rounds halves to even, the same as Python's round
+        top, right, bottom, left = (np.rint(value * dpr_scale) for value in po.padding)
+        width = width + left + right
+        height = height + top + bottom
+
+    return width.astype(np.int64), height.astype(np.int64)
@@ -0,0 +1,315 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, NamedTuple, Optional, Protocol, Union
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class CacheKey(NamedTuple):
+    """
+    The key for the URL of an image. It's flat, so it's cheap to hash however many processing
+    options the image has.
+    """
+
+    # The ImgProxy fingerprint, so URLs generated with different settings never match
+    fingerprint: bytes
+    # The source URL and processing options
+    image: bytes
+
+
+def key_digest(key: Hashable) -> bytes:
+    """
+    Return a digest of a cache key which is the same in every process, for caches which are
+    shared between processes or stored on disk.
+    """
+    if isinstance(key, CacheKey):
+        # Already bytes - the fingerprint is a fixed size, so the fields can't run into each other
+        data = key.fingerprint + key.image
+    else:
+        # repr is stable across processes for the strings, bytes and tuples used as other keys,
+        # unlike hash() which is randomised for each process
+        data = repr(key).encode()
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class URLCache(Protocol):
+    """
+    The interface for URL caches used by ImgProxy. Keys are CacheKeys, from `Image.cache_key`.
+    """
+
+    def get(self, key: Hashable) -> Optional[str]: ...
+
+    def set(self, key: Hashable, value: str) -> None: ...
+
+
+class LRUCache:
+    """
+    A thread-safe cache of URLs, which discards the least recently used URL when full.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<LRUCache {len(self._data)}/{self.maxsize}>"
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Locks can't be pickled, and the cached URLs aren't worth copying
+        return {"maxsize": self.maxsize}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(maxsize=state["maxsize"])  # type: ignore[misc]
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def info(self) -> CacheInfo:
+        """
+        Return statistics for monitoring the cache.
+        """
+        with self._lock:
+            return CacheInfo(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                maxsize=self.maxsize,
+                currsize=len(self._data),
+            )
+
+
+class SharedURLCache:
+    """
+    A cache of URLs in a memory mapped file, which can be shared by every process on a host - such
+    as the workers of a pre-fork web server.
+
+    The file is a fixed size open addressing hash table. Each key is hashed to a slot, and up to
+    `probes` slots after it are checked. When all of them are in use, one is overwritten - so the
+    cache never grows, and older URLs are evicted as new ones are added.
+
+    There's no locking between processes. Every slot has a checksum which is written last and
+    checked on every read, so a slot which is partially written (by a crashed process, or by two
+    processes at once) is treated as a miss rather than returning a corrupt URL.
+
+    A hit is only a little faster than building a signed URL, and much slower than a hit in an
+    LRUCache. It's worth using when workers are restarted often, or are too many to each keep
+    their own cache - see benchmarks/shared_cache.py.
+    """
+
+    MAGIC = b"PYIMGPXY"
+    VERSION = 1
+    # Magic, version, slots and slot size - padded to keep slots aligned
+    FILE_HEADER = struct.Struct("<8sIII")
+    FILE_HEADER_SIZE = 64
+    # Key digest, checksum and value length
+    SLOT_HEADER = struct.Struct("<16sIH")
+    # The start of the key digest, which picks the first slot to probe
+    SLOT_INDEX = struct.Struct("<Q")
+    EMPTY_DIGEST = bytes(16)
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        slots: int = 65536,
+        slot_size: int = 256,
+        probes: int = 8,
+    ) -> None:
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        if slot_size <= self.SLOT_HEADER.size:
+            msg = f"slot_size must be greater than {self.SLOT_HEADER.size}"
+            raise ValueError(msg)
+
+        self.path = os.fspath(path)
+        self.slots = slots
+        self.slot_size = slot_size
+        self.probes = min(probes, slots)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._mmap = self._open()
+
+    def __repr__(self) -> str:
+        return f"<SharedURLCache {self.path}>"
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {
+            "path": self.path,
+            "slots": self.slots,
+            "slot_size": self.slot_size,
+            "probes": self.probes,
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(**state)  # type: ignore[misc]
+
+    def _open(self) -> mmap.mmap:
+        file_header = self.FILE_HEADER.pack(self.MAGIC, self.VERSION, self.slots, self.slot_size)
+        size = self.FILE_HEADER_SIZE + self.slots * self.slot_size
+
+        if not os.path.exists(self.path):
+            # Create the file under a temporary name then link it into place, so another process
+            # can never open a file which hasn't been initialised yet
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".pyimgproxy-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(file_header)
+                    f.truncate(size)
+                try:
+                    os.link(temp_path, self.path)
+                except FileExistsError:
+                    # Another process got there first, use their file
+                    pass
+            finally:
+                os.unlink(temp_path)
+
+        with open(self.path, "r+b") as f:
+            header_matches = f.read(self.FILE_HEADER.size) == file_header
+            if not header_matches or os.fstat(f.fileno()).st_size != size:
+                msg = f"{self.path} isn't a SharedURLCache with the same dimensions"
+                raise ValueError(msg)
+            return mmap.mmap(f.fileno(), size)
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def _digest(self, key: Hashable) -> bytes:
+        digest = key_digest(key)
+        if digest == self.EMPTY_DIGEST:  # pragma: no cover
+            digest = b"\x01" + digest[1:]
+        return digest
+
+    def _offset(self, digest: bytes, probe: int) -> int:
+        index: int = (self.SLOT_INDEX.unpack_from(digest)[0] + probe) % self.slots
+        return self.FILE_HEADER_SIZE + index * self.slot_size
+
+    def _read(self, offset: int, digest: bytes) -> Optional[bytes]:
+        """
+        Return the value of a slot, or None if its checksum doesn't match.
+        """
+        _digest, checksum, length = self.SLOT_HEADER.unpack_from(self._mmap, offset)
+        if length > self.slot_size - self.SLOT_HEADER.size:
+            return None
+        value_offset = offset + self.SLOT_HEADER.size
+        value = self._mmap[value_offset : value_offset + length]
+        if zlib.crc32(value, zlib.crc32(digest)) != checksum:
+            return None
+        return value
+
+    def get(self, key: Hashable) -> Optional[str]:
+        # This is the hot path, so each slot is copied out of the file once and checked in place
+        # rather than going through _offset and _read
+        digest = self._digest(key)
+        index: int = self.SLOT_INDEX.unpack_from(digest)[0]
+        slot_size = self.slot_size
+        header_size = self.SLOT_HEADER.size
+        for probe in range(self.probes):
+            offset = self.FILE_HEADER_SIZE + (index + probe) % self.slots * slot_size
+            slot = self._mmap[offset : offset + slot_size]
+            slot_digest, checksum, length = self.SLOT_HEADER.unpack_from(slot)
+            if slot_digest == digest:
+                value = slot[header_size : header_size + length]
+                if zlib.crc32(value, zlib.crc32(digest)) == checksum:
+                    self.hits += 1
+                    return value.decode()
+            elif slot_digest == self.EMPTY_DIGEST:
+                break
+        self.misses += 1
+        return None
+
+    def set(self, key: Hashable, value: str) -> None:
+        encoded = value.encode()
+        if len(encoded) > self.slot_size - self.SLOT_HEADER.size:
+            # Too large to cache
+            return
+
+        digest = self._digest(key)
+        for probe in range(self.probes):
+            offset = self._offset(digest, probe)
+            slot_digest = self._mmap[offset : offset + 16]
+            if slot_digest in (digest, self.EMPTY_DIGEST):
+                break
+            if self._read(offset, slot_digest) is None:
+                # Partly written, so it's free to reuse
+                break
+        else:
+            # Every slot is in use, evict one - picked by the digest so that different keys evict
+            # different slots
+            offset = self._offset(digest, int.from_bytes(digest[8:], "little") % self.probes)
+            self.evictions += 1
+
+        checksum = zlib.crc32(encoded, zlib.crc32(digest))
+        header = self.SLOT_HEADER.pack(digest, checksum, len(encoded))
+        value_offset = offset + self.SLOT_HEADER.size
+        # Invalidate the checksum first and write it last, so a reader never sees a slot that's
+        # only been partly written as valid
+        self._mmap[offset + 16 : offset + 20] = bytes(4)
+        self._mmap[value_offset : value_offset + len(encoded)] = encoded
+        self._mmap[offset : offset + 16] = digest
+        self._mmap[offset + 16 : value_offset] = header[16:]
+
+    def clear(self) -> None:
+        self._mmap[self.FILE_HEADER_SIZE :] = bytes(self.slots * self.slot_size)
+
+    def info(self) -> CacheInfo:
+        """
+        Return statistics for monitoring the cache. Hits, misses and evictions are for this
+        process only, the current size is for every process.
+        """
+        currsize = 0
+        for index in range(self.slots):
+            offset = self.FILE_HEADER_SIZE + index * self.slot_size
+            digest = self._mmap[offset : offset + 16]
+            if digest != self.EMPTY_DIGEST and self._read(offset, digest) is not None:
+                currsize += 1
+        return CacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            maxsize=self.slots,
+            currsize=currsize,
+        )
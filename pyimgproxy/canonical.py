@@ -0,0 +1,328 @@
+from collections.abc import Iterable
+from typing import Optional
+
+from .image import SHORT_OPTION_NAMES
+
+# Option names accepted by imgproxy which are alternatives for another option
+OPTION_ALIASES = {
+    **{short_name: option_name for option_name, short_name in SHORT_OPTION_NAMES.items()},
+    "ext": "format",
+    "extend_ar": "extend_aspect_ratio",
+}
+
+# Options which only take a boolean, where any value imgproxy treats as true or false can be
+# written as 1 or 0
+BOOLEAN_OPTIONS = {
+    "auto_rotate",
+    "disable_animation",
+    "enforce_thumbnail",
+    "keep_copyright",
+    "raw",
+    "return_attachment",
+    "strip_color_profile",
+    "strip_metadata",
+}
+# Options which only take numbers, which can be written without redundant formatting
+NUMERIC_OPTIONS = {
+    "background_alpha",
+    "blur",
+    "dpr",
+    "max_animation_frame_resolution",
+    "max_animation_frames",
+    "max_src_file_size",
+    "max_src_resolution",
+    "min-height",
+    "min-width",
+    "padding",
+    "page",
+    "pages",
+    "pixelate",
+    "quality",
+    "rotate",
+    "sharpen",
+    "zoom",
+}
+TRUE_VALUES = {"1", "t", "T", "TRUE", "true", "True"}
+FALSE_VALUES = {"0", "f", "F", "FALSE", "false", "False"}
+
+# Values which imgproxy uses when an option isn't given, so the option can be dropped. Options
+# whose default comes from the imgproxy server configuration (such as strip_metadata) are never
+# dropped, as the server default isn't known here.
+DEFAULT_VALUES = {
+    "background_alpha": ("1",),
+    "blur": ("0",),
+    "disable_animation": ("0",),
+    "dpr": ("1",),
+    "gravity": ("ce",),
+    "min-height": ("0",),
+    "min-width": ("0",),
+    "padding": ("0",),
+    "page": ("0",),
+    "pages": ("1",),
+    "pixelate": ("0",),
+    "quality": ("0",),
+    "raw": ("0",),
+    "rotate": ("0",),
+    "sharpen": ("0",),
+    "zoom": ("1",),
+}
+
+# Fields set by the resizing options, in the order of the arguments to the resize option
+RESIZE_FIELDS = ("resizing_type", "width", "height", "enlarge", "extend")
+RESIZE_DEFAULTS = {"resizing_type": "fit", "width": "0", "height": "0", "enlarge": "0"}
+
+# Fields set by the adjust option, in the order of its arguments
+ADJUST_FIELDS = ("brightness", "contrast", "saturation")
+ADJUST_DEFAULTS = {"brightness": "0", "contrast": "1", "saturation": "1"}
+
+
+def normalise_number(value: str) -> str:
+    """
+    Return a number without any redundant formatting, such as `1` for `1.0` or `01`.
+    """
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    if number.is_integer():
+        return str(int(number))
+    return repr(number)
+
+
+def normalise_bool(value: str) -> str:
+    if value in TRUE_VALUES:
+        return "1"
+    if value in FALSE_VALUES:
+        return "0"
+    return value
+
+
+def trim_args(args: list[str]) -> list[str]:
+    """
+    Remove trailing empty arguments.
+    """
+    while args and args[-1] == "":
+        args.pop()
+    return args
+
+
+def merge_args(previous: list[str], args: list[str]) -> list[str]:
+    """
+    Return the arguments of an option merged with those of an earlier option with the same name.
+    imgproxy only sets the fields given by each option, so arguments which are missing or empty
+    keep their earlier values.
+    """
+    merged = previous + [""] * (len(args) - len(previous))
+    for index, arg in enumerate(args):
+        if arg:
+            merged[index] = arg
+    return merged
+
+
+def merge_gravity(previous: list[str], args: list[str]) -> list[str]:
+    """
+    Return gravity arguments merged with earlier ones. Offsets which aren't given are kept, except
+    for smart gravity which has none.
+    """
+    merged = merge_args(previous, args)
+    if merged[:1] == ["sm"]:
+        return merged[:1]
+    return merged
+
+
+def padding_sides(args: list[str], sides: tuple[str, str, str, str]) -> tuple[str, str, str, str]:
+    """
+    Return the top, right, bottom and left padding set by the arguments of a padding option,
+    starting from `sides`. As with CSS the first argument sets every side and the second sets the
+    left as well as the right, and sides which aren't given keep their earlier values.
+    """
+    top, right, bottom, left = sides
+    args = [normalise_number(arg) for arg in args] + ["", "", "", ""]
+    if args[0]:
+        top = right = bottom = left = args[0]
+    if args[1]:
+        right = left = args[1]
+    if args[2]:
+        bottom = args[2]
+    if args[3]:
+        left = args[3]
+    return top, right, bottom, left
+
+
+def padding_args(sides: tuple[str, str, str, str]) -> list[str]:
+    """
+    Return the shortest padding arguments for the top, right, bottom and left padding.
+    """
+    args = list(sides)
+    if args[3] == args[1]:
+        args.pop()
+        if args[2] == args[0]:
+            args.pop()
+            if args[1] == args[0]:
+                args.pop()
+    return args
+
+
+class Canonicaliser:
+    """
+    Collects the state set by a chain of processing options, in the same way imgproxy applies
+    them - later options override earlier ones, and meta-options set several fields at once.
+    """
+
+    def __init__(self) -> None:
+        self.options: dict[str, list[str]] = {}
+        self.resize: dict[str, str] = {}
+        self.extend: Optional[list[str]] = None
+        self.adjust: dict[str, str] = {}
+
+    def add(self, option: str) -> None:
+        option_name, *args = option.split(":")
+        option_name = OPTION_ALIASES.get(option_name, option_name)
+
+        if option_name == "resize":
+            self.set_resize("resizing_type", args[0:1])
+            self.add_size(args[1:])
+        elif option_name == "size":
+            self.add_size(args)
+        elif option_name in ("resizing_type", "width", "height", "enlarge"):
+            self.set_resize(option_name, args[0:1])
+        elif option_name == "extend":
+            self.set_extend(args)
+        elif option_name == "adjust":
+            for field, value in zip(ADJUST_FIELDS, args):
+                if value:
+                    self.adjust[field] = normalise_number(value)
+        elif option_name in ADJUST_FIELDS:
+            if args and args[0]:
+                self.adjust[option_name] = normalise_number(args[0])
+        elif option_name == "padding":
+            sides = padding_sides(self.options.get("padding", []), ("0", "0", "0", "0"))
+            self.options[option_name] = padding_args(padding_sides(args, sides))
+        elif option_name == "gravity":
+            self.options[option_name] = merge_gravity(self.options.get(option_name, []), args)
+        elif option_name == "crop":
+            previous = self.options.get(option_name, [])
+            self.options[option_name] = [
+                *merge_args(previous[:2], args[:2]),
+                *merge_gravity(previous[2:], args[2:]),
+            ]
+        elif option_name == "extend_aspect_ratio":
+            previous = self.options.get(option_name, [])
+            self.options[option_name] = [
+                *merge_args(previous[:1], args[:1]),
+                *merge_gravity(previous[1:], args[1:]),
+            ]
+        elif option_name == "trim":
+            self.options[option_name] = merge_args(self.options.get(option_name, []), args)
+        else:
+            self.options[option_name] = args
+
+    def add_size(self, args: list[str]) -> None:
+        self.set_resize("width", args[0:1])
+        self.set_resize("height", args[1:2])
+        self.set_resize("enlarge", args[2:3])
+        if len(args) > 3 and args[3]:
+            self.set_extend(args[3:])
+
+    def set_resize(self, field: str, args: list[str]) -> None:
+        if not args or not args[0]:
+            return
+        value = args[0]
+        if field in ("width", "height"):
+            value = normalise_number(value)
+        elif field == "enlarge":
+            value = normalise_bool(value)
+        self.resize[field] = value
+
+    def set_extend(self, args: list[str]) -> None:
+        if not args:
+            return
+        # The gravity is kept from any earlier extend option if it isn't given
+        previous = self.extend or ["0"]
+        enabled = normalise_bool(args[0]) if args[0] else previous[0]
+        self.extend = [enabled, *merge_gravity(previous[1:], args[1:])]
+
+    def resize_option(self) -> Optional[str]:
+        values = {
+            field: value
+            for field, value in self.resize.items()
+            if value != RESIZE_DEFAULTS.get(field)
+        }
+        if self.extend is not None and self.extend[0] != "0":
+            values["extend"] = ":".join(trim_args(list(self.extend)))
+        if not values:
+            return None
+
+        args = [values.get(field, "") for field in RESIZE_FIELDS]
+        if "resizing_type" in values:
+            return ":".join(["resize", *trim_args(args)])
+        return ":".join(["size", *trim_args(args[1:])])
+
+    def adjust_option(self) -> Optional[str]:
+        args = []
+        for field in ADJUST_FIELDS:
+            value = self.adjust.get(field, "")
+            args.append("" if value == ADJUST_DEFAULTS[field] else value)
+        if not trim_args(args):
+            return None
+        return ":".join(["adjust", *args])
+
+    def canonical_options(self) -> list[str]:
+        options = []
+        for option_name, args in self.options.items():
+            if option_name in BOOLEAN_OPTIONS:
+                args = [normalise_bool(arg) for arg in args]
+            elif option_name in NUMERIC_OPTIONS:
+                args = [normalise_number(arg) for arg in args]
+
+            if option_name == "gravity" and args and args[0] != "fp":
+                # Offsets of 0 are the same as omitting them
+                args = [args[0], *(normalise_number(arg) for arg in args[1:])]
+                while len(args) > 1 and args[-1] in ("0", ""):
+                    args.pop()
+            elif option_name == "zoom" and len(args) == 2 and args[0] == args[1]:
+                # A single zoom factor is used for both dimensions
+                args.pop()
+
+            if tuple(args) == DEFAULT_VALUES.get(option_name):
+                continue
+            options.append(":".join([option_name, *args]))
+
+        for option in (self.resize_option(), self.adjust_option()):
+            if option is not None:
+                options.append(option)
+
+        return sorted(options)
+
+
+def canonicalise(options: Iterable[str], short_options: bool = False) -> list[str]:
+    """
+    Return the canonical form of a chain of processing options, so that chains which give the
+    same result give the same URL - which improves the cache hit ratio of a CDN in front of
+    imgproxy.
+
+    Options overridden by later options are removed, width, height, resizing type, enlarge and
+    extend are combined into a single `resize` or `size` option, options set to their default
+    values are removed, and options are sorted by name.
+    """
+    options = list(options)
+
+    # Presets expand into other options where they appear in the chain, and several presets can
+    # be combined - so a chain using them can't be safely reordered
+    option_names = {option.partition(":")[0] for option in options}
+    if option_names & {"preset", "pr"}:
+        return options
+
+    canonicaliser = Canonicaliser()
+    for option in options:
+        canonicaliser.add(option)
+
+    canonical_options = canonicaliser.canonical_options()
+    if short_options:
+        canonical_options = [shorten_option(option) for option in canonical_options]
+    return canonical_options
+
+
+def shorten_option(option: str) -> str:
+    option_name, separator, args = option.partition(":")
+    return SHORT_OPTION_NAMES.get(option_name, option_name) + separator + args
@@ -0,0 +1,632 @@
+import asyncio
+import http.client
+import os
+import socket
+import ssl
+import threading
+from collections.abc import AsyncIterator, Iterable, Iterator, Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import cache
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Callable,
+    Generic,
+    NamedTuple,
+    Optional,
+    Protocol,
+    TypeVar,
+    Union,
+)
+from urllib.parse import urlsplit
+
+from .exceptions import FetchError, FetchTimeoutError
+
+if TYPE_CHECKING:
+    from .image import Image
+    from .imgproxy import ImgProxy
+
+# Bodies are read and written in chunks of this size, so large images are never held in memory
+# when streaming them to a file
+CHUNK_SIZE = 64 * 1024
+
+USER_AGENT = "pyimgproxy"
+
+# A file object or file descriptor to stream a response body to
+Output = Union[int, IO[bytes]]
+
+# The host part of a URL, connections are pooled for each one
+Origin = tuple[str, str, int]
+
+
+class Response(NamedTuple):
+    url: str
+    status: int
+    headers: dict[str, str]
+    # Empty when the body was streamed to a file
+    body: bytes
+    # The size of the body in bytes, even when it was streamed to a file
+    size: int
+
+
+def write_output(output: Output, data: bytes) -> None:
+    if isinstance(output, int):
+        while data:
+            data = data[os.write(output, data) :]
+    else:
+        output.write(data)
+
+
+def request_target(url: str) -> tuple[Origin, str]:
+    """
+    Return the origin (scheme, host and port) and request target for a URL.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        msg = f"Unsupported URL: {url!r}"
+        raise FetchError(msg)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    target = parts.path or "/"
+    if parts.query:
+        target = f"{target}?{parts.query}"
+    return (parts.scheme, parts.hostname, port), target
+
+
+def host_header(origin: Origin) -> str:
+    """
+    Return the Host header for an origin, which only includes the port if it isn't the default.
+    """
+    scheme, host, port = origin
+    # urlsplit removes the brackets around IPv6 addresses, which the header needs
+    if ":" in host:
+        host = f"[{host}]"
+    if port == (443 if scheme == "https" else 80):
+        return host
+    return f"{host}:{port}"
+
+
+@cache
+def default_ssl_context() -> ssl.SSLContext:
+    """
+    Return the SSL context for https connections by clients which weren't given one. Loading the
+    default CA certificates is slow, so it's only done for the first https connection, and the
+    context is shared by every client.
+    """
+    return ssl.create_default_context()
+
+
+class FetchFuture(Protocol):
+    """
+    The parts of asyncio and concurrent.futures futures used by PendingFetches.
+    """
+
+    def result(self) -> Response: ...
+
+    def exception(self) -> Optional[BaseException]: ...
+
+    def cancel(self) -> bool: ...
+
+
+F = TypeVar("F", bound=FetchFuture)
+
+
+class PendingFetches(Generic[F]):
+    """
+    Schedules the fetches for `fetch_many`, shared by both clients - which only differ in how a
+    fetch is submitted and how they wait for one to complete.
+
+    Images are only taken from the iterable as fetches complete, so at most `limit` fetches are
+    ever pending.
+    """
+
+    def __init__(
+        self, images: Iterable["Image"], limit: int, submit: Callable[["Image"], F]
+    ) -> None:
+        self.futures: dict[F, Image] = {}
+        self._images = iter(images)
+        self._submit = submit
+        while len(self.futures) < limit and self._submit_next():
+            pass
+
+    def _submit_next(self) -> bool:
+        for image in self._images:
+            self.futures[self._submit(image)] = image
+            return True
+        return False
+
+    def complete(
+        self, future: F, return_exceptions: bool
+    ) -> tuple["Image", Union[Response, Exception]]:
+        """
+        Return the image and response for a completed fetch, submitting the next image in its
+        place. With `return_exceptions`, the exception for a failed fetch is returned rather than
+        raised.
+        """
+        image = self.futures.pop(future)
+        self._submit_next()
+        exception = future.exception()
+        if exception is None:
+            return image, future.result()
+        if return_exceptions and isinstance(exception, Exception):
+            return image, exception
+        raise exception
+
+    def cancel(self) -> None:
+        for future in self.futures:
+            future.cancel()
+
+
+Connection = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncImgProxyClient:
+    """
+    Fetches processed images from imgproxy with asyncio, over a pool of keep-alive HTTP/1.1
+    connections.
+
+    At most `max_connections` requests are made at once, each with its own `timeout` in seconds.
+    Idle connections are kept open to be reused by later requests, until the client is closed -
+    use the client as an async context manager to make sure that happens.
+    """
+
+    def __init__(
+        self,
+        imgproxy: "ImgProxy",
+        max_connections: int = 10,
+        timeout: Optional[float] = 30.0,
+        headers: Optional[Mapping[str, str]] = None,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ) -> None:
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+
+        self.imgproxy = imgproxy
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.ssl_context = ssl_context
+
+        self._idle: dict[Origin, list[Connection]] = {}
+        # Created on first use, as it must belong to the running event loop on Python 3.9
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def __repr__(self) -> str:
+        return f"<AsyncImgProxyClient {self.imgproxy.url}>"
+
+    async def __aenter__(self) -> "AsyncImgProxyClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close every idle connection.
+        """
+        idle = [connection for connections in self._idle.values() for connection in connections]
+        self._idle.clear()
+        for _reader, writer in idle:
+            writer.close()
+        for _reader, writer in idle:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def fetch(
+        self, image: "Image", method: str = "GET", output: Optional[Output] = None
+    ) -> Response:
+        """
+        Fetch an image, returning the response. The body is streamed to `output` (a file object
+        or file descriptor) if given, rather than being held in memory.
+
+        Raises FetchTimeoutError if the request takes longer than the timeout, or FetchError if
+        the connection fails. Error responses from imgproxy are returned as normal.
+        """
+        return await self.fetch_url(image.url, method=method, output=output)
+
+    async def fetch_url(
+        self, url: str, method: str = "GET", output: Optional[Output] = None
+    ) -> Response:
+        """
+        Fetch a URL, as with `fetch`.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+
+        async with self._semaphore:
+            try:
+                return await asyncio.wait_for(
+                    self._request(url, method=method, output=output), timeout=self.timeout
+                )
+            except asyncio.TimeoutError as e:
+                msg = f"Timed out fetching {url}"
+                raise FetchTimeoutError(msg) from e
+
+    async def fetch_many(
+        self,
+        images: Iterable["Image"],
+        method: str = "GET",
+        return_exceptions: bool = False,
+    ) -> AsyncIterator[tuple["Image", Union[Response, Exception]]]:
+        """
+        Fetch many images concurrently, yielding each image and its response as they complete.
+
+        Images are taken from the iterable as requests finish, so only a few more than
+        `max_connections` requests are ever pending. With `return_exceptions`, a failed request
+        yields its exception rather than raising it.
+        """
+        pending = PendingFetches(
+            images,
+            limit=self.max_connections * 2,
+            submit=lambda image: asyncio.ensure_future(self.fetch(image, method=method)),
+        )
+        try:
+            while pending.futures:
+                done, _ = await asyncio.wait(pending.futures, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield pending.complete(future, return_exceptions=return_exceptions)
+        finally:
+            pending.cancel()
+
+    async def _connect(self, origin: Origin) -> tuple[Connection, bool]:
+        """
+        Return an idle connection to the origin if there is one, or a new connection - and
+        whether the connection is being reused.
+        """
+        idle = self._idle.get(origin)
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return (reader, writer), True
+            writer.close()
+
+        scheme, host, port = origin
+        context = None
+        if scheme == "https":
+            context = self.ssl_context or default_ssl_context()
+        try:
+            connection = await asyncio.open_connection(host, port, ssl=context)
+        except OSError as e:
+            msg = f"Unable to connect to {host}:{port}: {e}"
+            raise FetchError(msg) from e
+        return connection, False
+
+    def _release(self, origin: Origin, connection: Connection) -> None:
+        idle = self._idle.setdefault(origin, [])
+        if len(idle) < self.max_connections:
+            idle.append(connection)
+        else:
+            connection[1].close()
+
+    async def _request(self, url: str, method: str, output: Optional[Output]) -> Response:
+        origin, target = request_target(url)
+        headers = {
+            "Host": host_header(origin),
+            "User-Agent": USER_AGENT,
+            "Accept": "*/*",
+            "Connection": "keep-alive",
+            **self.headers,
+        }
+        request = f"{method} {target} HTTP/1.1\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in headers.items()
+        )
+        request_bytes = f"{request}\r\n".encode("latin-1")
+
+        while True:
+            (reader, writer), reused = await self._connect(origin)
+            try:
+                try:
+                    writer.write(request_bytes)
+                    await writer.drain()
+                    head = await self._read_head(reader, url=url)
+                except (OSError, ValueError, asyncio.LimitOverrunError) as e:
+                    # StreamReader raises ValueError for lines longer than its limit
+                    msg = f"Error fetching {url}: {e!r}"
+                    raise FetchError(msg) from e
+                if head is None:
+                    # An idle connection may have been closed by the server just as it was
+                    # reused, which is only noticed once the request is sent - so try again
+                    if reused:
+                        writer.close()
+                        continue
+                    msg = f"Connection closed fetching {url}"
+                    raise FetchError(msg)
+
+                status, headers, keep_alive = head
+                try:
+                    body, size, body_keep_alive = await self._read_body(
+                        reader, method=method, status=status, headers=headers, output=output
+                    )
+                except (
+                    OSError,
+                    ValueError,
+                    asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError,
+                ) as e:
+                    msg = f"Error fetching {url}: {e!r}"
+                    raise FetchError(msg) from e
+            except BaseException:
+                # Includes cancellation by the timeout, the connection is in an unknown state
+                writer.close()
+                raise
+
+            if keep_alive and body_keep_alive:
+                self._release(origin, (reader, writer))
+            else:
+                writer.close()
+            return Response(url=url, status=status, headers=headers, body=body, size=size)
+
+    async def _read_head(
+        self, reader: asyncio.StreamReader, url: str
+    ) -> Optional[tuple[int, dict[str, str], bool]]:
+        """
+        Return the status, headers and whether the connection can be kept alive - or None if the
+        connection was closed before a response.
+        """
+        status_line = await reader.readline()
+        if not status_line:
+            return None
+        version, _, status_reason = status_line.decode("latin-1").rstrip("\r\n").partition(" ")
+        try:
+            status = int(status_reason[:3])
+        except ValueError:
+            msg = f"Invalid HTTP status line fetching {url}: {status_line!r}"
+            raise FetchError(msg) from None
+
+        headers: dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        return status, headers, keep_alive
+
+    async def _read_body(
+        self,
+        reader: asyncio.StreamReader,
+        method: str,
+        status: int,
+        headers: dict[str, str],
+        output: Optional[Output],
+    ) -> tuple[bytes, int, bool]:
+        """
+        Return the body (unless it's streamed to the output), its size and whether the
+        connection can still be kept alive.
+        """
+        keep_alive = True
+        chunks: list[bytes] = []
+        size = 0
+
+        def receive(data: bytes) -> None:
+            nonlocal size
+            size += len(data)
+            if output is None:
+                chunks.append(data)
+            else:
+                write_output(output, data)
+
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            pass
+        elif "chunked" in headers.get("transfer-encoding", "").lower():
+            while True:
+                size_line = await reader.readline()
+                try:
+                    chunk_size = int(size_line.split(b";", 1)[0], 16)
+                except ValueError:
+                    msg = f"Invalid chunk size: {size_line!r}"
+                    raise FetchError(msg) from None
+                if chunk_size == 0:
+                    break
+                while chunk_size:
+                    data = await reader.readexactly(min(chunk_size, CHUNK_SIZE))
+                    chunk_size -= len(data)
+                    receive(data)
+                await reader.readline()
+            # Skip any trailers
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+        elif "content-length" in headers:
+            try:
+                remaining = int(headers["content-length"])
+            except ValueError:
+                remaining = -1
+            if remaining < 0:
+                msg = f"Invalid Content-Length: {headers['content-length']!r}"
+                raise FetchError(msg)
+            while remaining:
+                data = await reader.readexactly(min(remaining, CHUNK_SIZE))
+                remaining -= len(data)
+                receive(data)
+        else:
+            # The body ends when the connection is closed
+            keep_alive = False
+            while data := await reader.read(CHUNK_SIZE):
+                receive(data)
+
+        return b"".join(chunks), size, keep_alive
+
+
+class ImgProxyClient:
+    """
+    Fetches processed images from imgproxy, over a pool of keep-alive HTTP/1.1 connections which
+    can be shared by many threads.
+
+    At most `max_connections` requests are made at once, each with a socket `timeout` in seconds.
+    Idle connections are kept open to be reused by later requests, until the client is closed -
+    use the client as a context manager to make sure that happens.
+    """
+
+    def __init__(
+        self,
+        imgproxy: "ImgProxy",
+        max_connections: int = 10,
+        timeout: Optional[float] = 30.0,
+        headers: Optional[Mapping[str, str]] = None,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ) -> None:
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+
+        self.imgproxy = imgproxy
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.headers = {"User-Agent": USER_AGENT, "Accept": "*/*", **(headers or {})}
+        self.ssl_context = ssl_context
+
+        self._idle: dict[Origin, list[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_connections)
+
+    def __repr__(self) -> str:
+        return f"<ImgProxyClient {self.imgproxy.url}>"
+
+    def __enter__(self) -> "ImgProxyClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close every idle connection.
+        """
+        with self._lock:
+            idle = [
+                connection for connections in self._idle.values() for connection in connections
+            ]
+            self._idle.clear()
+        for connection in idle:
+            connection.close()
+
+    def fetch(
+        self, image: "Image", method: str = "GET", output: Optional[Output] = None
+    ) -> Response:
+        """
+        Fetch an image, returning the response. The body is streamed to `output` (a file object
+        or file descriptor) if given, rather than being held in memory.
+
+        Raises FetchTimeoutError if the connection times out, or FetchError if it fails. Error
+        responses from imgproxy are returned as normal.
+        """
+        return self.fetch_url(image.url, method=method, output=output)
+
+    def fetch_url(
+        self, url: str, method: str = "GET", output: Optional[Output] = None
+    ) -> Response:
+        """
+        Fetch a URL, as with `fetch`.
+        """
+        origin, target = request_target(url)
+
+        with self._semaphore:
+            while True:
+                connection, reused = self._connect(origin)
+                try:
+                    connection.request(method, target, headers=self.headers)
+                    response = connection.getresponse()
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                    connection.close()
+                    # An idle connection may have been closed by the server just as it was
+                    # reused, which is only noticed once the request is sent - so try again
+                    if reused:
+                        continue
+                    msg = f"Connection closed fetching {url}"
+                    raise FetchError(msg) from None
+                except socket.timeout as e:
+                    connection.close()
+                    msg = f"Timed out fetching {url}"
+                    raise FetchTimeoutError(msg) from e
+                except (OSError, http.client.HTTPException) as e:
+                    connection.close()
+                    msg = f"Error fetching {url}: {e!r}"
+                    raise FetchError(msg) from e
+                break
+
+            try:
+                chunks: list[bytes] = []
+                size = 0
+                while data := response.read(CHUNK_SIZE):
+                    size += len(data)
+                    if output is None:
+                        chunks.append(data)
+                    else:
+                        write_output(output, data)
+            except socket.timeout as e:
+                connection.close()
+                msg = f"Timed out fetching {url}"
+                raise FetchTimeoutError(msg) from e
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                msg = f"Error fetching {url}: {e!r}"
+                raise FetchError(msg) from e
+
+        # http.client closes the connection itself if the server doesn't keep it alive, and
+        # reconnects on the next request
+        self._release(origin, connection)
+        return Response(
+            url=url,
+            status=response.status,
+            headers={name.lower(): value for name, value in response.getheaders()},
+            body=b"".join(chunks),
+            size=size,
+        )
+
+    def fetch_many(
+        self,
+        images: Iterable["Image"],
+        max_workers: Optional[int] = None,
+        method: str = "GET",
+        return_exceptions: bool = False,
+    ) -> Iterator[tuple["Image", Union[Response, Exception]]]:
+        """
+        Fetch many images with a pool of threads, yielding each image and its response as they
+        complete.
+
+        Images are only taken from the iterable as results are consumed, so at most twice
+        `max_workers` responses are held in memory however slow the consumer is. With
+        `return_exceptions`, a failed request yields its exception rather than raising it.
+        """
+        max_workers = max_workers or self.max_connections
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = PendingFetches(
+                images,
+                limit=max_workers * 2,
+                submit=lambda image: executor.submit(self.fetch, image, method=method),
+            )
+            try:
+                while pending.futures:
+                    done, _ = wait(pending.futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield pending.complete(future, return_exceptions=return_exceptions)
+            finally:
+                pending.cancel()
+
+    def _connect(self, origin: Origin) -> tuple[http.client.HTTPConnection, bool]:
+        """
+        Return an idle connection to the origin if there is one, or a new connection - and
+        whether the connection is being reused.
+        """
+        with self._lock:
+            idle = self._idle.get(origin)
+            if idle:
+                return idle.pop(), True
+
+        scheme, host, port = origin
+        if scheme == "https":
+            return http.client.HTTPSConnection(
+                host, port, timeout=self.timeout, context=self.ssl_context or default_ssl_context()
+            ), False
+        return http.client.HTTPConnection(host, port, timeout=self.timeout), False
+
+    def _release(self, origin: Origin, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(origin, [])
+            if len(idle) < self.max_connections:
+                idle.append(connection)
+                return
+        connection.close()
@@ -0,0 +1,441 @@
+import math
+from collections.abc import Iterable, Sequence
+from typing import NamedTuple, Optional
+
+from .canonical import FALSE_VALUES, Canonicaliser
+
+# The clockwise rotation, and whether the image is then mirrored, for each EXIF orientation
+ORIENTATIONS = {
+    1: (0, False),
+    2: (0, True),
+    3: (180, False),
+    4: (180, True),
+    5: (90, True),
+    6: (90, False),
+    7: (270, True),
+    8: (270, False),
+}
+
+# Pillow format names for each format imgproxy can return
+FORMATS = {
+    "jpg": "JPEG",
+    "png": "PNG",
+    "webp": "WEBP",
+    "avif": "AVIF",
+    "gif": "GIF",
+    "ico": "ICO",
+    "bmp": "BMP",
+    "tiff": "TIFF",
+}
+FORMAT_ALIASES = {"jpeg": "jpg", "tif": "tiff"}
+
+RESIZING_TYPES = {"fit", "fill", "fill-down", "force", "auto"}
+GRAVITY_TYPES = {"no", "so", "ea", "we", "noea", "nowe", "soea", "sowe", "ce", "sm", "fp"}
+
+
+class Gravity(NamedTuple):
+    type: str
+    x: float
+    y: float
+
+
+CENTER = Gravity("ce", 0.0, 0.0)
+
+
+def scale_int(value: int, scale: float) -> int:
+    """
+    Scale a size and round it to the nearest integer, in the same way as imgproxy.
+    """
+    if value == 0:
+        return 0
+    return math.floor(value * scale + 0.5)
+
+
+def min_non_zero(a: int, b: int) -> int:
+    if a == 0:
+        return b
+    if b == 0:
+        return a
+    return min(a, b)
+
+
+def parse_color(args: Sequence[str]) -> Optional[tuple[int, int, int]]:
+    if len(args) == 1 and args[0]:
+        value = args[0].lstrip("#")
+        if len(value) != 6:
+            msg = f"Invalid color: {args[0]}"
+            raise ValueError(msg)
+        return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+    if len(args) >= 3:
+        red, green, blue = (int(arg) for arg in args[:3])
+        return red, green, blue
+    return None
+
+
+def parse_gravity(args: Sequence[str], default: Gravity = CENTER) -> Gravity:
+    if not args or not args[0]:
+        return default
+    gravity_type = args[0]
+    if gravity_type not in GRAVITY_TYPES:
+        msg = f"Invalid gravity: {gravity_type}"
+        raise ValueError(msg)
+    if gravity_type == "fp":
+        # Focus point gravity needs both coordinates, as in imgproxy
+        if len(args) != 3:
+            msg = f"Invalid gravity arguments: {':'.join(args)}"
+            raise ValueError(msg)
+        return Gravity("fp", float(args[1] or 0.5), float(args[2] or 0.5))
+    x = float(args[1]) if len(args) > 1 and args[1] else 0.0
+    y = float(args[2]) if len(args) > 2 and args[2] else 0.0
+    return Gravity(gravity_type, x, y)
+
+
+class ProcessingOptions:
+    """
+    The processing options which affect the size and encoding of an image, resolved from a chain
+    of options in the same way as imgproxy - later options override earlier ones.
+
+    Raises ValueError for options imgproxy would reject.
+    """
+
+    def __init__(self, options: Iterable[str]) -> None:
+        canonicaliser = Canonicaliser()
+        for option in options:
+            canonicaliser.add(option)
+        resize = canonicaliser.resize
+        values = canonicaliser.options
+
+        self.resizing_type = resize.get("resizing_type", "fit")
+        if self.resizing_type not in RESIZING_TYPES:
+            msg = f"Invalid resizing type: {self.resizing_type}"
+            raise ValueError(msg)
+        self.width = int(resize.get("width", "0"))
+        self.height = int(resize.get("height", "0"))
+        if self.width < 0 or self.height < 0:
+            raise ValueError("Width and height can't be negative")
+        self.enlarge = resize.get("enlarge", "0") == "1"
+
+        extend = canonicaliser.extend or ["0"]
+        self.extend = extend[0] == "1"
+        self.extend_gravity = parse_gravity(extend[1:])
+        extend_aspect_ratio = values.get("extend_aspect_ratio", ["0"])
+        self.extend_aspect_ratio = extend_aspect_ratio[0] not in ("", *FALSE_VALUES)
+        self.extend_aspect_ratio_gravity = parse_gravity(extend_aspect_ratio[1:])
+
+        self.min_width = int(self._number(values, "min-width", "0"))
+        self.min_height = int(self._number(values, "min-height", "0"))
+
+        zoom = values.get("zoom", [])
+        self.zoom_width = float(zoom[0]) if zoom and zoom[0] else 1.0
+        self.zoom_height = float(zoom[1]) if len(zoom) > 1 and zoom[1] else self.zoom_width
+        self.dpr = float(self._number(values, "dpr", "1"))
+        if self.zoom_width <= 0 or self.zoom_height <= 0 or self.dpr <= 0:
+            raise ValueError("Zoom and dpr must be positive")
+
+        self.gravity = parse_gravity(values.get("gravity", []))
+        crop = values.get("crop", [])
+        self.crop_width = float(crop[0]) if crop and crop[0] else 0.0
+        self.crop_height = float(crop[1]) if len(crop) > 1 and crop[1] else 0.0
+        self.crop_gravity = parse_gravity(crop[2:], default=self.gravity)
+
+        self.trim: Optional[tuple[float, Optional[tuple[int, int, int]], bool, bool]] = None
+        if values.get("trim", [""])[0]:
+            trim = [*values["trim"], "", "", ""]
+            self.trim = (
+                float(trim[0]),
+                parse_color(trim[1:2]) if trim[1] else None,
+                trim[2] not in ("", *FALSE_VALUES),
+                trim[3] not in ("", *FALSE_VALUES),
+            )
+
+        # Top, right, bottom and left, in the same way as CSS - each side is set independently,
+        # and padding is only turned off when every side is 0
+        self.padding: Optional[tuple[int, int, int, int]] = None
+        padding = [*values.get("padding", []), "", "", "", ""]
+        top = right = bottom = left = int(padding[0] or 0)
+        if padding[1]:
+            right = left = int(padding[1])
+        if padding[2]:
+            bottom = int(padding[2])
+        if padding[3]:
+            left = int(padding[3])
+        if top or right or bottom or left:
+            self.padding = (top, right, bottom, left)
+
+        self.rotate = int(self._number(values, "rotate", "0")) % 360
+        if self.rotate % 90:
+            raise ValueError("Rotation angle must be a multiple of 90")
+        self.auto_rotate = values.get("auto_rotate", ["1"])[0] not in FALSE_VALUES
+
+        self.background = parse_color(values.get("background", []))
+        self.blur = float(self._number(values, "blur", "0"))
+        self.sharpen = float(self._number(values, "sharpen", "0"))
+        self.quality = int(self._number(values, "quality", "0"))
+
+        self.format: Optional[str] = None
+        format_args = values.get("format", [])
+        if format_args and format_args[0]:
+            self.format = FORMAT_ALIASES.get(format_args[0], format_args[0])
+            if self.format not in FORMATS:
+                msg = f"Unsupported format: {self.format}"
+                raise ValueError(msg)
+
+    @staticmethod
+    def _number(values: dict[str, list[str]], option_name: str, default: str) -> str:
+        args = values.get(option_name, [])
+        return args[0] if args and args[0] else default
+
+
+def calc_scale(width: int, height: int, po: ProcessingOptions) -> tuple[float, float, float]:
+    """
+    Return the horizontal and vertical scale of an image `width` by `height`, and the device
+    pixel ratio which can be used without enlarging it. A port of imgproxy's calcScale.
+    """
+    src_width, src_height = float(width), float(height)
+    dst_width = float(po.width) if po.width else src_width
+    dst_height = float(po.height) if po.height else src_height
+    wshrink = 1.0 if dst_width == src_width else src_width / dst_width
+    hshrink = 1.0 if dst_height == src_height else src_height / dst_height
+
+    if wshrink != 1 or hshrink != 1:
+        resizing_type = po.resizing_type
+        if resizing_type == "auto":
+            same_orientation = (src_width - src_height >= 0) == (dst_width - dst_height >= 0)
+            resizing_type = "fill" if same_orientation else "fit"
+
+        if po.width == 0 and resizing_type != "force":
+            wshrink = hshrink
+        elif po.height == 0 and resizing_type != "force":
+            hshrink = wshrink
+        elif resizing_type == "fit":
+            wshrink = hshrink = max(wshrink, hshrink)
+        elif resizing_type in ("fill", "fill-down"):
+            wshrink = hshrink = min(wshrink, hshrink)
+
+    wshrink /= po.zoom_width
+    hshrink /= po.zoom_height
+
+    dpr_scale = po.dpr
+    if not po.enlarge:
+        min_shrink = min(wshrink, hshrink)
+        if min_shrink < 1:
+            wshrink /= min_shrink
+            hshrink /= min_shrink
+            if not po.extend:
+                dpr_scale /= min_shrink
+        # Any larger device pixel ratio would enlarge the image
+        dpr_scale = min(dpr_scale, wshrink, hshrink)
+
+    if po.min_width > 0:
+        min_shrink = src_width / po.min_width
+        if min_shrink < wshrink:
+            hshrink /= wshrink / min_shrink
+            wshrink = min_shrink
+    if po.min_height > 0:
+        min_shrink = src_height / po.min_height
+        if min_shrink < hshrink:
+            wshrink /= hshrink / min_shrink
+            hshrink = min_shrink
+
+    wshrink /= dpr_scale
+    hshrink /= dpr_scale
+    # Never scale an image below a single pixel
+    wshrink = min(wshrink, src_width)
+    hshrink = min(hshrink, src_height)
+
+    return 1 / wshrink, 1 / hshrink, dpr_scale
+
+
+def calc_crop_size(size: int, crop: float) -> int:
+    if crop == 0:
+        return 0
+    if crop >= 1:
+        return int(crop)
+    return max(1, scale_int(size, crop))
+
+
+def calc_position(
+    width: int, height: int, inner_width: int, inner_height: int, gravity: Gravity, dpr: float
+) -> tuple[int, int]:
+    """
+    Return the position of an area `inner_width` by `inner_height` placed in an area `width` by
+    `height` with gravity, kept within the outer area. A port of imgproxy's calcPosition.
+    """
+    if gravity.type == "fp":
+        left = scale_int(width, gravity.x) - inner_width // 2
+        top = scale_int(height, gravity.y) - inner_height // 2
+    else:
+        offset_x, offset_y = round(gravity.x * dpr), round(gravity.y * dpr)
+        # Go's integer division truncates towards zero
+        left = int((width - inner_width + 1) / 2) + offset_x
+        top = int((height - inner_height + 1) / 2) + offset_y
+        if gravity.type in ("no", "noea", "nowe"):
+            top = offset_y
+        if gravity.type in ("ea", "noea", "soea"):
+            left = width - inner_width - offset_x
+        if gravity.type in ("so", "soea", "sowe"):
+            top = height - inner_height - offset_y
+        if gravity.type in ("we", "nowe", "sowe"):
+            left = offset_x
+
+    left = max(0, min(left, width - inner_width))
+    top = max(0, min(top, height - inner_height))
+    return left, top
+
+
+def calc_result_crop(
+    po: ProcessingOptions,
+    target_width: int,
+    target_height: int,
+    scaled_width: int,
+    scaled_height: int,
+) -> tuple[int, int]:
+    """
+    Return the size the scaled image is cropped to. Without enlarge, fill-down crops a small image
+    to the aspect ratio of the target size rather than the target size itself.
+    """
+    if po.resizing_type != "fill-down" or po.enlarge:
+        return target_width, target_height
+
+    width_ratio = target_width / scaled_width
+    height_ratio = target_height / scaled_height
+    if width_ratio > height_ratio and width_ratio > 1:
+        return scaled_width, scale_int(scaled_width, target_height / target_width)
+    if height_ratio > width_ratio and height_ratio > 1:
+        return scale_int(scaled_height, target_width / target_height), scaled_height
+    return target_width, target_height
+
+
+class Geometry(NamedTuple):
+    """
+    The sizes imgproxy works out before processing an image, in the orientation of the result.
+    """
+
+    # The size of the source, once rotated
+    source_width: int
+    source_height: int
+    # The clockwise rotation from the EXIF orientation, and whether the image is then mirrored
+    # (before the rotate option is applied)
+    angle: int
+    flip: bool
+    # The area of the source which is scaled, from the crop option
+    crop_width: int
+    crop_height: int
+    width_scale: float
+    height_scale: float
+    # The device pixel ratio which can be used without enlarging the image
+    dpr_scale: float
+    # The requested size, scaled by dpr and zoom
+    target_width: int
+    target_height: int
+    scaled_width: int
+    scaled_height: int
+    # The size the scaled image is cropped to, 0 for no crop
+    result_width: int
+    result_height: int
+    # The size the image is extended to by extend_aspect_ratio, 0 for none
+    aspect_ratio_width: int
+    aspect_ratio_height: int
+
+
+def calc_geometry(
+    width: int, height: int, po: ProcessingOptions, orientation: int = 1
+) -> Geometry:
+    """
+    Return the geometry of a source image `width` by `height` with an EXIF `orientation`. A port
+    of imgproxy's prepare step.
+    """
+    angle, flip = ORIENTATIONS.get(orientation, (0, False)) if po.auto_rotate else (0, False)
+    if (angle + po.rotate) % 180:
+        width, height = height, width
+
+    crop_width = min_non_zero(calc_crop_size(width, po.crop_width), width)
+    crop_height = min_non_zero(calc_crop_size(height, po.crop_height), height)
+
+    wscale, hscale, dpr_scale = calc_scale(crop_width, crop_height, po)
+    target_width = scale_int(po.width, dpr_scale * po.zoom_width)
+    target_height = scale_int(po.height, dpr_scale * po.zoom_height)
+    # libvips never resizes an image to nothing
+    scaled_width = max(1, scale_int(crop_width, wscale))
+    scaled_height = max(1, scale_int(crop_height, hscale))
+    result_width, result_height = calc_result_crop(
+        po, target_width, target_height, scaled_width, scaled_height
+    )
+
+    aspect_ratio_width = aspect_ratio_height = 0
+    if po.extend_aspect_ratio and target_width > 0 and target_height > 0:
+        out_width = min_non_zero(scaled_width, result_width)
+        out_height = min_non_zero(scaled_height, result_height)
+        width_ratio = target_width / out_width
+        height_ratio = target_height / out_height
+        if height_ratio > width_ratio:
+            aspect_ratio_width = out_width
+            aspect_ratio_height = scale_int(out_width, target_height / target_width)
+        elif width_ratio > height_ratio:
+            aspect_ratio_width = scale_int(out_height, target_width / target_height)
+            aspect_ratio_height = out_height
+
+    return Geometry(
+        source_width=width,
+        source_height=height,
+        angle=angle,
+        flip=flip,
+        crop_width=crop_width,
+        crop_height=crop_height,
+        width_scale=wscale,
+        height_scale=hscale,
+        dpr_scale=dpr_scale,
+        target_width=target_width,
+        target_height=target_height,
+        scaled_width=scaled_width,
+        scaled_height=scaled_height,
+        result_width=result_width,
+        result_height=result_height,
+        aspect_ratio_width=aspect_ratio_width,
+        aspect_ratio_height=aspect_ratio_height,
+    )
+
+
+def extend_size(width: int, height: int, extend_width: int, extend_height: int) -> tuple[int, int]:
+    """
+    Return the size of an image `width` by `height` once extended, where an extended size of 0
+    keeps that side. A port of imgproxy's extendImage.
+    """
+    if extend_width <= width and extend_height <= height:
+        return width, height
+    return extend_width or width, extend_height or height
+
+
+def scale_padding(padding: tuple[int, int, int, int], dpr_scale: float) -> tuple[int, ...]:
+    # Go's math.RoundToEven, which is the same as Python's round
+    return tuple(round(value * dpr_scale) for value in padding)
+
+
+def output_size(
+    width: int, height: int, options: Iterable[str], orientation: int = 1
+) -> tuple[int, int]:
+    """
+    Return the size of the image imgproxy returns for a source image `width` by `height`
+    processed with a chain of options - without needing a request to imgproxy's /info endpoint.
+    `orientation` is the EXIF orientation of the source, which is applied unless auto_rotate is
+    disabled.
+
+    The trim option depends on the content of the image, so it isn't taken into account. Raises
+    ValueError for options imgproxy would reject.
+    """
+    po = ProcessingOptions(options)
+    geometry = calc_geometry(width, height, po, orientation=orientation)
+
+    width = min_non_zero(geometry.result_width, geometry.scaled_width)
+    height = min_non_zero(geometry.result_height, geometry.scaled_height)
+    if po.extend:
+        width, height = extend_size(width, height, geometry.target_width, geometry.target_height)
+    if geometry.aspect_ratio_width and geometry.aspect_ratio_height:
+        width, height = extend_size(
+            width, height, geometry.aspect_ratio_width, geometry.aspect_ratio_height
+        )
+    if po.padding is not None:
+        top, right, bottom, left = scale_padding(po.padding, geometry.dpr_scale)
+        width += left + right
+        height += top + bottom
+    return width, height
@@ -1,2 +1,26 @@
 class ConfigurationError(Exception):
     """pyimgproxy is improperly configured"""
+
+
+class InvalidURLError(ValueError):
+    """An imgproxy URL can't be parsed"""
+
+
+class InvalidSignatureError(InvalidURLError):
+    """An imgproxy URL signature doesn't match any key and salt"""
+
+
+class FetchError(Exception):
+    """An image can't be fetched from imgproxy"""
+
+
+class FetchTimeoutError(FetchError, TimeoutError):
+    """Fetching an image from imgproxy took longer than the timeout"""
+
+
+class RenderError(Exception):
+    """An image can't be rendered locally"""
+
+
+class InvalidImageError(ValueError):
+    """The size of an image can't be read from its header"""
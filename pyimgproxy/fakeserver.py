@@ -0,0 +1,349 @@
+import argparse
+import asyncio
+import hashlib
+import random
+import struct
+import threading
+import zlib
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from functools import lru_cache
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlsplit
+
+from . import dimensions
+from .exceptions import InvalidURLError
+from .middleware import SignatureVerifier
+
+if TYPE_CHECKING:
+    from .imgproxy import ImgProxy
+
+# The size of every fake source image
+SOURCE_WIDTH = 1024
+SOURCE_HEIGHT = 768
+
+# Larger images are clamped to this size, to keep responses small enough for load tests
+MAX_DIMENSION = 4096
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
+
+
+@lru_cache(maxsize=256)
+def png_image_data(width: int, height: int) -> bytes:
+    """
+    Return the IDAT chunk for a palette PNG where every pixel is the first palette colour.
+    """
+    # Each row is a filter type byte followed by the palette index of each pixel, compressed a
+    # row at a time so large images are never held in memory uncompressed
+    row = bytes(width + 1)
+    compressor = zlib.compressobj()
+    data = b"".join(compressor.compress(row) for _ in range(height)) + compressor.flush()
+    return png_chunk(b"IDAT", data)
+
+
+def synthetic_png(width: int, height: int, color: tuple[int, int, int]) -> bytes:
+    """
+    Return a PNG of a single colour.
+
+    The colour is only set by the palette, so the compressed pixels can be shared by every image
+    of the same size - generating them is far slower than the rest of a response.
+    """
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0))
+        + png_chunk(b"PLTE", bytes(color))
+        + png_image_data(width, height)
+        + png_chunk(b"IEND", b"")
+    )
+
+
+def output_size(options: Iterable[str]) -> tuple[int, int]:
+    """
+    Return the size of the image imgproxy would return for the options, from a fake source image
+    of SOURCE_WIDTH by SOURCE_HEIGHT. Raises ValueError for options imgproxy would reject.
+    """
+    width, height = dimensions.output_size(SOURCE_WIDTH, SOURCE_HEIGHT, options)
+    return min(width, MAX_DIMENSION), min(height, MAX_DIMENSION)
+
+
+def byte_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Return the first and last byte of a single `bytes=` range header for a body of `size` bytes,
+    or None if the header should be ignored. Raises ValueError if the range can't be satisfied.
+    """
+    unit, _, ranges = header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, _, last = ranges.strip().partition("-")
+    if not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+        return None
+
+    if not first:
+        # A suffix range of the last bytes of the body
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+class FakeImgProxyServer:
+    """
+    An HTTP server which behaves enough like imgproxy for load tests and offline integration
+    tests.
+
+    Signatures are verified with the key and salt pairs of `imgproxy`, and the URL is parsed back
+    into an image. The response is a PNG of a single colour (derived from the source URL), with
+    the size imgproxy would return for a SOURCE_WIDTH by SOURCE_HEIGHT source. Every response is
+    delayed by `latency` seconds plus up to `latency_jitter` seconds, and a proportion
+    `error_rate` of requests fail with a 500 error - chosen with `seed`, so a test run is
+    repeatable. Single byte range requests are supported, as for sources fetched by imgproxy.
+
+    Use `async with` in an event loop, `running()` to serve from a background thread, or run
+    standalone with `python -m pyimgproxy.fakeserver`.
+    """
+
+    def __init__(
+        self,
+        imgproxy: "ImgProxy",
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        if not 0 <= error_rate <= 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.imgproxy = imgproxy
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+
+        self.requests = 0
+        self.connections = 0
+
+        self._random = random.Random(seed)  # noqa:S311
+        self._verifier = SignatureVerifier(imgproxy)
+        self._parser = imgproxy.parser(verify=False)
+        self._prefix = urlsplit(imgproxy.url).path.rstrip("/")
+        self._server: Optional[asyncio.Server] = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    def __repr__(self) -> str:
+        return f"<FakeImgProxyServer {self.url}>"
+
+    @property
+    def url(self) -> str:
+        """
+        The URL of the server, with the path of the ImgProxy URL.
+        """
+        return f"http://{self.host}:{self.port}{self._prefix}"
+
+    async def __aenter__(self) -> "FakeImgProxyServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, host=self.host, port=self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        # Idle keep-alive connections would otherwise keep the server open
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        if self._server is None:
+            msg = "FakeImgProxyServer was closed while starting"
+            raise RuntimeError(msg)
+        await self._server.serve_forever()
+
+    @contextmanager
+    def running(self) -> Iterator[str]:
+        """
+        Run the server in a background thread, returning its URL.
+        """
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+        errors: list[OSError] = []
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.start())
+            except OSError as e:
+                errors.append(e)
+                loop.close()
+                return
+            finally:
+                started.set()
+            loop.run_forever()
+            loop.run_until_complete(self.close())
+            loop.close()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        started.wait()
+        if errors:
+            thread.join()
+            raise errors[0]
+        try:
+            yield self.url
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+
+    def response(self, path: str) -> tuple[HTTPStatus, str, bytes]:
+        """
+        Return the status, content type and body for a request.
+        """
+        if path == "/health":
+            return HTTPStatus.OK, "text/plain", b"imgproxy is running"
+
+        status = self._verifier.status(path.encode("latin-1"))
+        if status is not HTTPStatus.OK:
+            return status, "text/plain", status.phrase.encode()
+
+        try:
+            image = self._parser.parse(path.removeprefix(self._prefix))
+        except InvalidURLError:
+            return HTTPStatus.NOT_FOUND, "text/plain", b"Invalid URL"
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            status = HTTPStatus.INTERNAL_SERVER_ERROR
+            return status, "text/plain", status.phrase.encode()
+
+        try:
+            width, height = output_size(image.options)
+        except ValueError:
+            return HTTPStatus.NOT_FOUND, "text/plain", b"Invalid options"
+
+        digest = hashlib.sha256(image.source.encode()).digest()
+        body = synthetic_png(width, height, color=(digest[0], digest[1], digest[2]))
+        return HTTPStatus.OK, "image/png", body
+
+    def _partial(self, range_header: str, body: bytes) -> tuple[HTTPStatus, bytes, str]:
+        """
+        Return the status, body and extra headers of the response to a range request.
+        """
+        try:
+            requested = byte_range(range_header, len(body))
+        except ValueError:
+            status = HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+            return status, status.phrase.encode(), f"Content-Range: bytes */{len(body)}\r\n"
+        if requested is None:
+            return HTTPStatus.OK, body, ""
+        start, end = requested
+        content_range = f"Content-Range: bytes {start}-{end}/{len(body)}\r\n"
+        return HTTPStatus.PARTIAL_CONTENT, body[start : end + 1], content_range
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, _, target = request_line.decode("latin-1").partition(" ")
+                target = target.rpartition(" ")[0]
+                keep_alive = True
+                range_header = None
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    name = name.strip().lower()
+                    if name == "connection" and value.strip().lower() == "close":
+                        keep_alive = False
+                    elif name == "range":
+                        range_header = value
+
+                self.requests += 1
+                delay = self.latency + self._random.uniform(0, self.latency_jitter)
+                if delay:
+                    await asyncio.sleep(delay)
+
+                status, content_type, body = self.response(target.partition("?")[0])
+                extra_headers = ""
+                if range_header is not None and status is HTTPStatus.OK:
+                    status, body, extra_headers = self._partial(range_header, body)
+                head = (
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"{extra_headers}"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                ).encode("latin-1")
+                writer.write(head if method == "HEAD" else head + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Run a fake imgproxy server, with the key and salt from the IMGPROXY_KEY and IMGPROXY_SALT
+    environment variables.
+    """
+    from .imgproxy import ImgProxy
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--path", default="", help="path of the imgproxy URL")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="between 0 and 1")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    server = FakeImgProxyServer(
+        imgproxy=ImgProxy(url=f"http://{args.host}:{args.port}{args.path}"),
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+    async def serve() -> None:
+        await server.start()
+        print(f"Fake imgproxy server running at {server.url}")  # noqa:T201
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
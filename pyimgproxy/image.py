@@ -1,32 +1,143 @@
-import base64
-import hashlib
-import hmac
 import re
-from functools import cached_property
 from typing import TYPE_CHECKING, Any, Optional, Union, overload
 
+from .cache import CacheKey
+
 if TYPE_CHECKING:
     from .imgproxy import ImgProxy
+    from .template import URLTemplate
+
+# Options are stored as a linked list of (option, previous options) pairs, so a new Image shares
+# all of the options of the Image it was created from rather than copying them
+OptionNode = Optional[tuple[str, "OptionNode"]]
+
+# Abbreviated option names accepted by imgproxy, used when ImgProxy has short_options enabled
+SHORT_OPTION_NAMES = {
+    "resize": "rs",
+    "size": "s",
+    "resizing_type": "rt",
+    "resizing_algorithm": "ra",
+    "width": "w",
+    "height": "h",
+    "min-width": "mw",
+    "min-height": "mh",
+    "zoom": "z",
+    "enlarge": "el",
+    "extend": "ex",
+    "extend_aspect_ratio": "exar",
+    "gravity": "g",
+    "crop": "c",
+    "trim": "t",
+    "padding": "pd",
+    "auto_rotate": "ar",
+    "rotate": "rot",
+    "background": "bg",
+    "background_alpha": "bga",
+    "adjust": "a",
+    "brightness": "br",
+    "contrast": "co",
+    "saturation": "sa",
+    "blur": "bl",
+    "sharpen": "sh",
+    "pixelate": "pix",
+    "unsharp_masking": "ush",
+    "blur_detections": "bd",
+    "draw_detections": "dd",
+    "strip_metadata": "sm",
+    "keep_copyright": "kcr",
+    "strip_color_profile": "scp",
+    "enforce_thumbnail": "eth",
+    "quality": "q",
+    "format": "f",
+    "page": "pg",
+    "pages": "pgs",
+    "disable_animation": "da",
+    "cachebuster": "cb",
+    "return_attachment": "att",
+    "max_src_resolution": "msr",
+    "max_src_file_size": "msfs",
+    "max_animation_frames": "maf",
+    "max_animation_frame_resolution": "mafr",
+}
+
+
+class Source:
+    """
+    A source URL, and its encoded path once it's needed. Shared by every Image derived from the
+    same source, so variants of an image (such as a srcset) only encode the source URL once.
+    """
+
+    __slots__ = ("path", "url")
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.path: Optional[bytes] = None
 
 
 class Image:
+    # Large numbers of images can be held in memory when rendering pages, so they use slots
+    # rather than a __dict__ to keep each one as small as possible
+    __slots__ = ("_option_node", "_source", "_url", "imgproxy")
+
     url_escape_regex = re.compile(r"[@?% ]|[^\x00-\x7F]")
 
     def __init__(self, imgproxy: "ImgProxy", source_url: str) -> None:
         self.imgproxy = imgproxy
-        self._source_url = source_url
-        self.options: list[str] = []
+        self._source = Source(source_url)
+        self._option_node: OptionNode = None
+        self._url: Optional[str] = None
 
     def __repr__(self) -> str:
         return f"<Image {self._source_url}>"
 
+    @property
+    def _source_url(self) -> str:
+        return self._source.url
+
+    @property
+    def source(self) -> str:
+        """
+        The source URL for imgproxy to fetch, as given to `ImgProxy.image` or `source_url`.
+        """
+        return self._source.url
+
+    def _derive(self, source: Source, option_node: OptionNode) -> "Image":
+        """
+        Return a new Image for the given source and options.
+        """
+        cls = self.__class__
+        new_image = cls.__new__(cls)
+        new_image.imgproxy = self.imgproxy
+        new_image._source = source
+        new_image._option_node = option_node
+        new_image._url = None
+        return new_image
+
+    @property
+    def options(self) -> list[str]:
+        """
+        The processing options for this image, in the order they were added.
+        """
+        options = []
+        node = self._option_node
+        while node is not None:
+            option, node = node
+            options.append(option)
+        options.reverse()
+        return options
+
+    @options.setter
+    def options(self, options: list[str]) -> None:
+        node: OptionNode = None
+        for option in options:
+            node = (option, node)
+        self._option_node = node
+
     def source_url(self, source_url: str) -> "Image":
         """
         Updates the source URL used for imgproxy to fetch.
         """
-        new_image = Image(imgproxy=self.imgproxy, source_url=source_url)
-        new_image.options = self.options.copy()
-        return new_image
+        return self._derive(source=Source(source_url), option_node=self._option_node)
 
     def add_option(self, option_name: str, *args: Any) -> "Image":
         """
@@ -35,6 +146,8 @@ class Image:
         This method is used internally by all other image processing methods, but can also be used
         to add options directly.
         """
+        if self.imgproxy.short_options:
+            option_name = SHORT_OPTION_NAMES.get(option_name, option_name)
         option_list = [option_name, *args]
         # Remove any trailing None values
         while option_list and option_list[-1] is None:
@@ -42,10 +155,7 @@ class Image:
         # Replace remaining None values with empty strings, and convert all other values to strings
         option_string = [str(x) if x is not None else "" for x in option_list]
         new_option = ":".join(option_string)
-        new_options_list = [*self.options, new_option]
-        new_image = Image(imgproxy=self.imgproxy, source_url=self._source_url)
-        new_image.options = new_options_list
-        return new_image
+        return self._derive(source=self._source, option_node=(new_option, self._option_node))
 
     def resize(
         self,
@@ -711,38 +821,60 @@ class Image:
         """
         return self.add_option("max_animation_frame_resolution", size)
 
-    def _source_url_needs_encoding(self) -> bool:
+    def output_size(self, width: int, height: int, orientation: int = 1) -> tuple[int, int]:
         """
-        Return a boolean if a source URL needs encoding with base64.
+        Return the size of the image imgproxy returns for a source image `width` by `height`
+        with an EXIF `orientation` - see `dimensions.output_size`.
         """
-        if self.url_escape_regex.search(self._source_url):
-            return True
-        return False
-
-    @cached_property
-    def url(self) -> str:
-        options_path = "/".join(self.options)
+        # Imported here as dimensions imports this module (through canonical)
+        from .dimensions import output_size
 
-        # Prefix the path with / - only if processing options are given (or the URL will be
-        # invalid)
-        if options_path:
-            options_path = f"/{options_path}"
+        return output_size(width, height, self.options, orientation=orientation)
 
-        options_path_bytes = options_path.encode()
+    def compile(self) -> "URLTemplate":
+        """
+        Freeze the processing options of this image into a template, which returns a URL for any
+        source URL given to it. The source URL of this image is ignored.
+        """
+        return self.imgproxy.template(self.options)
 
-        if self._source_url_needs_encoding():
-            image_path = b"/" + base64.urlsafe_b64encode(self._source_url.encode()).rstrip(b"=")
-        else:
-            image_path = f"/plain/{self._source_url}".encode()
+    def cache_key(self) -> CacheKey:
+        """
+        Return a key identifying the URL of this image, made of the ImgProxy fingerprint, the
+        source URL and the processing options. Keys are equal for images with the same URL, even
+        when source URLs are encrypted with a random IV.
+        """
+        source_url = self._source.url
+        # The length prefix keeps the source URL from running into the options, which are joined
+        # in the same way as in the URL
+        image = f"{len(source_url)}:{source_url}/{'/'.join(self.options)}"
+        return CacheKey(self.imgproxy.fingerprint, image.encode())
 
-        if self.imgproxy.key and self.imgproxy.salt and True:
+    @property
+    def url(self) -> str:
+        if self._url is None:
+            url_cache = self.imgproxy.url_cache
+            if url_cache is None:
+                self._url = self._build_url()
+            else:
+                cache_key = self.cache_key()
+                url = url_cache.get(cache_key)
+                if url is None:
+                    url = self._build_url()
+                    url_cache.set(cache_key, url)
+                self._url = url
+        return self._url
+
+    def _build_url(self) -> str:
+        options_path_bytes = self.imgproxy.options_path(self.options)
+        source = self._source
+        if source.path is None:
+            source.path = self.imgproxy.source_path(source.url)
+        image_path = source.path
+
+        if self.imgproxy.signer is not None:
             unsigned_path = options_path_bytes + image_path
-            digest = hmac.new(
-                key=self.imgproxy.key,
-                msg=self.imgproxy.salt + unsigned_path,
-                digestmod=hashlib.sha256,
-            ).digest()
-            signature = base64.urlsafe_b64encode(digest).rstrip(b"=")
+            signature = self.imgproxy.sign(unsigned_path)
 
             full_path = (b"/" + signature + unsigned_path).decode()
         else:
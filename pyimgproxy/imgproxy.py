@@ -1,7 +1,23 @@
+import base64
+import hashlib
+import hmac
 import os
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Optional, Union
 
+from .cache import LRUCache, URLCache
+from .canonical import canonicalise
 from .exceptions import ConfigurationError
 from .image import Image
+from .parser import URLParser
+from .template import URLTemplate
+
+if TYPE_CHECKING:
+    import multiprocessing.context
+
+    from .client import Response
+    from .encryption import SourceURLEncrypter
 
 
 class ImgProxy:
@@ -11,19 +27,297 @@ class ImgProxy:
         key: str = "",
         salt: str = "",
         encryption_key: str = "",
+        signature_size: Optional[int] = None,
+        signing_pair: int = 0,
+        encrypt_source_urls: bool = False,
+        deterministic_iv: bool = False,
+        encryption_cache_size: int = 1024,
+        source_cache_size: int = 0,
+        url_cache_size: int = 0,
+        url_cache: Optional[URLCache] = None,
+        short_options: bool = False,
+        canonicalise_options: bool = False,
     ) -> None:
         self.url = url or os.environ.get("IMGPROXY_URL", "")
-        self.key = bytes.fromhex(key or os.environ.get("IMGPROXY_KEY", ""))
-        self.salt = bytes.fromhex(salt or os.environ.get("IMGPROXY_SALT", ""))
+        # Several comma separated keys and salts can be given to rotate them without invalidating
+        # existing URLs, URLs are signed with one pair but verified against all of them
+        keys = [
+            bytes.fromhex(value)
+            for value in (key or os.environ.get("IMGPROXY_KEY", "")).split(",")
+            if value
+        ]
+        salts = [
+            bytes.fromhex(value)
+            for value in (salt or os.environ.get("IMGPROXY_SALT", "")).split(",")
+            if value
+        ]
+        # URLs are only signed when both are set, so a key without a salt (or a salt without a
+        # key) leaves them unsigned
+        if keys and salts and len(keys) != len(salts):
+            raise ConfigurationError("ImgProxy number of keys and salts must be equal")
+        self.key_pairs = list(zip(keys, salts))
+        self.signing_pair = signing_pair
+        if self.key_pairs:
+            if not 0 <= self.signing_pair < len(self.key_pairs):
+                raise ConfigurationError("ImgProxy signing pair not found")
+            self.key, self.salt = self.key_pairs[self.signing_pair]
+        else:
+            self.key = keys[0] if keys else b""
+            self.salt = salts[0] if salts else b""
         self.encryption_key = bytes.fromhex(
             encryption_key or os.environ.get("IMGPROXY_SOURCE_URL_ENCRYPTION_KEY", "")
         )
 
+        if signature_size is None:
+            environ_signature_size = os.environ.get("IMGPROXY_SIGNATURE_SIZE", "")
+            try:
+                signature_size = int(environ_signature_size or hashlib.sha256().digest_size)
+            except ValueError:
+                msg = f"ImgProxy signature size must be an integer: {environ_signature_size}"
+                raise ConfigurationError(msg) from None
+        self.signature_size = signature_size
+        self.encrypt_source_urls = encrypt_source_urls
+        self.deterministic_iv = deterministic_iv
+        self.encryption_cache_size = encryption_cache_size
+        self.source_cache_size = source_cache_size
+        self.url_cache_size = url_cache_size
+        self.short_options = short_options
+        self.canonicalise_options = canonicalise_options
+
+        # Optionally cache signed URLs, for images which are reused across requests. A random IV
+        # has to be new for every URL, so URLs with encrypted source URLs are only cached with a
+        # deterministic IV.
+        self.url_cache = url_cache
+        if self.url_cache is None and self.url_cache_size:
+            self.url_cache = LRUCache(maxsize=self.url_cache_size)
+        if self.encrypt_source_urls and not self.deterministic_iv:
+            self.url_cache = None
+
         if not self.url:
             raise ConfigurationError("ImgProxy URL not set")
 
+        if isinstance(self.signature_size, bool) or not isinstance(self.signature_size, int):
+            raise ConfigurationError("ImgProxy signature size must be an integer")
+        if not 1 <= self.signature_size <= hashlib.sha256().digest_size:
+            raise ConfigurationError("ImgProxy signature size must be between 1 and 32")
+
+        if self.encrypt_source_urls and not self.encryption_key:
+            raise ConfigurationError("ImgProxy source URL encryption key not set")
+
+        self._setup()
+
     def __repr__(self) -> str:
         return f"<ImgProxy {self.url}>"
 
+    def __getstate__(self) -> dict[str, Any]:
+        # Derived state can't always be pickled, so it's rebuilt from the settings instead
+        state = self.__dict__.copy()
+        for name in (
+            "signer",
+            "signers",
+            "fingerprint",
+            "_source_url_encrypter",
+            "_encrypted_source_path",
+            "_source_path",
+        ):
+            del state[name]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._setup()
+
+    def _setup(self) -> None:
+        """
+        Build the state derived from the settings which is reused for every URL.
+        """
+        # The HMAC key pads and salt are hashed once here, signing a URL only needs a copy of
+        # this state with the path fed into it
+        self.signers = [
+            hmac.new(key=key, msg=salt, digestmod=hashlib.sha256) for key, salt in self.key_pairs
+        ]
+        self.signer: Optional[hmac.HMAC] = None
+        if self.signers:
+            self.signer = self.signers[self.signing_pair]
+
+        self._source_url_encrypter: Optional[SourceURLEncrypter] = None
+        if self.encrypt_source_urls:
+            # Imported here so that cryptography is only imported when it's used
+            from . import encryption
+
+            self._source_url_encrypter = encryption.SourceURLEncrypter(
+                key=self.encryption_key, deterministic_iv=self.deterministic_iv
+            )
+
+        # Encrypting a source URL is relatively expensive, and the same source URL is often used
+        # for several variants of an image (such as a srcset). Only paths encrypted with a
+        # deterministic IV can be reused, a random IV has to be new for every URL.
+        random_iv = self.encrypt_source_urls and not self.deterministic_iv
+        self._encrypted_source_path: Callable[[str], bytes] = self._encrypt_source_path
+        if not random_iv:
+            self._encrypted_source_path = lru_cache(maxsize=self.encryption_cache_size)(
+                self._encrypt_source_path
+            )
+
+        # Optionally cache every source path, for source URLs which are reused across requests
+        self._source_path: Callable[[str], bytes] = self._build_source_path
+        if self.source_cache_size and not random_iv:
+            self._source_path = lru_cache(maxsize=self.source_cache_size)(self._build_source_path)
+
+        # Identifies the settings which affect URLs, so a URL cache shared with other ImgProxy
+        # instances (or processes) never returns a URL generated with different settings
+        settings = (
+            self.url,
+            self.key,
+            self.salt,
+            self.signature_size,
+            self.encryption_key,
+            self.encrypt_source_urls,
+            self.deterministic_iv,
+            self.short_options,
+            self.canonicalise_options,
+        )
+        self.fingerprint = hashlib.sha256(repr(settings).encode()).digest()[:16]
+
     def image(self, source_url: str) -> Image:
         return Image(imgproxy=self, source_url=source_url)
+
+    def template(self, options: Iterable[str] = ()) -> URLTemplate:
+        """
+        Return a template for a fixed chain of processing options, which can be called with any
+        source URL to get the URL for that image. This is the fastest way to generate many URLs
+        with the same options.
+        """
+        return URLTemplate(imgproxy=self, options=options)
+
+    def parser(self, verify: bool = True) -> URLParser:
+        """
+        Return a parser for imgproxy URLs, which turns them back into images after verifying the
+        signature. Reuse the parser when parsing many URLs.
+        """
+        return URLParser(imgproxy=self, verify=verify)
+
+    def parse(self, url: str) -> Image:
+        """
+        Return the image for a signed imgproxy URL.
+        """
+        return self.parser().parse(url)
+
+    def urls_for(self, source_urls: Iterable[str], options: Iterable[str] = ()) -> Iterator[str]:
+        """
+        Generate URLs for many source URLs which share the same processing options. URLs are
+        generated lazily, so source URLs can be streamed from a file or database query.
+        """
+        return self.template(options).urls(source_urls)
+
+    def parallel_urls_for(
+        self,
+        source_urls: Iterable[str],
+        options: Iterable[str] = (),
+        max_workers: Optional[int] = None,
+        chunk_size: int = 1000,
+        mp_context: Optional["multiprocessing.context.BaseContext"] = None,
+    ) -> Iterator[str]:
+        """
+        Generate URLs for many source URLs which share the same processing options, using a pool
+        of worker processes. Only worthwhile for very large batches - see `urls_for`.
+        """
+        # Imported here so that importing pyimgproxy doesn't import multiprocessing
+        from .parallel import parallel_urls_for
+
+        return parallel_urls_for(
+            imgproxy=self,
+            source_urls=source_urls,
+            options=options,
+            max_workers=max_workers,
+            chunk_size=chunk_size,
+            mp_context=mp_context,
+        )
+
+    def fetch_many(
+        self,
+        images: Iterable[Image],
+        max_workers: int = 10,
+        method: str = "GET",
+        timeout: Optional[float] = 30.0,
+        return_exceptions: bool = False,
+    ) -> Iterator[tuple[Image, Union["Response", Exception]]]:
+        """
+        Fetch many processed images from imgproxy with a pool of threads sharing keep-alive
+        connections, yielding each image and its response as they complete. See
+        `ImgProxyClient.fetch_many`.
+        """
+        # Imported here so that importing pyimgproxy doesn't import asyncio and ssl
+        from .client import ImgProxyClient
+
+        with ImgProxyClient(imgproxy=self, max_connections=max_workers, timeout=timeout) as client:
+            yield from client.fetch_many(
+                images, max_workers=max_workers, method=method, return_exceptions=return_exceptions
+            )
+
+    def options_path(self, options: Iterable[str]) -> bytes:
+        """
+        Return the processing options part of a path, in canonical form if enabled.
+        """
+        if self.canonicalise_options:
+            options = canonicalise(options, short_options=self.short_options)
+        options_path = "/".join(options)
+
+        # Prefix the path with / - only if processing options are given (or the URL will be
+        # invalid)
+        if options_path:
+            options_path = f"/{options_path}"
+
+        return options_path.encode()
+
+    def source_path(self, source_url: str) -> bytes:
+        """
+        Return the source URL part of a path. Source URLs are encrypted if enabled, otherwise
+        either plain or encoded with base64 when the source URL contains characters which aren't
+        safe in a plain URL.
+        """
+        return self._source_path(source_url)
+
+    def _build_source_path(self, source_url: str) -> bytes:
+        if self.encrypt_source_urls:
+            return self._encrypted_source_path(source_url)
+        if Image.url_escape_regex.search(source_url):
+            return b"/" + base64.urlsafe_b64encode(source_url.encode()).rstrip(b"=")
+        return f"/plain/{source_url}".encode()
+
+    def encode_signature(self, digest: bytes) -> bytes:
+        """
+        Encode an HMAC digest as the signature part of a URL, truncated to the signature size.
+        """
+        return base64.urlsafe_b64encode(digest[: self.signature_size]).rstrip(b"=")
+
+    def sign(self, path: bytes) -> bytes:
+        """
+        Return the encoded signature for a path, or an empty signature if no key and salt are
+        set.
+        """
+        if self.signer is None:
+            return b""
+        signer = self.signer.copy()
+        signer.update(path)
+        return self.encode_signature(signer.digest())
+
+    def verify(self, path: bytes, signature: bytes) -> bool:
+        """
+        Check the encoded signature for a path against every key and salt pair, as imgproxy
+        does. Any signature is valid if no key and salt are set.
+        """
+        if not self.signers:
+            return True
+        for signer in self.signers:
+            signer = signer.copy()
+            signer.update(path)
+            if hmac.compare_digest(self.encode_signature(signer.digest()), signature):
+                return True
+        return False
+
+    def _encrypt_source_path(self, source_url: str) -> bytes:
+        if self._source_url_encrypter is None:
+            raise ConfigurationError("ImgProxy source URL encryption key not set")
+        encrypted = self._source_url_encrypter.encrypt(source_url.encode())
+        return b"/enc/" + base64.urlsafe_b64encode(encrypted).rstrip(b"=")
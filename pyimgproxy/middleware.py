@@ -0,0 +1,158 @@
+from collections.abc import Awaitable, Iterable
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any, Callable, Optional
+from urllib.parse import urlsplit
+
+from .cache import LRUCache
+
+if TYPE_CHECKING:
+    from _typeshed.wsgi import StartResponse, WSGIApplication, WSGIEnvironment
+
+    from .imgproxy import ImgProxy
+
+ASGIScope = dict[str, Any]
+ASGIReceive = Callable[[], Awaitable[dict[str, Any]]]
+ASGISend = Callable[[dict[str, Any]], Awaitable[None]]
+ASGIApplication = Callable[[ASGIScope, ASGIReceive, ASGISend], Awaitable[None]]
+
+
+class SignatureVerifier:
+    """
+    Checks the signature of imgproxy request paths, keeping the most recently verified paths so
+    popular images don't need to be hashed again.
+
+    Paths are the raw (still percent encoded) request path, which is what imgproxy signs. Paths
+    under the path of the ImgProxy URL have the prefix removed before verifying, and exempt paths
+    (such as the imgproxy health check) are always allowed.
+    """
+
+    def __init__(
+        self,
+        imgproxy: "ImgProxy",
+        cache_size: int = 1024,
+        exempt_paths: Iterable[str] = ("/health",),
+    ) -> None:
+        self.imgproxy = imgproxy
+        self.exempt_paths = frozenset(path.encode() for path in exempt_paths)
+
+        self._prefix = urlsplit(imgproxy.url).path.rstrip("/").encode()
+        self.cache: Optional[LRUCache] = None
+        if cache_size:
+            self.cache = LRUCache(maxsize=cache_size)
+
+    def __repr__(self) -> str:
+        return f"<SignatureVerifier {self.imgproxy.url}>"
+
+    def status(self, path: bytes) -> HTTPStatus:
+        """
+        Return OK for a valid path, NOT_FOUND for a path which isn't an imgproxy URL, or
+        FORBIDDEN for a path with an invalid signature.
+        """
+        if path in self.exempt_paths:
+            return HTTPStatus.OK
+        if self.cache is not None and self.cache.get(path) is not None:
+            return HTTPStatus.OK
+
+        # The prefix has to be a whole path segment, so /thumbnail doesn't match /thumbnails/...
+        prefix_length = len(self._prefix)
+        if not path.startswith(self._prefix) or path[prefix_length : prefix_length + 1] != b"/":
+            return HTTPStatus.NOT_FOUND
+        # The path is /signature/options.../source - the signature covers everything after it
+        signature, separator, signed_path = path[prefix_length + 1 :].partition(b"/")
+        if not separator or not signed_path:
+            return HTTPStatus.NOT_FOUND
+
+        if not self.imgproxy.verify(b"/" + signed_path, signature):
+            return HTTPStatus.FORBIDDEN
+
+        if self.cache is not None:
+            self.cache.set(path, "")
+        return HTTPStatus.OK
+
+
+class WSGIMiddleware:
+    """
+    WSGI middleware which rejects requests with an invalid imgproxy signature, before they reach
+    the wrapped application.
+
+    The raw request path is taken from RAW_URI or REQUEST_URI when the server provides one,
+    otherwise from PATH_INFO - which has already been decoded, so plain source URLs with percent
+    encoded characters will only verify with servers which provide the raw path.
+    """
+
+    def __init__(
+        self,
+        app: "WSGIApplication",
+        imgproxy: "ImgProxy",
+        cache_size: int = 1024,
+        exempt_paths: Iterable[str] = ("/health",),
+    ) -> None:
+        self.app = app
+        self.verifier = SignatureVerifier(
+            imgproxy=imgproxy, cache_size=cache_size, exempt_paths=exempt_paths
+        )
+
+    def __call__(
+        self, environ: "WSGIEnvironment", start_response: "StartResponse"
+    ) -> Iterable[bytes]:
+        raw_uri = environ.get("RAW_URI") or environ.get("REQUEST_URI")
+        if raw_uri:
+            path = raw_uri.partition("?")[0].encode("latin-1")
+        else:
+            path = (environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", "")).encode(
+                "latin-1"
+            )
+
+        status = self.verifier.status(path)
+        if status is HTTPStatus.OK:
+            return self.app(environ, start_response)
+
+        body = status.phrase.encode()
+        start_response(
+            f"{status.value} {status.phrase}",
+            [("Content-Type", "text/plain"), ("Content-Length", str(len(body)))],
+        )
+        return [body]
+
+
+class ASGIMiddleware:
+    """
+    ASGI middleware which rejects HTTP requests with an invalid imgproxy signature, before they
+    reach the wrapped application. Other connection types are passed through unchanged.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApplication,
+        imgproxy: "ImgProxy",
+        cache_size: int = 1024,
+        exempt_paths: Iterable[str] = ("/health",),
+    ) -> None:
+        self.app = app
+        self.verifier = SignatureVerifier(
+            imgproxy=imgproxy, cache_size=cache_size, exempt_paths=exempt_paths
+        )
+
+    async def __call__(self, scope: ASGIScope, receive: ASGIReceive, send: ASGISend) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("raw_path") or scope["path"].encode()
+        status = self.verifier.status(path)
+        if status is HTTPStatus.OK:
+            await self.app(scope, receive, send)
+            return
+
+        body = status.phrase.encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status.value,
+                "headers": [
+                    (b"content-type", b"text/plain"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,106 @@
+import multiprocessing.context
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from .imgproxy import ImgProxy
+    from .template import URLTemplate
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# The template for the current worker process, set once when the worker starts so the settings
+# and options aren't sent with every chunk
+_worker_template: Optional["URLTemplate"] = None
+
+
+def _init_worker(imgproxy: "ImgProxy", options: list[str]) -> None:
+    global _worker_template
+    _worker_template = imgproxy.template(options)
+
+
+def _worker_urls(source_urls: list[str]) -> list[str]:
+    if _worker_template is None:
+        raise RuntimeError("Worker process not initialised")
+    return list(_worker_template.urls(source_urls))
+
+
+def _chunked(iterable: Iterable[str], chunk_size: int) -> Iterator[list[str]]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def pool_map(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: Optional[int] = None,
+    mp_context: Optional[multiprocessing.context.BaseContext] = None,
+    initializer: Optional[Callable[..., object]] = None,
+    initargs: tuple[Any, ...] = (),
+) -> Iterator[R]:
+    """
+    Call a function with each item across a pool of worker processes, returning the results in
+    the same order as the items.
+
+    Items are only taken from the iterable as results are consumed, so at most twice
+    `max_workers` items are queued at any time - large batches can be streamed without holding
+    every item or result in memory.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=mp_context,
+        initializer=initializer,
+        initargs=initargs,
+    )
+    pending: deque[Future[R]] = deque()
+
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            # Keep every worker busy, but don't queue up more work than needed to do so
+            if len(pending) >= max_workers * 2:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def parallel_urls_for(
+    imgproxy: "ImgProxy",
+    source_urls: Iterable[str],
+    options: Iterable[str] = (),
+    max_workers: Optional[int] = None,
+    chunk_size: int = 1000,
+    mp_context: Optional[multiprocessing.context.BaseContext] = None,
+) -> Iterator[str]:
+    """
+    Generate URLs for many source URLs which share the same processing options, signing chunks of
+    source URLs across a pool of worker processes. URLs are returned in the same order as the
+    source URLs.
+
+    The ImgProxy settings and options are sent to each worker once when it starts, and only a
+    limited number of chunks are queued at any time - so source URLs can be streamed without
+    holding every URL in memory.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    for urls in pool_map(
+        _worker_urls,
+        _chunked(source_urls, chunk_size),
+        max_workers=max_workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(imgproxy, list(options)),
+    ):
+        yield from urls
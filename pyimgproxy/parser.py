@@ -0,0 +1,135 @@
+import binascii
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import unquote
+
+from .exceptions import InvalidSignatureError, InvalidURLError
+from .image import Image
+
+if TYPE_CHECKING:
+    from .encryption import SourceURLEncrypter
+    from .imgproxy import ImgProxy
+
+# Maps the URL safe base64 alphabet to the standard alphabet, for decoding with binascii directly
+URLSAFE_TRANSLATION = bytes.maketrans(b"-_", b"+/")
+
+
+class URLParser:
+    """
+    Parses imgproxy URLs back into images, verifying the signature against every key and salt
+    pair.
+
+    URLs can either be full URLs starting with the ImgProxy URL, or paths starting with the
+    signature. A source URL extension (such as `@webp` or `.webp`) becomes a `format` option, as
+    they're equivalent in imgproxy.
+    """
+
+    def __init__(self, imgproxy: "ImgProxy", verify: bool = True) -> None:
+        self.imgproxy = imgproxy
+        self.verify = verify
+
+        self._prefix = imgproxy.url
+        self._format_option = "f" if imgproxy.short_options else "format"
+        self._source_url_encrypter: Optional[SourceURLEncrypter] = None
+
+    def __repr__(self) -> str:
+        return f"<URLParser {self._prefix}>"
+
+    def __call__(self, url: str) -> Image:
+        return self.parse(url)
+
+    def parse(self, url: str) -> Image:
+        """
+        Return the image for an imgproxy URL. Raises InvalidSignatureError if the signature
+        doesn't match, or InvalidURLError for any other invalid URL.
+        """
+        if url.startswith(self._prefix):
+            url = url[len(self._prefix) :]
+        if not url.startswith("/"):
+            msg = f"Not an imgproxy URL: {url!r}"
+            raise InvalidURLError(msg)
+
+        # The path is /signature/options.../source - the signature covers everything after it
+        _, _, path = url.partition("/")
+        signature, separator, path = path.partition("/")
+        if self.imgproxy.signer is None and (
+            not separator or ":" in signature or signature in ("plain", "enc")
+        ):
+            # Unsigned URLs are generated without a signature part, so the path starts here -
+            # either with an option, a plain or encrypted source, or the base64 source itself
+            return self.parse_path(f"/{signature}{separator}{path}")
+        if not separator:
+            msg = f"Missing imgproxy URL path: {url!r}"
+            raise InvalidURLError(msg)
+
+        path = f"/{path}"
+        if self.verify and not self.imgproxy.verify(path.encode(), signature.encode()):
+            msg = f"Invalid imgproxy URL signature: {url!r}"
+            raise InvalidSignatureError(msg)
+
+        return self.parse_path(path)
+
+    def parse_path(self, path: str) -> Image:
+        """
+        Return the image for the options and source part of an imgproxy URL path, without the
+        signature.
+        """
+        parts = path[1:].split("/")
+
+        # Options always have arguments, the source starts at the first part without any
+        for index, part in enumerate(parts):
+            if ":" not in part:
+                break
+        else:
+            msg = f"Missing imgproxy source URL: {path!r}"
+            raise InvalidURLError(msg)
+        options = parts[:index]
+        source_type = parts[index]
+
+        if source_type == "plain":
+            source_url, separator, extension = "/".join(parts[index + 1 :]).rpartition("@")
+            if not separator:
+                source_url, extension = extension, ""
+            if "%" in source_url:
+                source_url = unquote(source_url)
+        elif source_type == "enc":
+            encoded, _, extension = "".join(parts[index + 1 :]).partition(".")
+            source_url = self._decrypt(self._decode(encoded)).decode("utf-8", "replace")
+        else:
+            encoded, _, extension = "".join(parts[index:]).partition(".")
+            source_url = self._decode(encoded).decode("utf-8", "replace")
+
+        if not source_url:
+            msg = f"Missing imgproxy source URL: {path!r}"
+            raise InvalidURLError(msg)
+        if extension:
+            options.append(f"{self._format_option}:{extension}")
+
+        image = self.imgproxy.image(source_url)
+        image.options = options
+        return image
+
+    def _decode(self, encoded: str) -> bytes:
+        try:
+            return binascii.a2b_base64(
+                (encoded + "=" * (-len(encoded) % 4)).encode().translate(URLSAFE_TRANSLATION)
+            )
+        except (binascii.Error, ValueError) as e:
+            msg = f"Invalid imgproxy source URL encoding: {encoded!r}"
+            raise InvalidURLError(msg) from e
+
+    def _decrypt(self, encrypted: bytes) -> bytes:
+        if self._source_url_encrypter is None:
+            if not self.imgproxy.encryption_key:
+                msg = "ImgProxy source URL encryption key not set"
+                raise InvalidURLError(msg)
+            # Imported here so that cryptography is only imported when it's used
+            from . import encryption
+
+            self._source_url_encrypter = encryption.SourceURLEncrypter(
+                key=self.imgproxy.encryption_key
+            )
+        try:
+            return self._source_url_encrypter.decrypt(encrypted)
+        except ValueError as e:
+            msg = f"Invalid imgproxy encrypted source URL: {e}"
+            raise InvalidURLError(msg) from e
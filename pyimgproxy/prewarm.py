@@ -0,0 +1,214 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from collections.abc import Iterable
+from typing import TYPE_CHECKING, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from .cache import key_digest
+from .client import AsyncImgProxyClient
+from .exceptions import FetchError
+
+if TYPE_CHECKING:
+    from .image import Image
+    from .imgproxy import ImgProxy
+
+
+class PrewarmReport(NamedTuple):
+    total: int
+    succeeded: int
+    failed: int
+    # Images which were already warmed according to the checkpoint file
+    skipped: int
+    # Seconds
+    elapsed: float
+    # Requests per second
+    throughput: float
+    # Request latency percentiles in seconds
+    latency_p50: float
+    latency_p90: float
+    latency_p99: float
+    latency_max: float
+    # Number of responses for each status, with 0 for failed connections
+    statuses: dict[int, int]
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """
+    Return a percentile of sorted values with the nearest rank method, or 0.0 for no values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def image_digest(image: "Image") -> str:
+    """
+    Return a digest identifying an image in a checkpoint file. This is the same for every
+    process, even when source URLs are encrypted with a random IV.
+    """
+    return key_digest(image.cache_key()).hex()
+
+
+class RateLimiter:
+    """
+    Spaces out requests so no more than `rate` are started each second.
+    """
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class Prewarmer:
+    """
+    Requests processed images ahead of time, so imgproxy and any CDN in front of it have them
+    cached before users do.
+
+    At most `max_connections` requests are made at once, and no more than `rate_limit` requests
+    per second are started for each host if given. With a `checkpoint` file every warmed image is
+    recorded as it completes, and images which are already in the checkpoint file are skipped - so
+    an interrupted run can be restarted without repeating work. Failed images aren't recorded, so
+    they're retried by the next run.
+
+    HEAD requests are used by default, which are enough for imgproxy to process and cache an
+    image without sending it.
+    """
+
+    def __init__(
+        self,
+        imgproxy: "ImgProxy",
+        method: str = "HEAD",
+        max_connections: int = 10,
+        rate_limit: Optional[float] = None,
+        timeout: Optional[float] = 30.0,
+        checkpoint: Optional[str] = None,
+    ) -> None:
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError("rate_limit must be positive")
+
+        self.imgproxy = imgproxy
+        self.method = method
+        self.max_connections = max_connections
+        self.rate_limit = rate_limit
+        self.timeout = timeout
+        self.checkpoint = checkpoint
+
+    def __repr__(self) -> str:
+        return f"<Prewarmer {self.imgproxy.url}>"
+
+    def run(self, images: Iterable["Image"]) -> PrewarmReport:
+        """
+        Warm every image, returning a report once they're all complete.
+        """
+        return asyncio.run(self.prewarm(images))
+
+    def completed(self) -> set[str]:
+        """
+        Return the digests of images recorded in the checkpoint file.
+        """
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return set()
+        with open(self.checkpoint) as f:
+            # A partially written final line (from a crash) won't match any digest
+            return {line.rstrip("\n") for line in f}
+
+    async def prewarm(self, images: Iterable["Image"]) -> PrewarmReport:
+        """
+        Warm every image, returning a report once they're all complete.
+        """
+        completed = self.completed()
+        rate_limiters: dict[str, RateLimiter] = {}
+        latencies: list[float] = []
+        statuses: Counter[int] = Counter()
+        skipped = 0
+
+        checkpoint = None
+        if self.checkpoint is not None:
+            checkpoint = open(self.checkpoint, "a+")
+            # Finish any partially written line, so the next digest starts on its own line
+            if checkpoint.tell():
+                checkpoint.seek(checkpoint.tell() - 1)
+                if checkpoint.read(1) != "\n":
+                    checkpoint.write("\n")
+
+        async def warm(client: AsyncImgProxyClient, image: "Image", digest: str) -> None:
+            url = image.url
+            if self.rate_limit is not None:
+                host = urlsplit(url).netloc
+                if host not in rate_limiters:
+                    rate_limiters[host] = RateLimiter(self.rate_limit)
+                await rate_limiters[host].wait()
+
+            start = time.perf_counter()
+            try:
+                response = await client.fetch_url(url, method=self.method)
+            except FetchError:
+                statuses[0] += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status] += 1
+
+            if checkpoint is not None and (200 <= response.status < 300 or response.status == 304):
+                checkpoint.write(f"{digest}\n")
+                checkpoint.flush()
+
+        pending: set[asyncio.Future[None]] = set()
+        start = time.perf_counter()
+        try:
+            async with AsyncImgProxyClient(
+                imgproxy=self.imgproxy, max_connections=self.max_connections, timeout=self.timeout
+            ) as client:
+                for image in images:
+                    digest = image_digest(image)
+                    if digest in completed:
+                        skipped += 1
+                        continue
+                    # Images are only taken from the iterable as requests complete, so very large
+                    # batches can be streamed in - and requests never queue for a connection, which
+                    # would be counted in their latency
+                    if len(pending) >= self.max_connections:
+                        done, pending = await asyncio.wait(
+                            pending, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        for future in done:
+                            future.result()
+                    pending.add(asyncio.ensure_future(warm(client, image, digest)))
+                if pending:
+                    done, pending = await asyncio.wait(pending)
+                    for future in done:
+                        future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            if checkpoint is not None:
+                checkpoint.close()
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        total = sum(statuses.values())
+        succeeded = sum(
+            count for status, count in statuses.items() if 200 <= status < 300 or status == 304
+        )
+        return PrewarmReport(
+            total=total + skipped,
+            succeeded=succeeded,
+            failed=total - succeeded,
+            skipped=skipped,
+            elapsed=elapsed,
+            throughput=total / elapsed if elapsed else 0.0,
+            latency_p50=percentile(latencies, 50),
+            latency_p90=percentile(latencies, 90),
+            latency_p99=percentile(latencies, 99),
+            latency_max=latencies[-1] if latencies else 0.0,
+            statuses=dict(statuses),
+        )
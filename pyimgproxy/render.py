@@ -0,0 +1,351 @@
+import math
+import os
+from collections.abc import Iterable, Iterator
+from io import BytesIO
+from typing import TYPE_CHECKING, NamedTuple, Optional
+from urllib.parse import unquote, urlsplit
+
+from .dimensions import (
+    FORMAT_ALIASES,
+    FORMATS,
+    Gravity,
+    ProcessingOptions,
+    calc_geometry,
+    calc_position,
+    extend_size,
+    min_non_zero,
+    scale_padding,
+)
+from .exceptions import ConfigurationError, RenderError
+from .parallel import pool_map
+
+try:
+    from PIL import Image as PILImage, ImageChops, ImageFilter
+except ImportError:  # pragma: no cover
+    PILImage = ImageChops = ImageFilter = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    import multiprocessing.context
+
+    from PIL.Image import Image as PILImageType
+
+    from .image import Image
+
+ALPHA_FORMATS = {"png", "webp", "avif", "gif", "ico", "tiff"}
+QUALITY_FORMATS = {"jpg", "webp", "avif"}
+
+# The same default as IMGPROXY_QUALITY
+DEFAULT_QUALITY = 80
+
+# imgproxy's default background when flattening images with an alpha channel
+DEFAULT_BACKGROUND = (255, 255, 255)
+
+EXIF_ORIENTATION = 0x0112
+
+
+class RenderedImage(NamedTuple):
+    data: bytes
+    # The imgproxy name of the format, such as jpg or png
+    format: str
+    width: int
+    height: int
+
+
+class LocalRenderer:
+    """
+    Renders images from local files with Pillow, for tests, offline development and batch jobs
+    on hosts without imgproxy. Source URLs must be `local:///` URLs (or plain paths), which are
+    relative to `root`.
+
+    The resizing, crop, gravity, trim, padding, rotate, background, blur, sharpen, quality and
+    format options are applied in the same order as imgproxy, and any other options are ignored.
+    The geometry of the result matches imgproxy, but pixels won't be identical - Pillow's
+    resampling and filters aren't the same as libvips, and smart gravity falls back to the
+    centre.
+
+    JPEGs which are being shrunk are decoded at a reduced size when `draft` is set, which is much
+    faster for large photos.
+    """
+
+    def __init__(
+        self, root: str = ".", quality: int = DEFAULT_QUALITY, draft: bool = True
+    ) -> None:
+        if PILImage is None:
+            raise ConfigurationError("Local rendering requires Pillow, install pyimgproxy[render]")
+
+        self.root = os.path.realpath(root)
+        self.quality = quality
+        self.draft = draft
+
+    def __repr__(self) -> str:
+        return f"<LocalRenderer {self.root}>"
+
+    def source_path(self, source_url: str) -> str:
+        """
+        Return the path of the file for a source URL, which must be inside the root directory.
+        """
+        parts = urlsplit(source_url)
+        if parts.scheme == "local":
+            path = unquote(parts.path)
+        elif not parts.scheme:
+            path = source_url
+        else:
+            msg = f"Only local:/// source URLs can be rendered: {source_url}"
+            raise RenderError(msg)
+
+        full_path = os.path.realpath(os.path.join(self.root, path.lstrip("/")))
+        if os.path.commonpath([self.root, full_path]) != self.root:
+            msg = f"Source is outside the root directory: {source_url}"
+            raise RenderError(msg)
+        return full_path
+
+    def render(self, image: "Image") -> RenderedImage:
+        """
+        Render an image, returning the encoded result.
+        """
+        return self.render_source(image.source, image.options)
+
+    def render_source(self, source_url: str, options: Iterable[str]) -> RenderedImage:
+        """
+        Render a source URL with a chain of processing options, returning the encoded result.
+        """
+        try:
+            po = ProcessingOptions(options)
+        except ValueError as e:
+            msg = f"Invalid processing options: {e}"
+            raise RenderError(msg) from e
+
+        path = self.source_path(source_url)
+        try:
+            with PILImage.open(path) as img:
+                return self._process(img, po)
+        except OSError as e:
+            msg = f"Can't render {source_url}: {e}"
+            raise RenderError(msg) from e
+
+    def render_many(
+        self,
+        images: Iterable["Image"],
+        max_workers: Optional[int] = None,
+        mp_context: Optional["multiprocessing.context.BaseContext"] = None,
+    ) -> Iterator[RenderedImage]:
+        """
+        Render many images across a pool of worker processes, returning results in the same order
+        as the images. Only a limited number of images are queued at any time, so large batches
+        can be streamed.
+        """
+        return pool_map(
+            _worker_render,
+            ((image.source, image.options) for image in images),
+            max_workers=max_workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(self,),
+        )
+
+    def _process(self, img: "PILImageType", po: ProcessingOptions) -> RenderedImage:
+        source_format = FORMAT_ALIASES.get((img.format or "").lower(), (img.format or "").lower())
+        if source_format not in FORMATS:
+            source_format = "jpg"
+
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+
+        # Trimming needs the whole image, and changes the size everything else is based on
+        if po.trim is not None:
+            img = trim_image(self._load(img), *po.trim)
+
+        geometry = calc_geometry(img.width, img.height, po, orientation=orientation)
+        rotated = (geometry.angle + po.rotate) % 180 != 0
+
+        if po.trim is None:
+            if (
+                self.draft
+                and img.format == "JPEG"
+                and geometry.width_scale < 1
+                and geometry.height_scale < 1
+            ):
+                # Pillow picks the smallest reduction of at least this size
+                draft_size = (
+                    math.ceil(geometry.source_width * geometry.width_scale),
+                    math.ceil(geometry.source_height * geometry.height_scale),
+                )
+                img.draft(img.mode, draft_size[::-1] if rotated else draft_size)
+            img = self._load(img)
+
+        # imgproxy rotates the image after scaling, but rotating it first gives the same result
+        # without having to rotate the crop
+        img = self._rotate(img, geometry.angle, geometry.flip, po.rotate)
+
+        # Crop the source, allowing for a JPEG decoded at a reduced size
+        if (geometry.crop_width, geometry.crop_height) != img.size:
+            left, top = calc_position(
+                geometry.source_width,
+                geometry.source_height,
+                geometry.crop_width,
+                geometry.crop_height,
+                po.crop_gravity,
+                1.0,
+            )
+            x_ratio = img.width / geometry.source_width
+            y_ratio = img.height / geometry.source_height
+            img = img.crop(
+                (
+                    round(left * x_ratio),
+                    round(top * y_ratio),
+                    round((left + geometry.crop_width) * x_ratio),
+                    round((top + geometry.crop_height) * y_ratio),
+                )
+            )
+
+        scaled_size = (geometry.scaled_width, geometry.scaled_height)
+        if img.size != scaled_size:
+            img = img.resize(scaled_size, PILImage.Resampling.LANCZOS)
+
+        img = crop_image(
+            img, geometry.result_width, geometry.result_height, po.gravity, geometry.dpr_scale
+        )
+
+        if po.blur > 0:
+            img = img.filter(ImageFilter.GaussianBlur(po.blur))
+        if po.sharpen > 0:
+            img = img.filter(ImageFilter.UnsharpMask(po.sharpen))
+
+        if po.extend:
+            img = extend_image(
+                img,
+                geometry.target_width,
+                geometry.target_height,
+                po.extend_gravity,
+                geometry.dpr_scale,
+            )
+        if geometry.aspect_ratio_width and geometry.aspect_ratio_height:
+            img = extend_image(
+                img,
+                geometry.aspect_ratio_width,
+                geometry.aspect_ratio_height,
+                po.extend_aspect_ratio_gravity,
+                geometry.dpr_scale,
+            )
+
+        if po.padding is not None:
+            top, right, bottom, left = scale_padding(po.padding, geometry.dpr_scale)
+            img = embed(img, img.width + left + right, img.height + top + bottom, left, top)
+
+        output_format = po.format or source_format
+        if po.background is not None or output_format not in ALPHA_FORMATS:
+            img = flatten(img, po.background or DEFAULT_BACKGROUND)
+
+        options = {}
+        if output_format in QUALITY_FORMATS:
+            options["quality"] = po.quality or self.quality
+        output = BytesIO()
+        img.save(output, format=FORMATS[output_format], **options)
+        return RenderedImage(output.getvalue(), output_format, img.width, img.height)
+
+    def _load(self, img: "PILImageType") -> "PILImageType":
+        img.load()
+        if img.mode in ("RGB", "RGBA", "L", "LA"):
+            return img
+        has_alpha = img.has_transparency_data
+        return img.convert("RGBA" if has_alpha else "RGB")
+
+    def _rotate(self, img: "PILImageType", angle: int, flip: bool, rotate: int) -> "PILImageType":
+        # Pillow rotates anticlockwise
+        if angle:
+            img = img.rotate(-angle, expand=True)
+        if flip:
+            img = img.transpose(PILImage.Transpose.FLIP_LEFT_RIGHT)
+        if rotate:
+            img = img.rotate(-rotate, expand=True)
+        return img
+
+
+def crop_image(
+    img: "PILImageType", width: int, height: int, gravity: Gravity, dpr: float
+) -> "PILImageType":
+    if width == 0 and height == 0:
+        return img
+    width = min_non_zero(width, img.width)
+    height = min_non_zero(height, img.height)
+    if width >= img.width and height >= img.height:
+        return img
+    left, top = calc_position(img.width, img.height, width, height, gravity, dpr)
+    return img.crop((left, top, left + width, top + height))
+
+
+def trim_image(
+    img: "PILImageType",
+    threshold: float,
+    color: Optional[tuple[int, int, int]],
+    equal_hor: bool,
+    equal_ver: bool,
+) -> "PILImageType":
+    """
+    Remove a border of `color` (or the colour of the top left pixel) from an image. The image is
+    left alone if every pixel is within `threshold` of the colour.
+    """
+    rgb = img.convert("RGB")
+    if color is None:
+        pixel = rgb.getpixel((0, 0))
+        assert isinstance(pixel, tuple)  # noqa:S101
+        color = (pixel[0], pixel[1], pixel[2])
+    difference = ImageChops.difference(rgb, PILImage.new("RGB", rgb.size, color))
+    red, green, blue = difference.split()
+    channel_difference = ImageChops.lighter(ImageChops.lighter(red, green), blue)
+    box = channel_difference.point(lambda value: 255 if value > threshold else 0).getbbox()
+    if box is None:
+        return img
+
+    left, top, right, bottom = box
+    if equal_hor:
+        margin = min(left, img.width - right)
+        left, right = margin, img.width - margin
+    if equal_ver:
+        margin = min(top, img.height - bottom)
+        top, bottom = margin, img.height - margin
+    return img.crop((left, top, right, bottom))
+
+
+def extend_image(
+    img: "PILImageType", width: int, height: int, gravity: Gravity, dpr: float
+) -> "PILImageType":
+    width, height = extend_size(img.width, img.height, width, height)
+    if (width, height) == img.size:
+        return img
+    left, top = calc_position(width, height, img.width, img.height, gravity, dpr)
+    return embed(img, width, height, left, top)
+
+
+def embed(img: "PILImageType", width: int, height: int, left: int, top: int) -> "PILImageType":
+    """
+    Place an image on a transparent canvas.
+    """
+    canvas = PILImage.new("RGBA", (width, height), (0, 0, 0, 0))
+    canvas.paste(img.convert("RGBA"), (left, top))
+    return canvas
+
+
+def flatten(img: "PILImageType", background: tuple[int, int, int]) -> "PILImageType":
+    """
+    Remove any alpha channel from an image, filling transparent areas with the background.
+    """
+    if img.mode in ("RGB", "L"):
+        return img
+    canvas = PILImage.new("RGB", img.size, background)
+    canvas.paste(img.convert("RGBA"), mask=img.convert("RGBA").getchannel("A"))
+    return canvas
+
+
+# The renderer for the current worker process, set once when the worker starts
+_worker_renderer: Optional[LocalRenderer] = None
+
+
+def _init_worker(renderer: LocalRenderer) -> None:
+    global _worker_renderer
+    _worker_renderer = renderer
+
+
+def _worker_render(source: tuple[str, list[str]]) -> RenderedImage:
+    if _worker_renderer is None:
+        raise RuntimeError("Worker process not initialised")
+    return _worker_renderer.render_source(*source)
@@ -0,0 +1,442 @@
+import http.client
+import mmap
+import os
+import socket
+import ssl
+import struct
+from collections.abc import Iterator, Mapping
+from typing import IO, Any, NamedTuple, Optional, Union
+
+from .client import USER_AGENT, request_target
+from .exceptions import FetchError, FetchTimeoutError, InvalidImageError
+
+# Bytes read from a stream at a time. Headers almost always fit in the first read, but JPEG EXIF
+# data (which can hold a thumbnail) comes before the frame header, so more may be needed.
+CHUNK_SIZE = 4096
+
+# The most bytes read from a stream before giving up
+MAX_BYTES = 1024 * 1024
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+# JPEG start of frame markers, which hold the image size - every marker from 0xC0 to 0xCF except
+# DHT (0xC4), JPG (0xC8) and DAC (0xCC)
+JPEG_SOF_MARKERS = {*range(0xC0, 0xD0)} - {0xC4, 0xC8, 0xCC}
+
+TIFF_WIDTH = 0x0100
+TIFF_HEIGHT = 0x0101
+TIFF_ORIENTATION = 0x0112
+TIFF_SHORT = 3
+TIFF_LONG = 4
+
+AVIF_BRANDS = {b"avif", b"avis"}
+HEIC_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1"}
+
+
+class ImageInfo(NamedTuple):
+    # The imgproxy name of the format, such as jpg or png
+    format: str
+    width: int
+    height: int
+    # The EXIF orientation, 1 when the image has none
+    orientation: int
+
+
+class TruncatedError(Exception):
+    """
+    The header continues beyond the data which has been read, up to `size` bytes.
+    """
+
+    def __init__(self, size: int) -> None:
+        super().__init__(size)
+        self.size = size
+
+
+def unpack(fmt: str, data: Buffer, offset: int) -> tuple[Any, ...]:
+    end = offset + struct.calcsize(fmt)
+    if end > len(data):
+        raise TruncatedError(end)
+    return struct.unpack_from(fmt, data, offset)
+
+
+def read(data: Buffer, offset: int, size: int) -> bytes:
+    if offset + size > len(data):
+        raise TruncatedError(offset + size)
+    return bytes(data[offset : offset + size])
+
+
+def parse_tiff(data: Buffer, start: int, end: int) -> dict[int, int]:
+    """
+    Return the width, height and orientation tags from the first IFD of a TIFF structure
+    (a TIFF file or EXIF data) between `start` and `end`.
+    """
+    byte_order = read(data, start, 2)
+    if byte_order == b"II":
+        endian = "<"
+    elif byte_order == b"MM":
+        endian = ">"
+    else:
+        raise InvalidImageError("Invalid TIFF byte order")
+    magic, ifd_offset = unpack(f"{endian}HI", data, start + 2)
+    if magic != 42:
+        raise InvalidImageError("Invalid TIFF header")
+
+    ifd = start + ifd_offset
+    if ifd + 2 > end:
+        raise InvalidImageError("TIFF IFD is out of bounds")
+    (count,) = unpack(f"{endian}H", data, ifd)
+    if ifd + 2 + count * 12 > end:
+        raise InvalidImageError("TIFF IFD is out of bounds")
+
+    tags = {}
+    for entry in range(ifd + 2, ifd + 2 + count * 12, 12):
+        tag, value_type, value_count = unpack(f"{endian}HHI", data, entry)
+        if tag not in (TIFF_WIDTH, TIFF_HEIGHT, TIFF_ORIENTATION) or value_count != 1:
+            continue
+        if value_type == TIFF_SHORT:
+            (tags[tag],) = unpack(f"{endian}H", data, entry + 8)
+        elif value_type == TIFF_LONG:
+            (tags[tag],) = unpack(f"{endian}I", data, entry + 8)
+    return tags
+
+
+def exif_orientation(data: Buffer, start: int, end: int) -> int:
+    """
+    Return the orientation from EXIF data, or 1 if it's missing or invalid.
+    """
+    if read(data, start, 6) == b"Exif\x00\x00":
+        start += 6
+    try:
+        orientation = parse_tiff(data, start, end).get(TIFF_ORIENTATION, 1)
+    except InvalidImageError:
+        return 1
+    return orientation if 1 <= orientation <= 8 else 1
+
+
+def sniff_jpeg(data: Buffer, limit: int) -> ImageInfo:
+    offset = 2
+    orientation = 1
+    while True:
+        prefix, marker = unpack(">BB", data, offset)
+        if prefix != 0xFF:
+            raise InvalidImageError("Invalid JPEG marker")
+        if marker == 0xFF:
+            # Markers can be padded with any number of 0xFF bytes
+            offset += 1
+            continue
+        offset += 2
+        # Markers without a segment
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            continue
+        if marker in (0xD9, 0xDA):
+            raise InvalidImageError("JPEG has no frame header")
+
+        (length,) = unpack(">H", data, offset)
+        if marker in JPEG_SOF_MARKERS:
+            _, height, width = unpack(">BHH", data, offset + 2)
+            return ImageInfo("jpg", width, height, orientation)
+        if marker == 0xE1 and read(data, offset + 2, 4) == b"Exif":
+            orientation = exif_orientation(data, offset + 2, offset + length)
+        offset += length
+
+
+def sniff_png(data: Buffer, limit: int) -> ImageInfo:
+    _, chunk_type, width, height = unpack(">I4sII", data, 8)
+    if chunk_type != b"IHDR":
+        raise InvalidImageError("PNG has no IHDR chunk")
+    return ImageInfo("png", width, height, 1)
+
+
+def sniff_gif(data: Buffer, limit: int) -> ImageInfo:
+    width, height = unpack("<HH", data, 6)
+    return ImageInfo("gif", width, height, 1)
+
+
+def sniff_webp(data: Buffer, limit: int) -> ImageInfo:
+    chunk_type = read(data, 12, 4)
+    if chunk_type == b"VP8 ":
+        if read(data, 23, 3) != b"\x9d\x01\x2a":
+            raise InvalidImageError("Invalid VP8 frame")
+        width, height = unpack("<HH", data, 26)
+        return ImageInfo("webp", width & 0x3FFF, height & 0x3FFF, 1)
+    if chunk_type == b"VP8L":
+        signature, bits = unpack("<BI", data, 20)
+        if signature != 0x2F:
+            raise InvalidImageError("Invalid VP8L signature")
+        return ImageInfo("webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, 1)
+    if chunk_type == b"VP8X":
+        (flags,) = unpack("<B", data, 20)
+        size = read(data, 24, 6)
+        width = int.from_bytes(size[:3], "little") + 1
+        height = int.from_bytes(size[3:], "little") + 1
+        orientation = webp_orientation(data, limit) if flags & 0x08 else 1
+        return ImageInfo("webp", width, height, orientation)
+    raise InvalidImageError("Unsupported WebP chunk")
+
+
+def webp_orientation(data: Buffer, limit: int) -> int:
+    """
+    Return the orientation from the EXIF chunk of an extended WebP. The EXIF chunk follows the
+    image data, so it's only found when it's within `limit` bytes.
+    """
+    (riff_size,) = unpack("<I", data, 4)
+    end = min(riff_size + 8, limit)
+    offset = 12
+    while offset + 8 <= end:
+        chunk_type, size = struct.unpack("<4sI", read(data, offset, 8))
+        if chunk_type == b"EXIF":
+            if offset + 8 + size > end:
+                return 1
+            return exif_orientation(data, offset + 8, offset + 8 + size)
+        # Chunks are padded to an even size
+        offset += 8 + size + (size & 1)
+    return 1
+
+
+def iter_boxes(data: Buffer, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """
+    Yield the type, payload offset and end offset of each ISO base media file format box between
+    `start` and `end`.
+    """
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack(">I4s", read(data, offset, 8))
+        header_size = 8
+        if size == 1:
+            (size,) = unpack(">Q", data, offset + 8)
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            raise InvalidImageError("Invalid box size")
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+
+def find_box(data: Buffer, start: int, end: int, box_type: bytes) -> Optional[tuple[int, int]]:
+    for child_type, child_start, child_end in iter_boxes(data, start, end):
+        if child_type == box_type:
+            return child_start, child_end
+    return None
+
+
+def sniff_heif(data: Buffer, limit: int) -> ImageInfo:
+    """
+    Read the size of the primary image of an AVIF or HEIC file from its ispe property. HEIF
+    rotations are applied by decoders (and so by imgproxy), so they're applied to the size
+    rather than returned as an orientation.
+    """
+    (ftyp_size,) = unpack(">I", data, 0)
+    major_brand = read(data, 8, 4)
+    compatible_brands = read(data, 16, max(0, ftyp_size - 16))
+    brands = {compatible_brands[i : i + 4] for i in range(0, len(compatible_brands) - 3, 4)}
+    # The major brand of an AVIF is sometimes the generic mif1, with avif as a compatible brand
+    if major_brand in AVIF_BRANDS or (
+        major_brand not in HEIC_BRANDS - {b"mif1", b"msf1"} and brands & AVIF_BRANDS
+    ):
+        image_format = "avif"
+    elif major_brand in HEIC_BRANDS or brands & HEIC_BRANDS:
+        image_format = "heic"
+    else:
+        raise InvalidImageError("Unsupported ISO base media file")
+
+    meta = find_box(data, 0, limit, b"meta")
+    if meta is None:
+        raise InvalidImageError("HEIF has no meta box")
+    # meta is a full box, with a version and flags before its children
+    meta_start, meta_end = meta[0] + 4, meta[1]
+
+    primary_item = None
+    pitm = find_box(data, meta_start, meta_end, b"pitm")
+    if pitm is not None:
+        (version,) = unpack(">B", data, pitm[0])
+        (primary_item,) = unpack(">H" if version == 0 else ">I", data, pitm[0] + 4)
+
+    iprp = find_box(data, meta_start, meta_end, b"iprp")
+    if iprp is None:
+        raise InvalidImageError("HEIF has no item properties")
+    ipco = find_box(data, iprp[0], iprp[1], b"ipco")
+    if ipco is None:
+        raise InvalidImageError("HEIF has no item properties")
+    properties = list(iter_boxes(data, ipco[0], ipco[1]))
+
+    # Property indexes (starting from 1) associated with the primary item
+    indexes: list[int] = []
+    ipma = find_box(data, iprp[0], iprp[1], b"ipma")
+    if ipma is not None and primary_item is not None:
+        version, _, flags, entry_count = unpack(">BBHI", data, ipma[0])
+        large_indexes = flags & 1
+        offset = ipma[0] + 8
+        for _ in range(entry_count):
+            if version == 0:
+                (item_id,) = unpack(">H", data, offset)
+                offset += 2
+            else:
+                (item_id,) = unpack(">I", data, offset)
+                offset += 4
+            (count,) = unpack(">B", data, offset)
+            offset += 1
+            for _ in range(count):
+                if large_indexes:
+                    (value,) = unpack(">H", data, offset)
+                    index = value & 0x7FFF
+                    offset += 2
+                else:
+                    (value,) = unpack(">B", data, offset)
+                    index = value & 0x7F
+                    offset += 1
+                if item_id == primary_item:
+                    indexes.append(index)
+
+    primary_properties = [properties[i - 1] for i in indexes if 0 < i <= len(properties)]
+    sizes = [
+        unpack(">II", data, start + 4)
+        for box_type, start, _ in primary_properties or properties
+        if box_type == b"ispe"
+    ]
+    if not sizes:
+        raise InvalidImageError("HEIF has no image size")
+    # Without an association for the primary item, the largest image isn't a thumbnail
+    width, height = max(sizes, key=lambda size: size[0] * size[1])
+
+    for box_type, start, _ in primary_properties:
+        if box_type == b"irot":
+            (angle,) = unpack(">B", data, start)
+            if angle & 1:
+                width, height = height, width
+    return ImageInfo(image_format, width, height, 1)
+
+
+def sniff_tiff(data: Buffer, limit: int) -> ImageInfo:
+    tags = parse_tiff(data, 0, limit)
+    if TIFF_WIDTH not in tags or TIFF_HEIGHT not in tags:
+        raise InvalidImageError("TIFF has no image size")
+    orientation = tags.get(TIFF_ORIENTATION, 1)
+    return ImageInfo(
+        "tiff", tags[TIFF_WIDTH], tags[TIFF_HEIGHT], orientation if 1 <= orientation <= 8 else 1
+    )
+
+
+def sniff_buffer(data: Buffer, limit: int) -> ImageInfo:
+    """
+    Read the header of an image from the start of `data`, where the image may continue up to
+    `limit` bytes. Raises TruncatedError if more data is needed.
+    """
+    signature = bytes(data[:12])
+    if signature.startswith(b"\xff\xd8"):
+        return sniff_jpeg(data, limit)
+    if signature.startswith(b"\x89PNG\r\n\x1a\n"):
+        return sniff_png(data, limit)
+    if signature.startswith((b"GIF87a", b"GIF89a")):
+        return sniff_gif(data, limit)
+    if signature.startswith(b"RIFF") and signature[8:12] == b"WEBP":
+        return sniff_webp(data, limit)
+    if signature[4:8] == b"ftyp":
+        return sniff_heif(data, limit)
+    if signature.startswith((b"II*\x00", b"MM\x00*")):
+        return sniff_tiff(data, limit)
+    if len(signature) < 12 and len(data) < limit:
+        raise TruncatedError(12)
+    raise InvalidImageError("Unsupported image format")
+
+
+def sniff(data: Buffer) -> ImageInfo:
+    """
+    Return the format, size and EXIF orientation of an image from its header, where `data` is
+    the start of the image (or all of it).
+
+    The width and height are of the image as stored - apply the orientation (which imgproxy does
+    unless auto_rotate is disabled) to get the size it's displayed at.
+    """
+    try:
+        return sniff_buffer(data, len(data))
+    except TruncatedError:
+        raise InvalidImageError("Image header is truncated") from None
+
+
+def sniff_file(path: Union[str, "os.PathLike[str]"]) -> ImageInfo:
+    """
+    Return the format, size and EXIF orientation of an image file, as with `sniff`. The file is
+    memory mapped, so only the parts of it which are needed are read.
+    """
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            raise InvalidImageError("Image file is empty") from None
+        with mapped:
+            return sniff(mapped)
+
+
+def sniff_stream(
+    stream: IO[bytes], max_bytes: int = MAX_BYTES, chunk_size: int = CHUNK_SIZE
+) -> ImageInfo:
+    """
+    Return the format, size and EXIF orientation of an image from a stream, as with `sniff`.
+    Only as much of the stream as is needed is read, in chunks of `chunk_size` bytes up to
+    `max_bytes`.
+    """
+    data = bytearray()
+    needed = chunk_size
+    complete = False
+    while True:
+        while len(data) < needed and not complete:
+            chunk = stream.read(needed - len(data))
+            if not chunk:
+                complete = True
+            data += chunk
+
+        try:
+            return sniff_buffer(data, len(data) if complete else max_bytes)
+        except TruncatedError as e:
+            if complete:
+                raise InvalidImageError("Image header is truncated") from None
+            if e.size > max_bytes:
+                msg = f"Image header is larger than {max_bytes} bytes"
+                raise InvalidImageError(msg) from None
+            needed = min(max(e.size, len(data) + chunk_size), max_bytes)
+
+
+def sniff_url(
+    url: str,
+    timeout: Optional[float] = 30.0,
+    max_bytes: int = MAX_BYTES,
+    headers: Optional[Mapping[str, str]] = None,
+    ssl_context: Optional[ssl.SSLContext] = None,
+) -> ImageInfo:
+    """
+    Return the format, size and EXIF orientation of an image from a URL, as with `sniff`.
+
+    A range request is made for at most `max_bytes`, and the connection is closed as soon as the
+    header has been read - so servers which ignore the range don't send the whole image either.
+    Raises FetchTimeoutError if the connection times out, or FetchError if it fails.
+    """
+    (scheme, host, port), target = request_target(url)
+    connection: http.client.HTTPConnection
+    if scheme == "https":
+        connection = http.client.HTTPSConnection(host, port, timeout=timeout, context=ssl_context)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    request_headers = {
+        "User-Agent": USER_AGENT,
+        "Accept": "*/*",
+        "Range": f"bytes=0-{max_bytes - 1}",
+        **(headers or {}),
+    }
+    try:
+        connection.request("GET", target, headers=request_headers)
+        response = connection.getresponse()
+        if response.status not in (200, 206):
+            msg = f"Error fetching {url}: {response.status} {response.reason}"
+            raise FetchError(msg)
+        return sniff_stream(response, max_bytes=max_bytes)
+    except socket.timeout as e:
+        msg = f"Timed out fetching {url}"
+        raise FetchTimeoutError(msg) from e
+    except (OSError, http.client.HTTPException) as e:
+        msg = f"Error fetching {url}: {e!r}"
+        raise FetchError(msg) from e
+    finally:
+        connection.close()
@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import threading
+import weakref
+from collections.abc import Hashable, Iterable
+from typing import Any, Optional, Union
+
+from .cache import CacheKey
+
+INSERT_URLS = "INSERT OR REPLACE INTO urls (namespace, image, url) VALUES (?, ?, ?)"
+
+
+class URLStore:
+    """
+    A persistent store of URLs in an SQLite database, so that URLs signed before a restart or
+    deploy don't need to be signed again.
+
+    URLs are kept in memory once loaded. The URLs for each ImgProxy configuration are loaded
+    from the database the first time one of them is looked up, and new URLs are written to the
+    database in batches - call `flush` (or `close`) to write any remaining URLs, which is also done
+    when the store is garbage collected or the process exits.
+
+    Keys include a fingerprint of the ImgProxy settings, so changing the key or salt (or any other
+    setting which affects URLs) means URLs stored with the old settings are never used. Call
+    `prune` with the fingerprints still in use to remove them.
+    """
+
+    def __init__(self, path: Union[str, "os.PathLike[str]"], batch_size: int = 1000) -> None:
+        self.path = os.fspath(path)
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._urls: dict[bytes, dict[bytes, str]] = {}
+        self._pending: list[tuple[bytes, bytes, str]] = []
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+        # Write any remaining URLs if the store is never closed. The finaliser only holds a weak
+        # reference to the store, so it doesn't keep the store alive until the process exits.
+        self._finalizer = weakref.finalize(
+            self, write_pending_urls, self.path, self._pending, self._lock
+        )
+
+    def __repr__(self) -> str:
+        return f"<URLStore {self.path}>"
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"path": self.path, "batch_size": self.batch_size}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(**state)  # type: ignore[misc]
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections can't be used after forking, so each process opens its own
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection_pid = os.getpid()
+            # Losing the last few batches in a power failure only means signing those URLs again,
+            # so durability is traded for much cheaper writes
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS urls ("
+                    "namespace BLOB NOT NULL, image BLOB NOT NULL, url TEXT NOT NULL, "
+                    "PRIMARY KEY (namespace, image)"
+                    ") WITHOUT ROWID"
+                )
+        return self._connection
+
+    def _split_key(self, key: Hashable) -> tuple[bytes, bytes]:
+        """
+        Return the namespace and the rest of a key as bytes. The namespace is the ImgProxy
+        fingerprint at the start of the key, if there is one.
+        """
+        # CacheKeys are already bytes, and are used as they are - hashing them would cost as much
+        # as signing the URL again
+        if isinstance(key, CacheKey):
+            return key
+        namespace = b""
+        if isinstance(key, tuple) and key and isinstance(key[0], bytes):
+            namespace = key[0]
+        # repr is stable across processes for the strings, bytes and tuples used as other keys
+        return namespace, repr(key).encode()
+
+    def _load(self, namespace: bytes) -> dict[bytes, str]:
+        urls = self._urls.get(namespace)
+        if urls is None:
+            rows = self._connect().execute(
+                "SELECT image, url FROM urls WHERE namespace = ?", (namespace,)
+            )
+            urls = self._urls[namespace] = dict(rows)
+        return urls
+
+    def get(self, key: Hashable) -> Optional[str]:
+        namespace, image = self._split_key(key)
+        with self._lock:
+            url = self._load(namespace).get(image)
+            if url is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return url
+
+    def set(self, key: Hashable, value: str) -> None:
+        namespace, image = self._split_key(key)
+        with self._lock:
+            self._load(namespace)[image] = value
+            self._pending.append((namespace, image, value))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        with self._connect() as connection:
+            connection.executemany(INSERT_URLS, self._pending)
+        self._pending.clear()
+
+    def flush(self) -> None:
+        """
+        Write any URLs which haven't been written to the database yet.
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+        self._finalizer.detach()
+
+    def clear(self) -> None:
+        """
+        Remove every URL, including those for other ImgProxy configurations.
+        """
+        with self._lock:
+            self._pending.clear()
+            self._urls.clear()
+            with self._connect() as connection:
+                connection.execute("DELETE FROM urls")
+
+    def prune(self, fingerprints: Iterable[bytes]) -> int:
+        """
+        Remove the URLs for every ImgProxy configuration except those with the given
+        fingerprints, such as the URLs signed with old keys after a key rotation. Returns the
+        number of URLs removed.
+        """
+        keep = set(fingerprints)
+        with self._lock:
+            self._flush()
+            for namespace in list(self._urls):
+                if namespace not in keep:
+                    del self._urls[namespace]
+            # Only the placeholders are formatted into the query
+            placeholders = ", ".join("?" * len(keep))
+            with self._connect() as connection:
+                cursor = connection.execute(
+                    f"DELETE FROM urls WHERE namespace NOT IN ({placeholders})",  # noqa:S608
+                    list(keep),
+                )
+            return cursor.rowcount
+
+
+def write_pending_urls(
+    path: str, pending: list[tuple[bytes, bytes, str]], lock: threading.Lock
+) -> None:
+    """
+    Write the URLs a URLStore hasn't written to the database yet, with a new connection - used
+    when a store is garbage collected or the process exits without it being closed.
+    """
+    with lock:
+        if not pending:
+            return
+        connection = sqlite3.connect(path)
+        try:
+            with connection:
+                connection.executemany(INSERT_URLS, pending)
+        finally:
+            connection.close()
+        pending.clear()
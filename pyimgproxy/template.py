@@ -0,0 +1,69 @@
+import hmac
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .imgproxy import ImgProxy
+
+
+class URLTemplate:
+    """
+    A fixed chain of processing options which can be applied to any source URL.
+
+    The options path is joined and encoded once, and the signing state is fed with the salt and
+    options path up front - so only the source URL needs to be encoded and hashed for each URL.
+    """
+
+    def __init__(self, imgproxy: "ImgProxy", options: Iterable[str] = ()) -> None:
+        self.imgproxy = imgproxy
+        self.options = list(options)
+
+        self._options_path = imgproxy.options_path(self.options)
+        self._signer: Optional[hmac.HMAC] = None
+
+        if imgproxy.signer is not None:
+            self._signer = imgproxy.signer.copy()
+            self._signer.update(self._options_path)
+            self._prefix = f"{imgproxy.url}/"
+        else:
+            # No signature checking - the signature part may contain anything
+            self._prefix = f"{imgproxy.url}{self._options_path.decode()}"
+
+    def __repr__(self) -> str:
+        return f"<URLTemplate {'/'.join(self.options)}>"
+
+    def __call__(self, source_url: str) -> str:
+        image_path = self.imgproxy.source_path(source_url)
+
+        if self._signer is None:
+            return self._prefix + image_path.decode()
+
+        signer = self._signer.copy()
+        signer.update(image_path)
+        signature = self.imgproxy.encode_signature(signer.digest())
+
+        return self._prefix + (signature + self._options_path + image_path).decode()
+
+    def urls(self, source_urls: Iterable[str]) -> Iterator[str]:
+        """
+        Generate URLs for each of the source URLs in turn, so any number of source URLs can be
+        processed without holding every URL in memory.
+        """
+        if self._signer is None:
+            for source_url in source_urls:
+                yield self(source_url)
+            return
+
+        # Attribute lookups are hoisted out of the loop as this is used for very large batches
+        source_path = self.imgproxy.source_path
+        encode_signature = self.imgproxy.encode_signature
+        copy_signer = self._signer.copy
+        prefix = self._prefix
+        options_path = self._options_path
+
+        for source_url in source_urls:
+            image_path = source_path(source_url)
+            signer = copy_signer()
+            signer.update(image_path)
+            signature = encode_signature(signer.digest())
+            yield prefix + (signature + options_path + image_path).decode()
@@ -0,0 +1,99 @@
+import random
+from unittest import TestCase, skipIf
+
+from pyimgproxy.batch_dimensions import output_sizes
+from pyimgproxy.dimensions import output_size
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Option chains covering every branch of the calculation
+OPTION_CHAINS = [
+    [],
+    ["size:300:200"],
+    ["resize:fit:300:200"],
+    ["resize:fill:300:200"],
+    ["resize:fill-down:300:200"],
+    ["resize:fill-down:3000:2000"],
+    ["resize:fill-down:3000:200"],
+    ["resize:force:300:200"],
+    ["resize:force:300"],
+    ["resize:auto:300:200"],
+    ["resize:auto:200:300"],
+    ["width:300"],
+    ["height:300"],
+    ["width:5000"],
+    ["width:5000", "enlarge:1"],
+    ["resize:fill:300:200:1"],
+    ["resize:fill-down:3000:2000:1"],
+    ["width:300", "dpr:2"],
+    ["width:300", "dpr:3.5"],
+    ["resize:fill:300:200", "dpr:2"],
+    ["resize:fill-down:3000:200", "dpr:3"],
+    ["width:300", "zoom:0.5"],
+    ["resize:fill:300:200", "zoom:1.5:0.75"],
+    ["min-width:500"],
+    ["min-height:500"],
+    ["width:300", "min-width:500"],
+    ["height:100", "min-height:250", "dpr:2"],
+    ["resize:fit:300:300", "min-width:400", "min-height:400"],
+    ["size:3000:3000:0:1"],
+    ["size:300:3000:0:1", "dpr:2"],
+    ["size:300:200", "extend_ar:1"],
+    ["resize:fill-down:3000:2000", "extend_ar:1"],
+    ["crop:500:300"],
+    ["crop:0.5:0.25", "resize:fill:300:300"],
+    ["padding:10:20:30:40"],
+    ["width:300", "padding:5", "dpr:1.5"],
+    ["rotate:90", "resize:fill:300:200"],
+    ["auto_rotate:0", "size:300:200"],
+]
+
+
+@skipIf(np is None, "NumPy isn't installed")
+class OutputSizesTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = random.Random(1)  # noqa:S311
+        # Random sizes, plus tiny and odd sizes which exercise rounding
+        cls.widths = [rng.randint(1, 8000) for _ in range(500)] + [1, 1, 2, 3, 1000, 1001, 999]
+        cls.heights = [rng.randint(1, 8000) for _ in range(500)] + [1, 7, 2, 3, 501, 1000, 333]
+        cls.orientations = [rng.randint(1, 8) for _ in cls.widths]
+
+    def test_matches_output_size(self):
+        for options in OPTION_CHAINS:
+            with self.subTest(options=options):
+                widths, heights = output_sizes(
+                    self.widths, self.heights, options, orientations=self.orientations
+                )
+
+                expected = [
+                    output_size(width, height, options, orientation=orientation)
+                    for width, height, orientation in zip(
+                        self.widths, self.heights, self.orientations
+                    )
+                ]
+                self.assertEqual(list(zip(widths.tolist(), heights.tolist())), expected)
+
+    def test_arrays(self):
+        widths, heights = output_sizes(np.array([1000, 500]), np.array([500, 1000]), ["width:100"])
+
+        self.assertEqual(widths.dtype, np.int64)
+        self.assertEqual(widths.tolist(), [100, 100])
+        self.assertEqual(heights.tolist(), [50, 200])
+
+    def test_without_orientations(self):
+        widths, heights = output_sizes([1000], [500], ["rotate:90"])
+
+        self.assertEqual((widths.tolist(), heights.tolist()), ([500], [1000]))
+
+    def test_shape_mismatch(self):
+        with self.assertRaises(ValueError):
+            output_sizes([1000, 500], [500], [])
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            output_sizes([1000], [500], ["resize:squash:100"])
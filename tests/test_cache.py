@@ -0,0 +1,222 @@
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+from unittest import TestCase
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.cache import CacheInfo, LRUCache, SharedURLCache
+
+
+class LRUCacheTestCase(TestCase):
+    def test_repr(self):
+        cache = LRUCache(maxsize=10)
+        cache.set("a", "1")
+
+        self.assertEqual(repr(cache), "<LRUCache 1/10>")
+
+    def test_get_set(self):
+        cache = LRUCache(maxsize=10)
+
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", "1")
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(len(cache), 1)
+
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+
+        # Using a makes b the least recently used
+        cache.get("a")
+        cache.set("c", "3")
+
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "3")
+
+    def test_info(self):
+        cache = LRUCache(maxsize=1)
+        cache.get("a")
+        cache.set("a", "1")
+        cache.get("a")
+        cache.set("b", "2")
+
+        self.assertEqual(
+            cache.info(), CacheInfo(hits=1, misses=1, evictions=1, maxsize=1, currsize=1)
+        )
+
+    def test_clear(self):
+        cache = LRUCache(maxsize=10)
+        cache.set("a", "1")
+
+        cache.clear()
+
+        self.assertEqual(len(cache), 0)
+
+    def test_pickle(self):
+        cache = LRUCache(maxsize=10)
+        cache.set("a", "1")
+
+        unpickled = pickle.loads(pickle.dumps(cache))  # noqa:S301
+
+        self.assertEqual(unpickled.maxsize, 10)
+        self.assertEqual(len(unpickled), 0)
+
+    def test_invalid_maxsize(self):
+        with self.assertRaises(ValueError):
+            LRUCache(maxsize=0)
+
+    def test_threads(self):
+        cache = LRUCache(maxsize=50)
+
+        def worker(offset):
+            for i in range(1000):
+                key = (offset + i) % 100
+                if cache.get(key) is None:
+                    cache.set(key, str(key))
+
+        threads = [threading.Thread(target=worker, args=(i * 10,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        info = cache.info()
+        self.assertEqual(info.hits + info.misses, 8000)
+        self.assertEqual(info.currsize, 50)
+
+
+def shared_cache_worker(path, start, stop):
+    cache = SharedURLCache(path, slots=256)
+    for i in range(start, stop):
+        cache.set(("key", i), f"https://example.org/{i}")
+    cache.close()
+
+
+class SharedURLCacheTestCase(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "urls.cache")
+        return super().setUp()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def test_repr(self):
+        cache = SharedURLCache(self.path, slots=16)
+
+        self.assertEqual(repr(cache), f"<SharedURLCache {self.path}>")
+
+    def test_get_set(self):
+        cache = SharedURLCache(self.path, slots=16)
+
+        self.assertIsNone(cache.get(("a", ("width:100", None))))
+        cache.set(("a", ("width:100", None)), "https://example.org/a")
+        self.assertEqual(cache.get(("a", ("width:100", None))), "https://example.org/a")
+
+    def test_overwrite(self):
+        cache = SharedURLCache(self.path, slots=16)
+
+        cache.set("a", "https://example.org/1")
+        cache.set("a", "https://example.org/2")
+
+        self.assertEqual(cache.get("a"), "https://example.org/2")
+        self.assertEqual(cache.info().currsize, 1)
+
+    def test_shared(self):
+        cache = SharedURLCache(self.path, slots=16)
+        other_cache = SharedURLCache(self.path, slots=16)
+
+        cache.set("a", "https://example.org/a")
+
+        self.assertEqual(other_cache.get("a"), "https://example.org/a")
+
+    def test_eviction(self):
+        cache = SharedURLCache(self.path, slots=4, probes=4)
+
+        for i in range(10):
+            cache.set(i, f"https://example.org/{i}")
+
+        info = cache.info()
+        self.assertEqual(info.currsize, 4)
+        self.assertEqual(info.evictions, 6)
+        self.assertEqual(cache.get(9), "https://example.org/9")
+
+    def test_too_large(self):
+        cache = SharedURLCache(self.path, slots=16, slot_size=64)
+
+        cache.set("a", "https://example.org/" + "a" * 100)
+
+        self.assertIsNone(cache.get("a"))
+
+    def test_partial_write(self):
+        cache = SharedURLCache(self.path, slots=1)
+        cache.set("a", "https://example.org/a")
+
+        # Simulate a crash part way through writing a new value over the old one
+        value_offset = SharedURLCache.FILE_HEADER_SIZE + SharedURLCache.SLOT_HEADER.size
+        cache._mmap[value_offset : value_offset + 5] = b"XXXXX"
+
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", "https://example.org/a")
+        self.assertEqual(cache.get("a"), "https://example.org/a")
+
+    def test_clear(self):
+        cache = SharedURLCache(self.path, slots=16)
+        cache.set("a", "https://example.org/a")
+
+        cache.clear()
+
+        self.assertIsNone(cache.get("a"))
+
+    def test_different_dimensions(self):
+        SharedURLCache(self.path, slots=16)
+
+        with self.assertRaises(ValueError):
+            SharedURLCache(self.path, slots=32)
+
+    def test_invalid_dimensions(self):
+        with self.assertRaises(ValueError):
+            SharedURLCache(self.path, slots=0)
+        with self.assertRaises(ValueError):
+            SharedURLCache(self.path, slot_size=16)
+
+    def test_pickle(self):
+        cache = SharedURLCache(self.path, slots=16)
+        cache.set("a", "https://example.org/a")
+
+        unpickled = pickle.loads(pickle.dumps(cache))  # noqa:S301
+
+        self.assertEqual(unpickled.get("a"), "https://example.org/a")
+
+    def test_processes(self):
+        SharedURLCache(self.path, slots=256)
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=shared_cache_worker, args=(self.path, i * 25, (i + 1) * 25))
+            for i in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        cache = SharedURLCache(self.path, slots=256)
+        for i in range(100):
+            self.assertEqual(cache.get(("key", i)), f"https://example.org/{i}")
+
+    def test_imgproxy(self):
+        cache = SharedURLCache(self.path, slots=16)
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", url_cache=cache)
+        other_imgproxy = ImgProxy(url="https://example.org/other", url_cache=cache)
+
+        url = imgproxy.image("demo.png").width(100).url
+        other_url = other_imgproxy.image("demo.png").width(100).url
+
+        self.assertEqual(url, "https://example.org/thumbnail/width:100/plain/demo.png")
+        self.assertEqual(other_url, "https://example.org/other/width:100/plain/demo.png")
+        self.assertEqual(cache.info().currsize, 2)
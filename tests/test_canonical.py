@@ -0,0 +1,207 @@
+from unittest import TestCase
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.canonical import canonicalise
+
+
+class CanonicaliseTestCase(TestCase):
+    def test_overridden(self):
+        self.assertEqual(canonicalise(["quality:50", "quality:80"]), ["quality:80"])
+
+    def test_sorted(self):
+        self.assertEqual(
+            canonicalise(["quality:80", "format:webp", "blur:2"]),
+            ["blur:2", "format:webp", "quality:80"],
+        )
+
+    def test_size(self):
+        self.assertEqual(canonicalise(["height:50", "width:200"]), ["size:200:50"])
+
+    def test_resize(self):
+        self.assertEqual(
+            canonicalise(["width:200", "resizing_type:fill", "height:50"]),
+            ["resize:fill:200:50"],
+        )
+
+    def test_resize_fit(self):
+        self.assertEqual(canonicalise(["resize:fit:200:50"]), ["size:200:50"])
+
+    def test_resize_empty_arguments(self):
+        # Empty arguments leave earlier values unchanged
+        self.assertEqual(canonicalise(["width:200", "size::50"]), ["size:200:50"])
+
+    def test_resize_defaults(self):
+        self.assertEqual(canonicalise(["resize:fit:0:0:false:false"]), [])
+
+    def test_enlarge(self):
+        self.assertEqual(canonicalise(["enlarge:True", "width:100"]), ["size:100::1"])
+
+    def test_extend(self):
+        self.assertEqual(
+            canonicalise(["size:100:100::1:we:10", "extend:true"]),
+            ["size:100:100::1:we:10"],
+        )
+
+    def test_extend_disabled(self):
+        self.assertEqual(canonicalise(["extend:1:we", "extend:0"]), [])
+
+    def test_crop(self):
+        # Arguments which are missing or empty keep their earlier values
+        self.assertEqual(canonicalise(["crop:50:50:no", "crop:100:100"]), ["crop:100:100:no"])
+        self.assertEqual(canonicalise(["crop:50:50:no", "crop::100"]), ["crop:50:100:no"])
+        self.assertEqual(
+            canonicalise(["crop:50:50:nowe:10:20", "crop:100:100:so"]), ["crop:100:100:so:10:20"]
+        )
+
+    def test_padding(self):
+        self.assertEqual(canonicalise(["padding:10", "padding::20"]), ["padding:10:20"])
+        # The first argument sets every side
+        self.assertEqual(canonicalise(["padding:10:20", "padding:5"]), ["padding:5"])
+        self.assertEqual(canonicalise(["padding:10:20:10:20"]), ["padding:10:20"])
+        self.assertEqual(canonicalise(["padding:1:2:3", "padding::::4"]), ["padding:1:2:3:4"])
+        self.assertEqual(canonicalise(["padding:10", "padding:0"]), [])
+
+    def test_extend_aspect_ratio(self):
+        self.assertEqual(
+            canonicalise(["extend_ar:1:no", "extend_ar:1"]), ["extend_aspect_ratio:1:no"]
+        )
+
+    def test_extend_gravity_offsets(self):
+        self.assertEqual(canonicalise(["extend:1:we:5", "extend:1:ea"]), ["size::::1:ea:5"])
+
+    def test_gravity(self):
+        self.assertEqual(canonicalise(["gravity:nowe:10:20", "gravity:no"]), ["gravity:no:10:20"])
+        # Smart gravity has no offsets
+        self.assertEqual(canonicalise(["gravity:fp:0.3:0.4", "gravity:sm"]), ["gravity:sm"])
+
+    def test_trim(self):
+        self.assertEqual(canonicalise(["trim:10:ff0000", "trim:20"]), ["trim:20:ff0000"])
+
+    def test_adjust(self):
+        self.assertEqual(
+            canonicalise(["adjust:10:1.5", "brightness:20", "saturation:1"]),
+            ["adjust:20:1.5"],
+        )
+
+    def test_defaults(self):
+        self.assertEqual(
+            canonicalise(
+                ["dpr:1", "quality:0", "gravity:ce:0:0", "zoom:1:1", "rotate:0", "pages:1.0"]
+            ),
+            [],
+        )
+
+    def test_server_defaults_kept(self):
+        self.assertEqual(canonicalise(["strip_metadata:false"]), ["strip_metadata:0"])
+
+    def test_numbers(self):
+        self.assertEqual(canonicalise(["quality:080", "dpr:2.0"]), ["dpr:2", "quality:80"])
+
+    def test_strings_unchanged(self):
+        self.assertEqual(
+            canonicalise(["cachebuster:001", "background:000000"]),
+            ["background:000000", "cachebuster:001"],
+        )
+
+    def test_focus_point_gravity(self):
+        self.assertEqual(canonicalise(["gravity:fp:0.5:0"]), ["gravity:fp:0.5:0"])
+
+    def test_short_names(self):
+        self.assertEqual(canonicalise(["w:100", "q:80", "width:200"]), ["quality:80", "size:200"])
+
+    def test_short_options(self):
+        self.assertEqual(
+            canonicalise(["width:100", "quality:80"], short_options=True), ["q:80", "s:100"]
+        )
+
+    def test_preset(self):
+        options = ["pr:thumbnail", "width:100", "width:200"]
+
+        self.assertEqual(canonicalise(options), options)
+
+
+class CanonicalURLTestCase(TestCase):
+    def setUp(self):
+        self.imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+            canonicalise_options=True,
+        )
+        self.image = self.imgproxy.image("demo.png")
+        return super().setUp()
+
+    def assertSameURL(self, *images):  # noqa:N802
+        urls = {image.url.encode() for image in images}
+        self.assertEqual(len(urls), 1, urls)
+
+    def test_overridden(self):
+        self.assertSameURL(self.image.width(100).width(200), self.image.width(200))
+
+    def test_order(self):
+        self.assertSameURL(
+            self.image.height(50).width(200),
+            self.image.width(200).height(50),
+            self.image.size(200, 50),
+            self.image.resize("fit", 200, 50),
+        )
+
+    def test_resize(self):
+        self.assertSameURL(
+            self.image.resizing_type("fill").width(320).height(240),
+            self.image.resize("fill", 320, 240),
+            self.image.size(320, 240).resizing_type("fill"),
+            self.image.resize("fit", 320, 240).resizing_type("fill").enlarge(False),
+        )
+
+    def test_defaults(self):
+        self.assertSameURL(
+            self.image.width(100).dpr(1).quality(0).gravity("ce", 0, 0),
+            self.image.width(100),
+        )
+
+    def test_mixed(self):
+        self.assertSameURL(
+            self.image.format("webp").quality(70).width(640).quality(80).height(480),
+            self.image.size(640, 480).quality(80).format("webp"),
+            self.image.add_option("f", "webp").add_option("q", 80).add_option("s", 640, 480),
+        )
+
+    def test_repeated_options(self):
+        self.assertSameURL(
+            self.image.crop(50, 50, "no").crop(100, 100), self.image.crop(100, 100, "no")
+        )
+        self.assertSameURL(self.image.padding(10).padding(None, 20), self.image.padding(10, 20))
+        self.assertSameURL(
+            self.image.extend_aspect_ratio(True, "no").extend_aspect_ratio(True),
+            self.image.extend_aspect_ratio(True, "no"),
+        )
+        self.assertSameURL(
+            self.image.trim(10, "ff0000", True).trim(20),
+            self.image.trim(20, "ff0000", True),
+        )
+        self.assertNotEqual(
+            self.image.crop(50, 50, "no").crop(100, 100).url, self.image.crop(100, 100).url
+        )
+
+    def test_different(self):
+        self.assertNotEqual(self.image.width(100).url, self.image.width(200).url)
+        self.assertNotEqual(
+            self.image.resize("fill", 100, 100).url, self.image.resize("fit", 100, 100).url
+        )
+
+    def test_template(self):
+        template = self.imgproxy.template(["quality:50", "width:100", "quality:80"])
+
+        self.assertEqual(template("demo.png"), self.image.width(100).quality(80).url)
+
+    def test_url(self):
+        image = self.image.height(480).width(640).dpr(1)
+
+        self.assertEqual(
+            image.url,
+            (
+                "https://example.org/"
+                "thumbnail/muzV--3ARhtX_iCFwE_kLkzvohwQIJLZloJpBBg7MkQ/size:640:480/plain/demo.png"
+            ),
+        )
@@ -0,0 +1,528 @@
+import asyncio
+import os
+import ssl
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase, mock
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.client import (
+    AsyncImgProxyClient,
+    ImgProxyClient,
+    PendingFetches,
+    Response,
+    default_ssl_context,
+    host_header,
+    request_target,
+)
+from pyimgproxy.exceptions import FetchError, FetchTimeoutError
+
+BODY = b"\x89PNG" + bytes(range(256)) * 1024
+
+
+class ImageRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_HEAD(self):  # noqa:N802
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+
+    def do_GET(self):  # noqa:N802
+        self.server.paths.append(self.path)
+        if "/slow/" in self.path:
+            time.sleep(0.5)
+        if "/missing/" in self.path:
+            self.send_error(404)
+        elif "/chunked/" in self.path:
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(BODY), 100_000):
+                chunk = BODY[start : start + 100_000]
+                self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        elif "/invalid-length/" in self.path:
+            self.send_response(200)
+            self.send_header("Content-Length", "many")
+            self.end_headers()
+            self.wfile.write(BODY)
+            self.close_connection = True
+        elif "/long-header/" in self.path:
+            self.send_response(200)
+            self.send_header("X-Long", "a" * 100_000)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+        elif "/close/" in self.path:
+            self.send_response(200)
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(BODY)
+            self.close_connection = True
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+            # Close the connection without telling the client, like an idle timeout
+            self.close_connection = "/drop/" in self.path
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ImageServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients disconnecting early (such as after a timeout) are expected
+        pass
+
+
+class ImageServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ImageServer(("127.0.0.1", 0), ImageRequestHandler)
+        cls.server.connections = 0
+        cls.server.paths = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.connections = 0
+        self.server.paths.clear()
+        host, port = self.server.server_address
+        self.imgproxy = ImgProxy(url=f"http://{host}:{port}", key="1" * 16, salt="2" * 16)
+        return super().setUp()
+
+
+class RequestTargetTestCase(TestCase):
+    def test_request_target(self):
+        self.assertEqual(
+            request_target("https://example.org/thumbnail/abc/plain/demo.png"),
+            (("https", "example.org", 443), "/thumbnail/abc/plain/demo.png"),
+        )
+        self.assertEqual(
+            request_target("http://127.0.0.1:8080/abc?hello=world"),
+            (("http", "127.0.0.1", 8080), "/abc?hello=world"),
+        )
+
+    def test_unsupported(self):
+        with self.assertRaises(FetchError):
+            request_target("ftp://example.org/demo.png")
+
+    def test_host_header(self):
+        for url, expected in [
+            ("https://example.org/demo.png", "example.org"),
+            ("http://example.org:8080/demo.png", "example.org:8080"),
+            ("http://example.org:443/demo.png", "example.org:443"),
+            ("http://[::1]/demo.png", "[::1]"),
+            ("https://[2001:db8::1]:8443/demo.png", "[2001:db8::1]:8443"),
+        ]:
+            with self.subTest(url=url):
+                origin, _target = request_target(url)
+                self.assertEqual(host_header(origin), expected)
+
+    def test_default_ssl_context(self):
+        self.assertIsInstance(default_ssl_context(), ssl.SSLContext)
+        # Loading the CA certificates is slow, so the context is shared
+        self.assertIs(default_ssl_context(), default_ssl_context())
+
+
+class PendingFetchesTestCase(TestCase):
+    def setUp(self):
+        self.imgproxy = ImgProxy(url="https://example.org/thumbnail")
+        self.images = [self.imgproxy.image(f"{i}.png") for i in range(5)]
+        return super().setUp()
+
+    def test_limit(self):
+        images = iter(self.images)
+
+        pending = PendingFetches(images, limit=2, submit=lambda image: Future())
+
+        self.assertEqual(list(pending.futures.values()), self.images[:2])
+        future = next(iter(pending.futures))
+        response = Response(url="", status=200, headers={}, body=b"", size=0)
+        future.set_result(response)
+        self.assertEqual(
+            pending.complete(future, return_exceptions=False), (self.images[0], response)
+        )
+        self.assertEqual(list(pending.futures.values()), self.images[1:3])
+        self.assertEqual(next(images), self.images[3])
+
+    def test_exception(self):
+        pending = PendingFetches(self.images, limit=2, submit=lambda image: Future())
+        first, second = pending.futures
+        error = FetchError("Connection closed")
+        first.set_exception(error)
+        second.set_exception(error)
+
+        self.assertEqual(pending.complete(first, return_exceptions=True), (self.images[0], error))
+        with self.assertRaises(FetchError):
+            pending.complete(second, return_exceptions=False)
+
+    def test_cancel(self):
+        pending = PendingFetches(self.images, limit=2, submit=lambda image: Future())
+
+        pending.cancel()
+
+        self.assertTrue(all(future.cancelled() for future in pending.futures))
+
+
+class AsyncImgProxyClientTestCase(ImageServerMixin, TestCase):
+    def run_client(self, func, **kwargs):
+        async def main():
+            async with AsyncImgProxyClient(self.imgproxy, **kwargs) as client:
+                return await func(client)
+
+        return asyncio.run(main())
+
+    def test_repr(self):
+        client = AsyncImgProxyClient(self.imgproxy)
+
+        self.assertEqual(repr(client), f"<AsyncImgProxyClient {self.imgproxy.url}>")
+
+    def test_fetch(self):
+        image = self.imgproxy.image("demo.png").size(width=640, height=480)
+
+        response = self.run_client(lambda client: client.fetch(image))
+
+        self.assertIsInstance(response, Response)
+        self.assertEqual(response.url, image.url)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.headers["content-type"], "image/png")
+        self.assertEqual(response.body, BODY)
+        self.assertEqual(response.size, len(BODY))
+        self.assertEqual(self.server.paths, [image.url.removeprefix(self.imgproxy.url)])
+
+    def test_keep_alive(self):
+        images = [self.imgproxy.image(f"{i}.png").width(100) for i in range(5)]
+
+        async def fetch(client):
+            return [await client.fetch(image) for image in images]
+
+        responses = self.run_client(fetch)
+
+        self.assertEqual([response.status for response in responses], [200] * 5)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_head(self):
+        image = self.imgproxy.image("demo.png")
+
+        async def fetch(client):
+            return [await client.fetch(image, method="HEAD") for _ in range(2)]
+
+        responses = self.run_client(fetch)
+
+        self.assertEqual(responses[0].status, 200)
+        self.assertEqual(responses[0].body, b"")
+        self.assertEqual(responses[0].size, 0)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_chunked(self):
+        image = self.imgproxy.image("chunked/demo.png")
+
+        response = self.run_client(lambda client: client.fetch(image))
+
+        self.assertEqual(response.body, BODY)
+
+    def test_connection_close(self):
+        image = self.imgproxy.image("close/demo.png")
+
+        async def fetch(client):
+            return [await client.fetch(image) for _ in range(2)]
+
+        responses = self.run_client(fetch)
+
+        self.assertEqual([response.body for response in responses], [BODY, BODY])
+        self.assertEqual(self.server.connections, 2)
+
+    def test_stale_connection(self):
+        image = self.imgproxy.image("drop/demo.png")
+
+        async def fetch(client):
+            responses = [await client.fetch(image)]
+            # Give the server time to close the connection
+            await asyncio.sleep(0.1)
+            responses.append(await client.fetch(image))
+            return responses
+
+        responses = self.run_client(fetch)
+
+        self.assertEqual([response.body for response in responses], [BODY, BODY])
+        self.assertEqual(self.server.connections, 2)
+
+    def test_error_response(self):
+        image = self.imgproxy.image("missing/demo.png")
+
+        response = self.run_client(lambda client: client.fetch(image))
+
+        self.assertEqual(response.status, 404)
+
+    def test_stream_to_file(self):
+        image = self.imgproxy.image("chunked/demo.png")
+
+        with tempfile.TemporaryFile() as f:
+            response = self.run_client(lambda client: client.fetch(image, output=f))
+            f.seek(0)
+
+            self.assertEqual(f.read(), BODY)
+        self.assertEqual(response.body, b"")
+        self.assertEqual(response.size, len(BODY))
+
+    def test_stream_to_file_descriptor(self):
+        image = self.imgproxy.image("demo.png")
+        fd, path = tempfile.mkstemp()
+        try:
+            response = self.run_client(lambda client: client.fetch(image, output=fd))
+            os.lseek(fd, 0, os.SEEK_SET)
+
+            self.assertEqual(os.read(fd, len(BODY) + 1), BODY)
+        finally:
+            os.close(fd)
+            os.unlink(path)
+        self.assertEqual(response.size, len(BODY))
+
+    def test_timeout(self):
+        image = self.imgproxy.image("slow/demo.png")
+
+        with self.assertRaises(FetchTimeoutError):
+            self.run_client(lambda client: client.fetch(image), timeout=0.1)
+
+    def test_invalid_content_length(self):
+        image = self.imgproxy.image("invalid-length/demo.png")
+
+        with self.assertRaises(FetchError):
+            self.run_client(lambda client: client.fetch(image))
+
+    def test_long_header(self):
+        image = self.imgproxy.image("long-header/demo.png")
+
+        with self.assertRaises(FetchError):
+            self.run_client(lambda client: client.fetch(image))
+
+    def test_ssl_context(self):
+        # No SSL context is created for http connections
+        with mock.patch("pyimgproxy.client.default_ssl_context") as default_context:
+            self.run_client(lambda client: client.fetch(self.imgproxy.image("demo.png")))
+
+        default_context.assert_not_called()
+
+    def test_connection_refused(self):
+        imgproxy = ImgProxy(url="http://127.0.0.1:1")
+
+        async def fetch():
+            async with AsyncImgProxyClient(imgproxy) as client:
+                await client.fetch(imgproxy.image("demo.png"))
+
+        with self.assertRaises(FetchError):
+            asyncio.run(fetch())
+
+    def test_fetch_many(self):
+        images = [self.imgproxy.image(f"{i}.png").width(100) for i in range(20)]
+
+        async def fetch(client):
+            return [result async for result in client.fetch_many(images)]
+
+        results = self.run_client(fetch, max_connections=4)
+
+        self.assertCountEqual([image for image, _response in results], images)
+        for image, response in results:
+            self.assertEqual(response.url, image.url)
+            self.assertEqual(response.body, BODY)
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_fetch_many_exceptions(self):
+        images = [self.imgproxy.image("demo.png"), self.imgproxy.image("slow/demo.png")]
+
+        async def fetch(client):
+            return dict([result async for result in client.fetch_many(images, **kwargs)])
+
+        kwargs = {"return_exceptions": True}
+        results = self.run_client(fetch, timeout=0.1)
+
+        self.assertEqual(results[images[0]].status, 200)
+        self.assertIsInstance(results[images[1]], FetchTimeoutError)
+
+        kwargs = {}
+        with self.assertRaises(FetchTimeoutError):
+            self.run_client(fetch, timeout=0.1)
+
+    def test_invalid_max_connections(self):
+        with self.assertRaises(ValueError):
+            AsyncImgProxyClient(self.imgproxy, max_connections=0)
+
+
+class ImgProxyClientTestCase(ImageServerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = ImgProxyClient(self.imgproxy)
+        self.addCleanup(self.client.close)
+
+    def test_repr(self):
+        self.assertEqual(repr(self.client), f"<ImgProxyClient {self.imgproxy.url}>")
+
+    def test_fetch(self):
+        image = self.imgproxy.image("demo.png").size(width=640, height=480)
+
+        response = self.client.fetch(image)
+
+        self.assertIsInstance(response, Response)
+        self.assertEqual(response.url, image.url)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.headers["content-type"], "image/png")
+        self.assertEqual(response.body, BODY)
+        self.assertEqual(response.size, len(BODY))
+
+    def test_keep_alive(self):
+        for i in range(5):
+            self.client.fetch(self.imgproxy.image(f"{i}.png"))
+
+        self.assertEqual(self.server.connections, 1)
+
+    def test_head(self):
+        response = self.client.fetch(self.imgproxy.image("demo.png"), method="HEAD")
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body, b"")
+
+    def test_chunked(self):
+        response = self.client.fetch(self.imgproxy.image("chunked/demo.png"))
+
+        self.assertEqual(response.body, BODY)
+
+    def test_connection_close(self):
+        image = self.imgproxy.image("close/demo.png")
+
+        responses = [self.client.fetch(image) for _ in range(2)]
+
+        self.assertEqual([response.body for response in responses], [BODY, BODY])
+        self.assertEqual(self.server.connections, 2)
+
+    def test_stale_connection(self):
+        image = self.imgproxy.image("drop/demo.png")
+
+        responses = [self.client.fetch(image)]
+        # Give the server time to close the connection
+        time.sleep(0.1)
+        responses.append(self.client.fetch(image))
+
+        self.assertEqual([response.body for response in responses], [BODY, BODY])
+        self.assertEqual(self.server.connections, 2)
+
+    def test_stream_to_file(self):
+        with tempfile.TemporaryFile() as f:
+            response = self.client.fetch(self.imgproxy.image("demo.png"), output=f)
+            f.seek(0)
+
+            self.assertEqual(f.read(), BODY)
+        self.assertEqual(response.body, b"")
+        self.assertEqual(response.size, len(BODY))
+
+    def test_timeout(self):
+        client = ImgProxyClient(self.imgproxy, timeout=0.1)
+
+        with self.assertRaises(FetchTimeoutError):
+            client.fetch(self.imgproxy.image("slow/demo.png"))
+
+    def test_long_header(self):
+        with self.assertRaises(FetchError):
+            self.client.fetch(self.imgproxy.image("long-header/demo.png"))
+
+    def test_ssl_context(self):
+        context = ssl.create_default_context()
+
+        self.assertIsNone(self.client.ssl_context)
+        self.assertIs(ImgProxyClient(self.imgproxy, ssl_context=context).ssl_context, context)
+        # No SSL context is created for http connections
+        with mock.patch("pyimgproxy.client.default_ssl_context") as default_context:
+            self.client.fetch(self.imgproxy.image("demo.png"))
+
+        default_context.assert_not_called()
+
+    def test_https_ssl_context(self):
+        context = ssl.create_default_context()
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+
+        for ssl_context, expected in [(None, default_ssl_context()), (context, context)]:
+            with self.subTest(ssl_context=ssl_context):
+                client = ImgProxyClient(imgproxy, ssl_context=ssl_context)
+                connection, reused = client._connect(("https", "example.org", 443))
+
+                self.assertFalse(reused)
+                self.assertIs(connection._context, expected)
+
+    def test_connection_refused(self):
+        imgproxy = ImgProxy(url="http://127.0.0.1:1")
+
+        with ImgProxyClient(imgproxy) as client, self.assertRaises(FetchError):
+            client.fetch(imgproxy.image("demo.png"))
+
+    def test_fetch_many(self):
+        images = [self.imgproxy.image(f"{i}.png").width(100) for i in range(20)]
+
+        results = list(self.client.fetch_many(images, max_workers=4))
+
+        self.assertCountEqual([image for image, _response in results], images)
+        for image, response in results:
+            self.assertEqual(response.url, image.url)
+            self.assertEqual(response.body, BODY)
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_fetch_many_backpressure(self):
+        taken = []
+
+        def images():
+            for i in range(100):
+                taken.append(i)
+                yield self.imgproxy.image(f"{i}.png")
+
+        results = self.client.fetch_many(images(), max_workers=2)
+        next(results)
+        time.sleep(0.1)
+
+        # Only enough images to keep the workers busy are taken while the consumer is waiting
+        self.assertLessEqual(len(taken), 5)
+        results.close()
+
+    def test_fetch_many_exceptions(self):
+        client = ImgProxyClient(self.imgproxy, timeout=0.1)
+        images = [self.imgproxy.image("demo.png"), self.imgproxy.image("slow/demo.png")]
+
+        results = dict(client.fetch_many(images, return_exceptions=True))
+
+        self.assertEqual(results[images[0]].status, 200)
+        self.assertIsInstance(results[images[1]], FetchTimeoutError)
+
+        with self.assertRaises(FetchTimeoutError):
+            list(client.fetch_many(images))
+
+    def test_imgproxy_fetch_many(self):
+        images = [self.imgproxy.image(f"{i}.png").width(100) for i in range(10)]
+
+        results = dict(self.imgproxy.fetch_many(images, max_workers=2))
+
+        self.assertEqual(set(results), set(images))
+        self.assertEqual({response.status for response in results.values()}, {200})
+        self.assertLessEqual(self.server.connections, 2)
+
+    def test_invalid_max_connections(self):
+        with self.assertRaises(ValueError):
+            ImgProxyClient(self.imgproxy, max_connections=0)
@@ -0,0 +1,222 @@
+from unittest import TestCase
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.dimensions import (
+    Gravity,
+    ProcessingOptions,
+    calc_geometry,
+    calc_position,
+    output_size,
+    scale_int,
+)
+
+
+class ScaleIntTestCase(TestCase):
+    def test_scale_int(self):
+        self.assertEqual(scale_int(0, 2.0), 0)
+        self.assertEqual(scale_int(100, 0.5), 50)
+        # Halves round up, as with Go's math.Round - not to even like Python's round
+        self.assertEqual(scale_int(501, 0.5), 251)
+        self.assertEqual(scale_int(5, 0.5), 3)
+
+
+class ProcessingOptionsTestCase(TestCase):
+    def test_options(self):
+        po = ProcessingOptions(["rs:fill:300:200:1:1:no", "w:400", "dpr:2", "z:1.5:2", "pd:1:2"])
+
+        self.assertEqual(po.resizing_type, "fill")
+        self.assertEqual((po.width, po.height), (400, 200))
+        self.assertTrue(po.enlarge)
+        self.assertTrue(po.extend)
+        self.assertEqual(po.extend_gravity, Gravity("no", 0.0, 0.0))
+        self.assertEqual((po.zoom_width, po.zoom_height, po.dpr), (1.5, 2.0, 2.0))
+        self.assertEqual(po.padding, (1, 2, 1, 2))
+
+    def test_defaults(self):
+        po = ProcessingOptions([])
+
+        self.assertEqual(po.resizing_type, "fit")
+        self.assertEqual((po.width, po.height, po.min_width, po.min_height), (0, 0, 0, 0))
+        self.assertFalse(po.enlarge)
+        self.assertFalse(po.extend)
+        self.assertTrue(po.auto_rotate)
+        self.assertIsNone(po.padding)
+        self.assertIsNone(po.format)
+
+    def test_invalid_options(self):
+        for options in [
+            ["resize:squash:100"],
+            ["width:abc"],
+            ["width:-1"],
+            ["rotate:45"],
+            ["dpr:0"],
+            ["gravity:up"],
+            # Focus point gravity without both coordinates
+            ["gravity:fp"],
+            ["gravity:fp:0.5"],
+            ["crop:10:10:fp"],
+            ["extend:1:fp"],
+            ["resize:fill:100:100:1:1:fp:0.5"],
+            ["format:psd"],
+        ]:
+            with self.subTest(options=options), self.assertRaises(ValueError):
+                ProcessingOptions(options)
+
+
+class CalcGeometryTestCase(TestCase):
+    def test_geometry(self):
+        geometry = calc_geometry(1000, 500, ProcessingOptions(["resize:fill:200:200", "dpr:2"]))
+
+        self.assertEqual((geometry.source_width, geometry.source_height), (1000, 500))
+        self.assertEqual(geometry.dpr_scale, 2.0)
+        self.assertEqual((geometry.target_width, geometry.target_height), (400, 400))
+        self.assertEqual((geometry.scaled_width, geometry.scaled_height), (800, 400))
+        self.assertEqual((geometry.result_width, geometry.result_height), (400, 400))
+
+    def test_orientation(self):
+        geometry = calc_geometry(1000, 500, ProcessingOptions([]), orientation=5)
+
+        self.assertEqual((geometry.source_width, geometry.source_height), (500, 1000))
+        self.assertEqual((geometry.angle, geometry.flip), (90, True))
+
+
+class CalcPositionTestCase(TestCase):
+    def test_calc_position(self):
+        for gravity, expected in [
+            (Gravity("ce", 0, 0), (50, 25)),
+            (Gravity("no", 0, 0), (50, 0)),
+            (Gravity("soea", 0, 0), (100, 50)),
+            (Gravity("we", 10, 0), (10, 25)),
+            (Gravity("ea", 10, 0), (90, 25)),
+            (Gravity("fp", 0.25, 0.5), (0, 25)),
+            (Gravity("fp", 1, 1), (100, 50)),
+        ]:
+            with self.subTest(gravity=gravity):
+                self.assertEqual(calc_position(200, 100, 100, 50, gravity, 1.0), expected)
+
+    def test_dpr(self):
+        self.assertEqual(calc_position(200, 100, 100, 50, Gravity("nowe", 10, 5), 2.0), (20, 10))
+
+
+class OutputSizeTestCase(TestCase):
+    def test_resizing(self):
+        for options, expected in [
+            ([], (1000, 500)),
+            (["size:200:200"], (200, 100)),
+            (["resize:fit:200:200"], (200, 100)),
+            (["resize:fill:200:200"], (200, 200)),
+            (["resize:fill-down:200:400"], (200, 400)),
+            # A small image is cropped to the requested aspect ratio rather than enlarged
+            (["resize:fill-down:2000:2000"], (500, 500)),
+            (["resize:fill-down:2000:2000:1"], (2000, 2000)),
+            (["resize:force:100:300"], (100, 300)),
+            (["resize:auto:200:100"], (200, 100)),
+            (["resize:auto:100:200"], (100, 50)),
+            (["width:100"], (100, 50)),
+            (["height:100"], (200, 100)),
+            (["width:2000"], (1000, 500)),
+            (["width:2000", "enlarge:1"], (2000, 1000)),
+            (["width:200", "width:300"], (300, 150)),
+        ]:
+            with self.subTest(options=options):
+                self.assertEqual(output_size(1000, 500, options), expected)
+
+    def test_dpr_and_zoom(self):
+        for options, expected in [
+            (["width:200", "dpr:2"], (400, 200)),
+            (["resize:fill:200:200", "dpr:2"], (400, 400)),
+            # The device pixel ratio is reduced so the image isn't enlarged
+            (["width:800", "dpr:2"], (1000, 500)),
+            (["width:800", "dpr:2", "enlarge:1"], (1600, 800)),
+            (["width:200", "zoom:0.5"], (100, 50)),
+            (["width:200", "zoom:2:1"], (400, 100)),
+            (["resize:force:200:100", "zoom:2:1"], (400, 100)),
+        ]:
+            with self.subTest(options=options):
+                self.assertEqual(output_size(1000, 500, options), expected)
+
+    def test_min_size(self):
+        for options, expected in [
+            (["min-width:200"], (1000, 500)),
+            # The image is cropped to the requested width or height
+            (["width:100", "min-height:100"], (100, 100)),
+            (["width:200", "min-height:200"], (200, 200)),
+            (["height:50", "min-width:200"], (200, 50)),
+            (["width:300", "min-width:500"], (300, 250)),
+            # Minimum sizes enlarge the image even without enlarge
+            (["min-height:1000"], (2000, 1000)),
+        ]:
+            with self.subTest(options=options):
+                self.assertEqual(output_size(1000, 500, options), expected)
+
+    def test_extend(self):
+        for options, expected in [
+            (["width:2000", "extend:1"], (2000, 500)),
+            (["size:2000:2000:0:1"], (2000, 2000)),
+            (["size:200:200:0:1"], (200, 200)),
+            (["size:200:200", "extend_aspect_ratio:1"], (200, 200)),
+            (["size:400:100", "extend_ar:1:no"], (400, 100)),
+            (["size:50:100", "extend_ar:1"], (50, 100)),
+        ]:
+            with self.subTest(options=options):
+                self.assertEqual(output_size(1000, 500, options), expected)
+
+    def test_crop(self):
+        for options, expected in [
+            (["crop:500:500"], (500, 500)),
+            (["crop:0.5:0.5"], (500, 250)),
+            (["crop:2000:100"], (1000, 100)),
+            (["crop:400:400:nowe", "width:200"], (200, 200)),
+            (["crop:0:250", "resize:fill:100:100"], (100, 100)),
+            # Repeated options only replace the arguments they give
+            (["crop:500:500", "crop::200"], (500, 200)),
+            (["crop:500:500", "crop:200"], (200, 500)),
+        ]:
+            with self.subTest(options=options):
+                self.assertEqual(output_size(1000, 500, options), expected)
+
+    def test_padding(self):
+        for options, expected in [
+            (["padding:10"], (1020, 520)),
+            (["padding:10:20"], (1040, 520)),
+            (["padding:1:2:3:4"], (1006, 504)),
+            (["padding::20"], (1040, 500)),
+            (["padding:0:20"], (1040, 500)),
+            (["padding:::10"], (1000, 510)),
+            (["padding:0:0:0:0"], (1000, 500)),
+            (["padding:10", "padding::20"], (1040, 520)),
+            (["padding:10", "padding:0"], (1000, 500)),
+            (["padding:10", "padding:::0"], (1020, 510)),
+            (["width:100", "padding:10:20", "dpr:2"], (280, 140)),
+        ]:
+            with self.subTest(options=options):
+                self.assertEqual(output_size(1000, 500, options), expected)
+
+    def test_rotate(self):
+        for options, orientation, expected in [
+            (["rotate:90"], 1, (500, 1000)),
+            (["rotate:180"], 1, (1000, 500)),
+            (["rotate:-90", "width:100"], 1, (100, 200)),
+            ([], 6, (500, 1000)),
+            (["width:100"], 8, (100, 200)),
+            (["auto_rotate:0"], 6, (1000, 500)),
+            (["rotate:90"], 6, (1000, 500)),
+        ]:
+            with self.subTest(options=options, orientation=orientation):
+                self.assertEqual(
+                    output_size(1000, 500, options, orientation=orientation), expected
+                )
+
+    def test_rounding(self):
+        # 250.5 rounds up
+        self.assertEqual(output_size(1000, 501, ["width:500"]), (500, 251))
+        # Images are never scaled below a single pixel
+        self.assertEqual(output_size(1000, 10, ["width:10"]), (10, 1))
+
+    def test_image(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", short_options=True)
+        image = imgproxy.image("demo.jpg").resize("fill", 300, 300).dpr(2)
+
+        self.assertEqual(output_size(4000, 3000, image.options), (600, 600))
+        self.assertEqual(image.output_size(4000, 3000), (600, 600))
+        self.assertEqual(image.width(300).output_size(3000, 4000, orientation=6), (600, 600))
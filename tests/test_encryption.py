@@ -0,0 +1,155 @@
+import base64
+import pickle
+from unittest import TestCase
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.cache import LRUCache
+from pyimgproxy.encryption import SourceURLEncrypter
+from pyimgproxy.exceptions import ConfigurationError
+
+ENCRYPTION_KEY = "3" * 64
+
+
+def decrypt(key: bytes, encrypted: bytes) -> bytes:
+    decryptor = Cipher(algorithms.AES(key), modes.CBC(encrypted[:16])).decryptor()
+    padded = decryptor.update(encrypted[16:]) + decryptor.finalize()
+    return padded[: -padded[-1]]
+
+
+def decode(encoded: bytes) -> bytes:
+    return base64.urlsafe_b64decode(encoded + b"=" * (-len(encoded) % 4))
+
+
+class SourceURLEncrypterTestCase(TestCase):
+    def test_encrypt(self):
+        key = bytes.fromhex(ENCRYPTION_KEY)
+        encrypter = SourceURLEncrypter(key=key)
+
+        for source_url in [b"", b"demo.png", b"a" * 16, "démo.png?a=1".encode()]:
+            with self.subTest(source_url=source_url):
+                encrypted = encrypter.encrypt(source_url)
+
+                self.assertEqual(len(encrypted) % 16, 0)
+                self.assertEqual(decrypt(key, encrypted), source_url)
+
+    def test_random_iv(self):
+        encrypter = SourceURLEncrypter(key=bytes.fromhex(ENCRYPTION_KEY))
+
+        self.assertNotEqual(encrypter.encrypt(b"demo.png"), encrypter.encrypt(b"demo.png"))
+
+    def test_deterministic_iv(self):
+        encrypter = SourceURLEncrypter(key=bytes.fromhex(ENCRYPTION_KEY), deterministic_iv=True)
+
+        self.assertEqual(encrypter.encrypt(b"demo.png"), encrypter.encrypt(b"demo.png"))
+        self.assertNotEqual(encrypter.iv(b"demo.png"), encrypter.iv(b"another_image.png"))
+
+    def test_decrypt(self):
+        encrypter = SourceURLEncrypter(key=bytes.fromhex(ENCRYPTION_KEY))
+
+        for source_url in [b"", b"demo.png", b"a" * 16, "démo.png?a=1".encode()]:
+            with self.subTest(source_url=source_url):
+                self.assertEqual(encrypter.decrypt(encrypter.encrypt(source_url)), source_url)
+
+    def test_decrypt_invalid(self):
+        encrypter = SourceURLEncrypter(key=bytes.fromhex(ENCRYPTION_KEY))
+        encrypted = encrypter.encrypt(b"demo.png")
+
+        for invalid in [b"", encrypted[:16], encrypted[:-1], b"\x00" * 32]:
+            with self.subTest(invalid=invalid), self.assertRaises(ValueError):
+                encrypter.decrypt(invalid)
+
+    def test_invalid_key(self):
+        with self.assertRaises(ConfigurationError):
+            SourceURLEncrypter(key=b"\x33" * 8)
+
+
+class EncryptedSourceURLTestCase(TestCase):
+    def setUp(self):
+        self.imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+            encryption_key=ENCRYPTION_KEY,
+            encrypt_source_urls=True,
+            deterministic_iv=True,
+        )
+        return super().setUp()
+
+    def test_url(self):
+        image = self.imgproxy.image("demo.png").size(width=640, height=480)
+
+        signature, options, enc, encrypted = image.url.split("/")[4:]
+
+        self.assertEqual(options, "size:640:480")
+        self.assertEqual(enc, "enc")
+        self.assertEqual(
+            decrypt(bytes.fromhex(ENCRYPTION_KEY), decode(encrypted.encode())), b"demo.png"
+        )
+        self.assertEqual(
+            signature.encode(), self.imgproxy.sign(f"/{options}/enc/{encrypted}".encode())
+        )
+
+    def test_template(self):
+        image = self.imgproxy.image("demo.png").size(width=640, height=480)
+
+        self.assertEqual(image.compile()("demo.png"), image.url)
+
+    def test_source_path_cached(self):
+        self.imgproxy.source_path("demo.png")
+        self.imgproxy.source_path("demo.png")
+
+        cache_info = self.imgproxy._encrypted_source_path.cache_info()
+        self.assertEqual(cache_info.hits, 1)
+        self.assertEqual(cache_info.misses, 1)
+
+    def test_random_iv_not_cached(self):
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            encryption_key=ENCRYPTION_KEY,
+            encrypt_source_urls=True,
+            source_cache_size=16,
+        )
+
+        self.assertNotEqual(imgproxy.source_path("demo.png"), imgproxy.source_path("demo.png"))
+        self.assertFalse(hasattr(imgproxy._encrypted_source_path, "cache_info"))
+
+    def test_random_iv_url_not_cached(self):
+        for url_cache in [{"url_cache_size": 16}, {"url_cache": LRUCache(maxsize=16)}]:
+            with self.subTest(url_cache=url_cache):
+                imgproxy = ImgProxy(
+                    url="https://example.org/thumbnail",
+                    encryption_key=ENCRYPTION_KEY,
+                    encrypt_source_urls=True,
+                    **url_cache,
+                )
+
+                self.assertIsNone(imgproxy.url_cache)
+                self.assertNotEqual(
+                    imgproxy.image("demo.png").width(100).url,
+                    imgproxy.image("demo.png").width(100).url,
+                )
+
+    def test_deterministic_iv_url_cached(self):
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            encryption_key=ENCRYPTION_KEY,
+            encrypt_source_urls=True,
+            deterministic_iv=True,
+            url_cache_size=16,
+        )
+
+        imgproxy.image("demo.png").width(100).url
+        imgproxy.image("demo.png").width(100).url
+
+        self.assertEqual(imgproxy.url_cache.info().hits, 1)
+
+    def test_pickle(self):
+        unpickled = pickle.loads(pickle.dumps(self.imgproxy))  # noqa:S301
+
+        self.assertEqual(unpickled.source_path("demo.png"), self.imgproxy.source_path("demo.png"))
+
+    def test_no_encryption_key(self):
+        with self.assertRaises(ConfigurationError):
+            ImgProxy(url="https://example.org/thumbnail", encrypt_source_urls=True)
@@ -0,0 +1,261 @@
+import asyncio
+import socket
+import struct
+import time
+import urllib.request
+import zlib
+from unittest import TestCase, mock
+from urllib.error import HTTPError
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.client import AsyncImgProxyClient
+from pyimgproxy.fakeserver import (
+    FakeImgProxyServer,
+    byte_range,
+    main,
+    output_size,
+    synthetic_png,
+)
+
+
+def png_size(data):
+    return struct.unpack(">II", data[16:24])
+
+
+class SyntheticPNGTestCase(TestCase):
+    def test_synthetic_png(self):
+        data = synthetic_png(3, 2, (255, 0, 0))
+
+        self.assertEqual(data[:8], b"\x89PNG\r\n\x1a\n")
+        self.assertEqual(png_size(data), (3, 2))
+        # Palette colour type, with a single colour in the palette
+        self.assertEqual(data[25], 3)
+        self.assertEqual(data[33:44], b"\x00\x00\x00\x03PLTE\xff\x00\x00")
+        # The IDAT chunk holds each row as a filter byte and the palette index of each pixel
+        length = struct.unpack(">I", data[48:52])[0]
+        self.assertEqual(data[52:56], b"IDAT")
+        self.assertEqual(zlib.decompress(data[56 : 56 + length]), b"\x00" * 8)
+
+    def test_output_size(self):
+        for options, expected in [
+            ([], (1024, 768)),
+            (["size:300:200"], (267, 200)),
+            (["resize:fill:300:400"], (300, 400)),
+            (["rs:fit:300"], (300, 225)),
+            (["w:300", "h:100"], (133, 100)),
+            (["height:384"], (512, 384)),
+            (["width:100", "dpr:2"], (200, 150)),
+            (["resize:fill-down:2048:1024"], (1024, 512)),
+            (["size:2048:1024:0:1"], (2048, 1024)),
+            (["size:300:300", "extend_ar:1"], (300, 300)),
+            (["width:300", "min-height:300"], (300, 300)),
+            (["crop:512:512", "width:100"], (100, 100)),
+            (["width:100", "padding::20"], (140, 75)),
+            (["width:100", "rotate:90"], (100, 133)),
+            (["width:100000"], (1024, 768)),
+            (["width:100000", "enlarge:1"], (4096, 4096)),
+        ]:
+            with self.subTest(options=options):
+                self.assertEqual(output_size(options), expected)
+
+        for options in [["width:abc"], ["resize:squash:100"], ["dpr:0"], ["rotate:45"]]:
+            with self.subTest(options=options), self.assertRaises(ValueError):
+                output_size(options)
+
+
+class ByteRangeTestCase(TestCase):
+    def test_byte_range(self):
+        for header, expected in [
+            ("bytes=0-99", (0, 99)),
+            ("bytes=10-", (10, 999)),
+            ("bytes=0-5000", (0, 999)),
+            ("bytes=-100", (900, 999)),
+            ("bytes=-5000", (0, 999)),
+            # Other units and multiple ranges are ignored
+            ("items=0-10", None),
+            ("bytes=0-10,20-30", None),
+            ("bytes=a-b", None),
+            ("bytes=-", None),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(byte_range(header, 1000), expected)
+
+    def test_not_satisfiable(self):
+        for header in ["bytes=1000-", "bytes=20-10"]:
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                byte_range(header, 1000)
+
+
+class FakeImgProxyServerTestCase(TestCase):
+    def setUp(self):
+        self.server = FakeImgProxyServer(
+            ImgProxy(url="http://imgproxy/thumbnail", key="1" * 16, salt="2" * 16)
+        )
+        self.url = self.enter_context(self.server.running())
+        self.imgproxy = ImgProxy(url=self.url, key="1" * 16, salt="2" * 16)
+        return super().setUp()
+
+    def enter_context(self, context_manager):
+        # TestCase.enterContext is only available from Python 3.11
+        result = context_manager.__enter__()
+        self.addCleanup(context_manager.__exit__, None, None, None)
+        return result
+
+    def get(self, url, method="GET", headers=None):
+        request = urllib.request.Request(url, method=method, headers=headers or {})  # noqa:S310
+        with urllib.request.urlopen(request) as response:  # noqa:S310
+            return response.status, response.headers["Content-Type"], response.read()
+
+    def test_repr(self):
+        self.assertEqual(repr(self.server), f"<FakeImgProxyServer {self.url}>")
+        self.assertTrue(self.url.endswith("/thumbnail"))
+
+    def test_image(self):
+        image = self.imgproxy.image("demo.png").size(width=300, height=200)
+
+        status, content_type, body = self.get(image.url)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(content_type, "image/png")
+        self.assertEqual(png_size(body), (267, 200))
+        self.assertEqual(self.server.requests, 1)
+
+    def test_deterministic(self):
+        image = self.imgproxy.image("demo.png").width(100)
+
+        self.assertEqual(self.get(image.url), self.get(image.url))
+        self.assertNotEqual(self.get(image.url), self.get(image.source_url("another.png").url))
+
+    def test_head(self):
+        image = self.imgproxy.image("demo.png")
+
+        status, content_type, body = self.get(image.url, method="HEAD")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b"")
+
+    def test_range(self):
+        image = self.imgproxy.image("demo.png").width(100)
+        _, _, body = self.get(image.url)
+
+        request = urllib.request.Request(image.url, headers={"Range": "bytes=0-23"})  # noqa:S310
+        with urllib.request.urlopen(request) as response:  # noqa:S310
+            self.assertEqual(response.status, 206)
+            self.assertEqual(response.headers["Content-Range"], f"bytes 0-23/{len(body)}")
+            self.assertEqual(response.read(), body[:24])
+
+    def test_range_not_satisfiable(self):
+        image = self.imgproxy.image("demo.png").width(100)
+
+        with self.assertRaises(HTTPError) as cm:
+            self.get(image.url, headers={"Range": "bytes=100000-"})
+
+        self.assertEqual(cm.exception.code, 416)
+
+    def test_health(self):
+        status, content_type, body = self.get(self.url.removesuffix("/thumbnail") + "/health")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b"imgproxy is running")
+
+    def test_invalid_signature(self):
+        url = f"{self.url}/insecure/size:300:200/plain/demo.png"
+
+        with self.assertRaises(HTTPError) as cm:
+            self.get(url)
+
+        self.assertEqual(cm.exception.code, 403)
+
+    def test_invalid_url(self):
+        base_url = self.url.removesuffix("/thumbnail")
+        invalid_options = [
+            self.imgproxy.image("demo.png").width("abc").url.removeprefix(base_url),
+            self.imgproxy.image("demo.png").gravity("fp").url.removeprefix(base_url),
+        ]
+        for path in ["/thumbnail", "/thumbnail/signature", "/another/path", *invalid_options]:
+            with self.subTest(path=path), self.assertRaises(HTTPError) as cm:
+                self.get(base_url + path)
+
+            self.assertEqual(cm.exception.code, 404)
+
+    def test_keep_alive(self):
+        images = [self.imgproxy.image(f"{i}.png").width(10) for i in range(5)]
+
+        async def fetch():
+            async with AsyncImgProxyClient(self.imgproxy) as client:
+                return [await client.fetch(image) for image in images]
+
+        responses = asyncio.run(fetch())
+
+        self.assertEqual({response.status for response in responses}, {200})
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.requests, 5)
+
+    def test_connection_close(self):
+        image = self.imgproxy.image("demo.png").width(10)
+
+        # urllib always asks for the connection to be closed
+        for _ in range(2):
+            self.get(image.url)
+
+        self.assertEqual(self.server.connections, 2)
+
+
+class FakeImgProxyServerOptionsTestCase(TestCase):
+    def test_latency(self):
+        server = FakeImgProxyServer(ImgProxy(url="http://imgproxy"), latency=0.2)
+
+        with server.running() as url:
+            imgproxy = ImgProxy(url=url)
+            start = time.perf_counter()
+            urllib.request.urlopen(imgproxy.image("demo.png").url).read()  # noqa:S310
+
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+
+    def test_error_rate(self):
+        server = FakeImgProxyServer(ImgProxy(url="http://imgproxy"), error_rate=0.5, seed=1)
+        statuses = []
+
+        async def fetch(imgproxy):
+            async with AsyncImgProxyClient(imgproxy) as client:
+                for i in range(100):
+                    response = await client.fetch(imgproxy.image(f"{i}.png"))
+                    statuses.append(response.status)
+
+        with server.running() as url:
+            asyncio.run(fetch(ImgProxy(url=url)))
+
+        self.assertEqual(set(statuses), {200, 500})
+        self.assertTrue(20 < statuses.count(500) < 80)
+
+    def test_invalid_error_rate(self):
+        with self.assertRaises(ValueError):
+            FakeImgProxyServer(ImgProxy(url="http://imgproxy"), error_rate=2)
+
+    def test_async(self):
+        async def fetch():
+            server = FakeImgProxyServer(ImgProxy(url="http://imgproxy"))
+            async with server, AsyncImgProxyClient(ImgProxy(url=server.url)) as client:
+                return await client.fetch_url(f"{server.url}/plain/demo.png")
+
+        response = asyncio.run(fetch())
+
+        self.assertEqual(response.status, 200)
+
+    def test_address_in_use(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            sock.listen()
+            port = sock.getsockname()[1]
+            server = FakeImgProxyServer(ImgProxy(url="http://imgproxy"), port=port)
+
+            with self.assertRaises(OSError), server.running():
+                pass
+
+    @mock.patch("builtins.print")
+    @mock.patch.object(FakeImgProxyServer, "serve_forever", side_effect=KeyboardInterrupt)
+    def test_main(self, serve_forever, mock_print):
+        main(["--port", "0", "--path", "/thumbnail", "--latency", "0.1"])
+
+        mock_print.assert_called_once()
+        self.assertIn("/thumbnail", mock_print.call_args[0][0])
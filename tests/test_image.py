@@ -1,6 +1,8 @@
+import tracemalloc
 from unittest import TestCase
 
 from pyimgproxy import ImgProxy
+from pyimgproxy.image import SHORT_OPTION_NAMES
 
 
 class ImageProcessingTestCase(TestCase):
@@ -19,12 +21,63 @@ class ImageProcessingTestCase(TestCase):
         self.assertNotEqual(id(self.image), id(image))
         self.assertEqual(image._source_url, "another_image.png")
 
+    def test_source(self):
+        image = self.image.source_url(source_url="another_image.png").width(100)
+
+        self.assertEqual(image.source, "another_image.png")
+        self.assertEqual(self.image.source, self.image._source_url)
+
+    def test_source_url_shares_options(self):
+        image = self.image.width(width=100)
+
+        new_image = image.source_url(source_url="another_image.png")
+
+        self.assertEqual(new_image.options, ["width:100"])
+        self.assertIs(new_image._option_node, image._option_node)
+
     def test_add_option(self):
         image = self.image.add_option("demo", 1, None, 2, None, 3, None)
 
         self.assertNotEqual(id(self.image), id(image))
         self.assertEqual(image.options, ["demo:1::2::3"])
 
+    def test_add_option_chain(self):
+        first = self.image.width(width=100)
+        second = first.height(height=50)
+        third = second.quality(quality=80)
+        branch = second.format(extension="webp")
+
+        self.assertEqual(self.image.options, [])
+        self.assertEqual(first.options, ["width:100"])
+        self.assertEqual(second.options, ["width:100", "height:50"])
+        self.assertEqual(third.options, ["width:100", "height:50", "quality:80"])
+        self.assertEqual(branch.options, ["width:100", "height:50", "format:webp"])
+        # Options from the parent are shared, not copied
+        self.assertIs(third._option_node[1], second._option_node)
+
+    def test_add_option_shares_source(self):
+        image = self.image.width(width=100)
+
+        srcset = [image.format(extension="webp"), image.format(extension="avif")]
+
+        self.assertIs(srcset[0]._source, self.image._source)
+        self.assertIs(srcset[1]._source, self.image._source)
+        srcset[0].url
+        self.assertEqual(self.image._source.path, b"/plain/demo.png")
+
+    def test_source_url_new_source(self):
+        image = self.image.source_url(source_url="another_image.png")
+
+        self.assertIsNot(image._source, self.image._source)
+        self.assertIsNone(image._source.path)
+
+    def test_set_options(self):
+        image = self.image.width(width=100)
+
+        image.options = ["height:50", "quality:80"]
+
+        self.assertEqual(image.options, ["height:50", "quality:80"])
+
     def test_resize(self):
         image = self.image.resize(
             resizing_type="fill",
@@ -385,3 +438,118 @@ class ImageTestCase(TestCase):
             image.url,
             "https://example.org/thumbnail/size:640:480/plain/demo.png",
         )
+
+    def test_url_cache(self):
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+            url_cache_size=10,
+        )
+        expected = (
+            "https://example.org/"
+            "thumbnail/muzV--3ARhtX_iCFwE_kLkzvohwQIJLZloJpBBg7MkQ/size:640:480/plain/demo.png"
+        )
+
+        first = imgproxy.image("demo.png").size(width=640, height=480)
+        second = imgproxy.image("demo.png").size(width=640, height=480)
+
+        self.assertEqual(first.url, expected)
+        self.assertEqual(second.url, expected)
+        info = imgproxy.url_cache.info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 1)
+
+    def test_cache_key(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 16, salt="2" * 16)
+        other_imgproxy = ImgProxy(url="https://example.org/other", key="1" * 16, salt="2" * 16)
+
+        key = imgproxy.image("demo.png").size(width=640, height=480).cache_key()
+
+        self.assertEqual(key, imgproxy.image("demo.png").size(width=640, height=480).cache_key())
+        self.assertEqual(hash(key), hash(imgproxy.image("demo.png").size(640, 480).cache_key()))
+        self.assertNotEqual(key, imgproxy.image("demo.png").size(width=640).cache_key())
+        self.assertNotEqual(key, imgproxy.image("other.png").size(640, 480).cache_key())
+        self.assertNotEqual(key, other_imgproxy.image("demo.png").size(640, 480).cache_key())
+        # The source URL can't run into the options
+        self.assertNotEqual(
+            imgproxy.image("a/w:1").cache_key(), imgproxy.image("a").add_option("w", 1).cache_key()
+        )
+
+    def test_cache_key_long_chain(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", url_cache_size=10)
+        image = imgproxy.image("demo.png")
+        for i in range(3000):
+            image = image.quality(i % 100)
+
+        self.assertEqual(hash(image.cache_key()), hash(image.cache_key()))
+        self.assertEqual(image.width(100).url, image.width(100).url)
+        self.assertEqual(imgproxy.url_cache.info().hits, 1)
+
+
+class ShortOptionsTestCase(TestCase):
+    def setUp(self):
+        self.imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+            short_options=True,
+        )
+        self.image = self.imgproxy.image(source_url="demo.png")
+        return super().setUp()
+
+    def test_add_option(self):
+        for option_name, short_name in SHORT_OPTION_NAMES.items():
+            with self.subTest(option_name=option_name):
+                image = self.image.add_option(option_name, 1)
+
+                self.assertEqual(image.options, [f"{short_name}:1"])
+
+    def test_unknown_option(self):
+        image = self.image.add_option("dpr", 2)
+
+        self.assertEqual(image.options, ["dpr:2"])
+
+    def test_processing_options(self):
+        image = self.image.resize("fill", 640, 480).strip_metadata(True).quality(80)
+
+        self.assertEqual(image.options, ["rs:fill:640:480", "sm:True", "q:80"])
+
+    def test_url(self):
+        image = self.image.size(width=640, height=480)
+
+        self.assertEqual(
+            image.url,
+            (
+                "https://example.org/"
+                "thumbnail/rZCL6S15z6v05g1ghrxfhFPhbgecYwz1GwwSewTxLeU/s:640:480/plain/demo.png"
+            ),
+        )
+
+
+class ImageMemoryTestCase(TestCase):
+    # A slotted Image with no __dict__ is 64 bytes on 64-bit CPython (plus 8 bytes for the list
+    # pointer used to hold them in this test), leave a little room for other implementations
+    max_bytes_per_image = 96
+
+    def test_no_dict(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+        image = imgproxy.image("demo.png")
+
+        self.assertFalse(hasattr(image, "__dict__"))
+
+    def test_bytes_per_image(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+        image = imgproxy.image("demo.png").width(width=100)
+        count = 10000
+
+        tracemalloc.start()
+        try:
+            start, _peak = tracemalloc.get_traced_memory()
+            images = [image._derive(image._source, image._option_node) for _ in range(count)]
+            end, _peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        bytes_per_image = (end - start) / len(images)
+        self.assertLessEqual(bytes_per_image, self.max_bytes_per_image)
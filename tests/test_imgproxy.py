@@ -1,7 +1,15 @@
+import base64
+import hashlib
+import hmac
 import os
+import pickle
+import subprocess
+import sys
+from collections.abc import Iterator
 from unittest import TestCase, mock
 
 from pyimgproxy import ImgProxy
+from pyimgproxy.cache import LRUCache
 from pyimgproxy.exceptions import ConfigurationError
 from pyimgproxy.image import Image
 
@@ -12,6 +20,23 @@ class ImgProxyTestCase(TestCase):
 
         self.assertEqual(repr(imgproxy), "<ImgProxy https://example.org/thumbnail>")
 
+    def test_import(self):
+        # Importing pyimgproxy shouldn't need sqlite3, or import the modules only needed to fetch
+        # images, encrypt source URLs or generate URLs in parallel
+        code = (
+            "import sys\n"
+            "sys.modules['_sqlite3'] = None\n"
+            "import pyimgproxy\n"
+            "pyimgproxy.ImgProxy(url='https://example.org').image('demo.png').url\n"
+            "heavy = {'sqlite3', 'asyncio', 'ssl', 'multiprocessing', 'concurrent.futures', "
+            "'cryptography'}\n"
+            "print(sorted(heavy & set(sys.modules)))\n"
+        )
+
+        output = subprocess.check_output([sys.executable, "-c", code], text=True)  # noqa:S603
+
+        self.assertEqual(output.strip(), "[]")
+
     def test_full_settings(self):
         imgproxy = ImgProxy(
             url="https://example.org/thumbnail",
@@ -54,3 +79,230 @@ class ImgProxyTestCase(TestCase):
         self.assertIsInstance(image, Image)
         self.assertEqual(image.imgproxy, imgproxy)
         self.assertEqual(image._source_url, "demo.png")
+
+    def test_sign(self):
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+        )
+        path = b"/size:640:480/plain/demo.png"
+
+        digest = hmac.new(key=b"\x11" * 8, msg=b"\x22" * 8 + path, digestmod=hashlib.sha256)
+        expected = base64.urlsafe_b64encode(digest.digest()).rstrip(b"=")
+        self.assertEqual(imgproxy.sign(path), expected)
+        # The precomputed state must not be modified by signing
+        self.assertEqual(imgproxy.sign(path), expected)
+
+    def test_sign_truncated(self):
+        path = b"/size:640:480/plain/demo.png"
+
+        for signature_size, expected in (
+            (8, b"muzV--3ARhs"),
+            (16, b"muzV--3ARhtX_iCFwE_kLg"),
+            (32, b"muzV--3ARhtX_iCFwE_kLkzvohwQIJLZloJpBBg7MkQ"),
+        ):
+            with self.subTest(signature_size=signature_size):
+                imgproxy = ImgProxy(
+                    url="https://example.org/thumbnail",
+                    key="1" * 16,
+                    salt="2" * 16,
+                    signature_size=signature_size,
+                )
+
+                self.assertEqual(imgproxy.sign(path), expected)
+
+    @mock.patch.dict(os.environ, {"IMGPROXY_SIGNATURE_SIZE": "8"})
+    def test_signature_size_environment(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 16, salt="2" * 16)
+
+        self.assertEqual(imgproxy.signature_size, 8)
+        self.assertEqual(imgproxy.sign(b"/size:640:480/plain/demo.png"), b"muzV--3ARhs")
+
+    def test_invalid_signature_size(self):
+        # An explicit size of 0 is invalid, rather than falling back to the default
+        for signature_size in (-1, 0, 33, 8.5, "8", True):
+            with (
+                self.subTest(signature_size=signature_size),
+                self.assertRaises(ConfigurationError),
+            ):
+                _imgproxy = ImgProxy(
+                    url="https://example.org/thumbnail", signature_size=signature_size
+                )
+
+    @mock.patch.dict(os.environ, {"IMGPROXY_SIGNATURE_SIZE": "8"})
+    def test_signature_size_overrides_environment(self):
+        with self.assertRaises(ConfigurationError):
+            ImgProxy(url="https://example.org/thumbnail", signature_size=0)
+
+    def test_invalid_signature_size_environment(self):
+        for environ_signature_size in ("eight", "0", "33"):
+            with (
+                self.subTest(environ_signature_size=environ_signature_size),
+                mock.patch.dict(os.environ, {"IMGPROXY_SIGNATURE_SIZE": environ_signature_size}),
+                self.assertRaises(ConfigurationError),
+            ):
+                ImgProxy(url="https://example.org/thumbnail")
+
+    def test_signature_size_fingerprint(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 16, salt="2" * 16)
+        truncated = ImgProxy(
+            url="https://example.org/thumbnail", key="1" * 16, salt="2" * 16, signature_size=8
+        )
+
+        self.assertNotEqual(imgproxy.fingerprint, truncated.fingerprint)
+
+    def test_key_pairs(self):
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key=f"{'1' * 16},{'3' * 16}",
+            salt=f"{'2' * 16},{'4' * 16}",
+        )
+
+        self.assertEqual(
+            imgproxy.key_pairs, [(b"\x11" * 8, b"\x22" * 8), (b"\x33" * 8, b"\x44" * 8)]
+        )
+        self.assertEqual(len(imgproxy.signers), 2)
+        # The first pair signs URLs unless another is chosen
+        self.assertEqual(imgproxy.key, b"\x11" * 8)
+        self.assertEqual(imgproxy.salt, b"\x22" * 8)
+        self.assertEqual(
+            imgproxy.sign(b"/size:640:480/plain/demo.png"),
+            b"muzV--3ARhtX_iCFwE_kLkzvohwQIJLZloJpBBg7MkQ",
+        )
+
+    @mock.patch.dict(
+        os.environ,
+        {
+            "IMGPROXY_URL": "https://example.org/thumbnail",
+            "IMGPROXY_KEY": "1111111111111111,3333333333333333",
+            "IMGPROXY_SALT": "2222222222222222,4444444444444444",
+        },
+    )
+    def test_key_pairs_environment(self):
+        imgproxy = ImgProxy(signing_pair=1)
+
+        self.assertEqual(len(imgproxy.key_pairs), 2)
+        self.assertEqual(imgproxy.key, b"\x33" * 8)
+        self.assertEqual(imgproxy.salt, b"\x44" * 8)
+
+    def test_key_pairs_mismatched(self):
+        with self.assertRaises(ConfigurationError):
+            _imgproxy = ImgProxy(
+                url="https://example.org/thumbnail", key=f"{'1' * 16},{'3' * 16}", salt="2" * 16
+            )
+
+    def test_key_without_salt(self):
+        for settings in [{"key": "1" * 16}, {"salt": "2" * 16}]:
+            with self.subTest(settings=settings):
+                imgproxy = ImgProxy(url="https://example.org/thumbnail", **settings)
+
+                # As before key rotation, URLs are only signed when both are set
+                self.assertEqual(imgproxy.key_pairs, [])
+                self.assertIsNone(imgproxy.signer)
+                self.assertEqual(
+                    imgproxy.image("demo.png").width(100).url,
+                    "https://example.org/thumbnail/width:100/plain/demo.png",
+                )
+
+    def test_signing_pair_not_found(self):
+        with self.assertRaises(ConfigurationError):
+            _imgproxy = ImgProxy(
+                url="https://example.org/thumbnail", key="1" * 16, salt="2" * 16, signing_pair=1
+            )
+
+    def test_verify(self):
+        old = ImgProxy(url="https://example.org/thumbnail", key="1" * 16, salt="2" * 16)
+        new = ImgProxy(url="https://example.org/thumbnail", key="3" * 16, salt="4" * 16)
+        rotated = ImgProxy(
+            url="https://example.org/thumbnail",
+            key=f"{'1' * 16},{'3' * 16}",
+            salt=f"{'2' * 16},{'4' * 16}",
+            signing_pair=1,
+        )
+        path = b"/size:640:480/plain/demo.png"
+
+        self.assertEqual(rotated.sign(path), new.sign(path))
+        self.assertTrue(rotated.verify(path, old.sign(path)))
+        self.assertTrue(rotated.verify(path, new.sign(path)))
+        self.assertFalse(old.verify(path, new.sign(path)))
+        self.assertFalse(rotated.verify(b"/size:320:240/plain/demo.png", old.sign(path)))
+        self.assertFalse(rotated.verify(path, b"invalid"))
+        self.assertFalse(rotated.verify(path, b""))
+
+    def test_verify_truncated(self):
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail", key="1" * 16, salt="2" * 16, signature_size=8
+        )
+        path = b"/size:640:480/plain/demo.png"
+
+        self.assertTrue(imgproxy.verify(path, b"muzV--3ARhs"))
+        self.assertFalse(imgproxy.verify(path, b"muzV--3ARhtX_iCFwE_kLkzvohwQIJLZloJpBBg7MkQ"))
+
+    def test_verify_no_key_or_salt(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+
+        self.assertTrue(imgproxy.verify(b"/plain/demo.png", b"anything"))
+
+    def test_sign_no_key_or_salt(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+
+        self.assertIsNone(imgproxy.signer)
+        self.assertEqual(imgproxy.sign(b"/plain/demo.png"), b"")
+
+    def test_urls_for(self):
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+        )
+        source_urls = ["demo.png", "another_image.png"]
+
+        urls = imgproxy.urls_for(source_urls, ["size:640:480"])
+
+        self.assertIsInstance(urls, Iterator)
+        self.assertEqual(
+            list(urls),
+            [imgproxy.image(source_url).size(640, 480).url for source_url in source_urls],
+        )
+
+    def test_pickle(self):
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+        )
+
+        unpickled = pickle.loads(pickle.dumps(imgproxy))  # noqa:S301
+
+        self.assertEqual(unpickled.url, imgproxy.url)
+        self.assertEqual(unpickled.sign(b"/plain/demo.png"), imgproxy.sign(b"/plain/demo.png"))
+
+    def test_source_path(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+
+        self.assertEqual(imgproxy.source_path("demo.png"), b"/plain/demo.png")
+        self.assertEqual(
+            imgproxy.source_path("demo.png?hello=world"), b"/ZGVtby5wbmc_aGVsbG89d29ybGQ"
+        )
+
+    def test_source_cache(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", source_cache_size=1)
+
+        self.assertEqual(imgproxy.source_path("demo.png"), b"/plain/demo.png")
+        self.assertEqual(imgproxy.source_path("demo.png"), b"/plain/demo.png")
+
+        cache_info = imgproxy._source_path.cache_info()
+        self.assertEqual(cache_info.hits, 1)
+        self.assertEqual(cache_info.misses, 1)
+
+    def test_url_cache(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", url_cache_size=10)
+
+        self.assertIsInstance(imgproxy.url_cache, LRUCache)
+        self.assertEqual(imgproxy.url_cache.maxsize, 10)
+
+    def test_no_url_cache(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+
+        self.assertIsNone(imgproxy.url_cache)
@@ -0,0 +1,223 @@
+import asyncio
+from http import HTTPStatus
+from unittest import TestCase
+from wsgiref.util import setup_testing_defaults
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.middleware import ASGIMiddleware, SignatureVerifier, WSGIMiddleware
+
+
+def wsgi_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "image/png")])
+    return [b"image"]
+
+
+async def asgi_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"image"})
+
+
+class SignatureVerifierTestCase(TestCase):
+    def setUp(self):
+        self.imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+        )
+        self.verifier = SignatureVerifier(self.imgproxy)
+        self.path = (
+            b"/thumbnail/muzV--3ARhtX_iCFwE_kLkzvohwQIJLZloJpBBg7MkQ/size:640:480/plain/demo.png"
+        )
+        return super().setUp()
+
+    def test_repr(self):
+        self.assertEqual(repr(self.verifier), "<SignatureVerifier https://example.org/thumbnail>")
+
+    def test_valid(self):
+        self.assertEqual(self.verifier.status(self.path), HTTPStatus.OK)
+
+    def test_invalid_signature(self):
+        for path in [
+            self.path.replace(b"640", b"641"),
+            self.path.replace(b"muzV", b"muzW"),
+            b"/thumbnail/insecure/size:640:480/plain/demo.png",
+        ]:
+            with self.subTest(path=path):
+                self.assertEqual(self.verifier.status(path), HTTPStatus.FORBIDDEN)
+
+    def test_not_found(self):
+        for path in [
+            b"/",
+            b"/thumbnail",
+            b"/thumbnail/signature",
+            b"/thumbnail/signature/",
+            b"/another/muzV--3ARhtX_iCFwE_kLkzvohwQIJLZloJpBBg7MkQ/size:640:480/plain/demo.png",
+        ]:
+            with self.subTest(path=path):
+                self.assertEqual(self.verifier.status(path), HTTPStatus.NOT_FOUND)
+
+    def test_exempt_paths(self):
+        self.assertEqual(self.verifier.status(b"/health"), HTTPStatus.OK)
+
+    def test_cache(self):
+        self.verifier.status(self.path)
+        self.verifier.status(self.path)
+        self.verifier.status(self.path.replace(b"muzV", b"muzW"))
+
+        cache_info = self.verifier.cache.info()
+        self.assertEqual(cache_info.hits, 1)
+        # Only valid paths are cached
+        self.assertEqual(cache_info.currsize, 1)
+
+    def test_no_cache(self):
+        verifier = SignatureVerifier(self.imgproxy, cache_size=0)
+
+        self.assertIsNone(verifier.cache)
+        self.assertEqual(verifier.status(self.path), HTTPStatus.OK)
+
+    def test_key_rotation(self):
+        rotated = ImgProxy(
+            url="https://example.org/thumbnail",
+            key=f"{'3' * 16},{'1' * 16}",
+            salt=f"{'4' * 16},{'2' * 16}",
+        )
+        verifier = SignatureVerifier(rotated)
+
+        self.assertEqual(verifier.status(self.path), HTTPStatus.OK)
+
+    def test_prefix_segment(self):
+        # A path which only starts with the same characters as the prefix isn't under it
+        for path in (
+            self.path.replace(b"/thumbnail/", b"/thumbnails/"),
+            self.path.replace(b"/thumbnail/", b"/thumbnail"),
+            b"/thumbnail",
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(self.verifier.status(path), HTTPStatus.NOT_FOUND)
+
+    def test_no_prefix(self):
+        imgproxy = ImgProxy(url="https://imgproxy.example.org", key="1" * 16, salt="2" * 16)
+        verifier = SignatureVerifier(imgproxy)
+        path = imgproxy.image("demo.png").size(width=640, height=480).url
+        path = path.removeprefix("https://imgproxy.example.org").encode()
+
+        self.assertEqual(verifier.status(path), HTTPStatus.OK)
+
+
+class WSGIMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+        )
+        self.app = WSGIMiddleware(wsgi_app, self.imgproxy)
+        return super().setUp()
+
+    def request(self, **environ):
+        setup_testing_defaults(environ)
+        responses = []
+
+        def start_response(status, headers, exc_info=None):
+            responses.append((status, headers))
+
+        body = b"".join(self.app(environ, start_response))
+        status, headers = responses[0]
+        return status, dict(headers), body
+
+    def test_valid(self):
+        url = self.imgproxy.image("demo.png").size(width=640, height=480).url
+
+        status, headers, body = self.request(
+            SCRIPT_NAME="/thumbnail",
+            PATH_INFO=url.removeprefix("https://example.org/thumbnail"),
+        )
+
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(body, b"image")
+
+    def test_invalid_signature(self):
+        status, headers, body = self.request(
+            PATH_INFO="/thumbnail/insecure/size:640:480/plain/demo.png"
+        )
+
+        self.assertEqual(status, "403 Forbidden")
+        self.assertEqual(headers["Content-Length"], str(len(body)))
+        self.assertEqual(body, b"Forbidden")
+
+    def test_not_found(self):
+        status, headers, body = self.request(PATH_INFO="/thumbnail/insecure")
+
+        self.assertEqual(status, "404 Not Found")
+
+    def test_raw_uri(self):
+        # Plain source URLs can be percent encoded, and PATH_INFO is always decoded
+        path = "/size:640:480/plain/d%C3%A9mo.png"
+        signature = self.imgproxy.sign(path.encode()).decode()
+
+        for name in ["RAW_URI", "REQUEST_URI"]:
+            with self.subTest(name=name):
+                status, headers, body = self.request(
+                    PATH_INFO=f"/thumbnail/{signature}/size:640:480/plain/dÃ©mo.png",
+                    **{name: f"/thumbnail/{signature}{path}?hello=world"},
+                )
+
+                self.assertEqual(status, "200 OK")
+
+
+class ASGIMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+        )
+        self.app = ASGIMiddleware(asgi_app, self.imgproxy)
+        return super().setUp()
+
+    def request(self, scope):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.app(scope, receive, send))
+        return messages
+
+    def test_valid(self):
+        url = self.imgproxy.image("demo.png").size(width=640, height=480).url
+        path = url.removeprefix("https://example.org")
+
+        messages = self.request({"type": "http", "path": path, "raw_path": path.encode()})
+
+        self.assertEqual(messages[0]["status"], 200)
+        self.assertEqual(messages[1]["body"], b"image")
+
+    def test_path(self):
+        url = self.imgproxy.image("demo.png").size(width=640, height=480).url
+
+        messages = self.request({"type": "http", "path": url.removeprefix("https://example.org")})
+
+        self.assertEqual(messages[0]["status"], 200)
+
+    def test_invalid_signature(self):
+        messages = self.request(
+            {"type": "http", "path": "/thumbnail/insecure/size:640:480/plain/demo.png"}
+        )
+
+        self.assertEqual(messages[0]["status"], 403)
+        self.assertIn((b"content-length", b"9"), messages[0]["headers"])
+        self.assertEqual(messages[1]["body"], b"Forbidden")
+
+    def test_not_found(self):
+        messages = self.request({"type": "http", "path": "/thumbnail"})
+
+        self.assertEqual(messages[0]["status"], 404)
+
+    def test_lifespan(self):
+        messages = self.request({"type": "lifespan"})
+
+        self.assertEqual(messages[0]["status"], 200)
@@ -0,0 +1,81 @@
+import itertools
+import multiprocessing
+from unittest import TestCase
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.parallel import pool_map
+
+
+class PoolMapTestCase(TestCase):
+    def test_ordered(self):
+        results = pool_map(
+            abs,
+            range(0, -50, -1),
+            max_workers=3,
+            mp_context=multiprocessing.get_context("fork"),
+        )
+
+        self.assertEqual(list(results), list(range(50)))
+
+    def test_bounded(self):
+        items = itertools.count()
+
+        results = pool_map(
+            abs, items, max_workers=2, mp_context=multiprocessing.get_context("fork")
+        )
+
+        self.assertEqual(next(results), 0)
+        # Only enough items to keep every worker busy are taken from the iterable
+        self.assertEqual(next(items), 4)
+        results.close()
+
+    def test_exception(self):
+        results = pool_map(
+            abs, ["a"], max_workers=1, mp_context=multiprocessing.get_context("fork")
+        )
+
+        with self.assertRaises(TypeError):
+            list(results)
+
+
+class ParallelURLsForTestCase(TestCase):
+    def setUp(self):
+        self.imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+        )
+        self.source_urls = [f"image_{i}.png" for i in range(25)] + ["demo.png?hello=world"]
+        self.expected = list(self.imgproxy.urls_for(self.source_urls, ["size:640:480"]))
+        return super().setUp()
+
+    def test_fork(self):
+        urls = self.imgproxy.parallel_urls_for(
+            iter(self.source_urls),
+            ["size:640:480"],
+            max_workers=2,
+            chunk_size=3,
+            mp_context=multiprocessing.get_context("fork"),
+        )
+
+        self.assertEqual(list(urls), self.expected)
+
+    def test_spawn(self):
+        urls = self.imgproxy.parallel_urls_for(
+            iter(self.source_urls),
+            ["size:640:480"],
+            max_workers=2,
+            chunk_size=7,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+        self.assertEqual(list(urls), self.expected)
+
+    def test_no_source_urls(self):
+        urls = self.imgproxy.parallel_urls_for([], ["size:640:480"], max_workers=1)
+
+        self.assertEqual(list(urls), [])
+
+    def test_invalid_chunk_size(self):
+        with self.assertRaises(ValueError):
+            list(self.imgproxy.parallel_urls_for(self.source_urls, chunk_size=0))
@@ -0,0 +1,221 @@
+import base64
+from unittest import TestCase
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.exceptions import InvalidSignatureError, InvalidURLError
+from pyimgproxy.image import Image
+from pyimgproxy.parser import URLParser
+
+ENCRYPTION_KEY = "3" * 64
+
+
+class URLParserTestCase(TestCase):
+    def setUp(self):
+        self.imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+        )
+        self.parser = self.imgproxy.parser()
+        return super().setUp()
+
+    def test_repr(self):
+        self.assertEqual(repr(self.parser), "<URLParser https://example.org/thumbnail>")
+
+    def test_parse(self):
+        image = self.parser.parse(
+            "https://example.org/"
+            "thumbnail/muzV--3ARhtX_iCFwE_kLkzvohwQIJLZloJpBBg7MkQ/size:640:480/plain/demo.png"
+        )
+
+        self.assertIsInstance(image, Image)
+        self.assertEqual(image.imgproxy, self.imgproxy)
+        self.assertEqual(image._source_url, "demo.png")
+        self.assertEqual(image.options, ["size:640:480"])
+
+    def test_parse_path(self):
+        image = self.parser.parse(
+            "/muzV--3ARhtX_iCFwE_kLkzvohwQIJLZloJpBBg7MkQ/size:640:480/plain/demo.png"
+        )
+
+        self.assertEqual(image._source_url, "demo.png")
+        self.assertEqual(image.options, ["size:640:480"])
+
+    def test_round_trip(self):
+        for source_url in [
+            "demo.png",
+            "https://example.org/images/demo.png",
+            "demo.png?hello=world",
+            "démo.png",
+        ]:
+            for image in [
+                self.imgproxy.image(source_url),
+                self.imgproxy.image(source_url).size(width=640, height=480).quality(80),
+                self.imgproxy.image(source_url).resize("fill", 300, 400).gravity("sm"),
+            ]:
+                with self.subTest(source_url=source_url, options=image.options):
+                    parsed = self.parser(image.url)
+
+                    self.assertEqual(parsed._source_url, source_url)
+                    self.assertEqual(parsed.options, image.options)
+                    self.assertEqual(parsed.url, image.url)
+
+    def test_plain_escaped(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+
+        image = imgproxy.parse("https://example.org/thumbnail/plain/d%C3%A9mo.png")
+
+        self.assertEqual(image._source_url, "démo.png")
+
+    def test_plain_extension(self):
+        path = "/size:640:480/plain/demo.png@webp"
+        signature = self.imgproxy.sign(path.encode()).decode()
+
+        image = self.parser.parse(f"/{signature}{path}")
+
+        self.assertEqual(image._source_url, "demo.png")
+        self.assertEqual(image.options, ["size:640:480", "format:webp"])
+
+    def test_base64_split(self):
+        # imgproxy allows base64 encoded source URLs to be split with slashes
+        path = (
+            "/rs:fill:300:400:0/g:sm/aHR0cDovL2V4YW1w/bGUuY29tL2ltYWdl/cy9jdXJpb3NpdHku/anBn.png"
+        )
+        signature = self.imgproxy.sign(path.encode()).decode()
+
+        image = self.parser.parse(f"/{signature}{path}")
+
+        self.assertEqual(image._source_url, "http://example.com/images/curiosity.jpg")
+        self.assertEqual(image.options, ["rs:fill:300:400:0", "g:sm", "format:png"])
+
+    def test_short_options_extension(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", short_options=True)
+
+        image = imgproxy.parse("https://example.org/thumbnail/s:640:480/plain/demo.png@webp")
+
+        self.assertEqual(image.options, ["s:640:480", "f:webp"])
+
+    def test_key_rotation(self):
+        old = ImgProxy(url="https://example.org/thumbnail", key="3" * 16, salt="4" * 16)
+        rotated = ImgProxy(
+            url="https://example.org/thumbnail",
+            key=f"{'1' * 16},{'3' * 16}",
+            salt=f"{'2' * 16},{'4' * 16}",
+        )
+        url = old.image("demo.png").size(width=640, height=480).url
+
+        image = rotated.parse(url)
+
+        self.assertEqual(image._source_url, "demo.png")
+        # Parsed images are signed again with the signing pair
+        self.assertEqual(image.url, rotated.image("demo.png").size(width=640, height=480).url)
+
+    def test_invalid_signature(self):
+        url = self.imgproxy.image("demo.png").size(width=640, height=480).url
+
+        for invalid_url in [
+            url.replace("640", "641"),
+            url.replace("demo.png", "demo.jpg"),
+            url.replace("muzV", "muzW"),
+            "https://example.org/thumbnail/insecure/size:640:480/plain/demo.png",
+        ]:
+            with self.subTest(url=invalid_url), self.assertRaises(InvalidSignatureError):
+                self.parser.parse(invalid_url)
+
+    def test_no_verify(self):
+        parser = self.imgproxy.parser(verify=False)
+
+        image = parser.parse("https://example.org/thumbnail/insecure/size:640:480/plain/demo.png")
+
+        self.assertEqual(image._source_url, "demo.png")
+        self.assertEqual(image.options, ["size:640:480"])
+
+    def test_no_key_or_salt(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+
+        for url in [
+            "https://example.org/thumbnail/size:640:480/plain/demo.png",
+            "https://example.org/thumbnail/insecure/size:640:480/plain/demo.png",
+        ]:
+            with self.subTest(url=url):
+                image = imgproxy.parse(url)
+
+                self.assertEqual(image._source_url, "demo.png")
+                self.assertEqual(image.options, ["size:640:480"])
+                self.assertEqual(image.url, imgproxy.parse(image.url).url)
+
+    def test_no_key_or_salt_round_trip(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+
+        for source_url in ["demo.png", "http://example.org/a b.png"]:
+            for image in [
+                imgproxy.image(source_url),
+                imgproxy.image(source_url).size(width=640, height=480),
+            ]:
+                with self.subTest(source_url=source_url, options=image.options):
+                    parsed = imgproxy.parse(image.url)
+
+                    self.assertEqual(parsed._source_url, source_url)
+                    self.assertEqual(parsed.options, image.options)
+                    self.assertEqual(parsed.url, image.url)
+
+        image = imgproxy.parse("/insecure/ZGVtby5wbmc")
+        self.assertEqual(image._source_url, "demo.png")
+        self.assertEqual(image.options, [])
+
+    def test_invalid_url(self):
+        parser = URLParser(self.imgproxy, verify=False)
+
+        for url in [
+            "https://example.net/thumbnail/signature/plain/demo.png",
+            "/signature",
+            "/signature/size:640:480",
+            "/signature/size:640:480/plain/",
+            "/signature/enc/ZGVtbw",
+            "/signature/a",
+        ]:
+            with self.subTest(url=url), self.assertRaises(InvalidURLError):
+                parser.parse(url)
+
+
+class EncryptedURLParserTestCase(TestCase):
+    def setUp(self):
+        self.imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+            encryption_key=ENCRYPTION_KEY,
+            encrypt_source_urls=True,
+        )
+        return super().setUp()
+
+    def test_round_trip(self):
+        image = self.imgproxy.image("demo.png?hello=world").size(width=640, height=480)
+
+        parsed = self.imgproxy.parse(image.url)
+
+        self.assertEqual(parsed._source_url, "demo.png?hello=world")
+        self.assertEqual(parsed.options, ["size:640:480"])
+
+    def test_extension(self):
+        image_path = self.imgproxy.source_path("demo.png").decode()
+        path = f"/size:640:480{image_path}.webp"
+        signature = self.imgproxy.sign(path.encode()).decode()
+
+        image = self.imgproxy.parse(f"/{signature}{path}")
+
+        self.assertEqual(image._source_url, "demo.png")
+        self.assertEqual(image.options, ["size:640:480", "format:webp"])
+
+    def test_invalid_encrypted_source_url(self):
+        encoded = base64.urlsafe_b64encode(b"\x00" * 32).rstrip(b"=").decode()
+
+        with self.assertRaises(InvalidURLError):
+            self.imgproxy.parser(verify=False).parse(f"/signature/enc/{encoded}")
+
+    def test_no_encryption_key(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 16, salt="2" * 16)
+        path = self.imgproxy.source_path("demo.png").decode()
+
+        with self.assertRaises(InvalidURLError):
+            imgproxy.parser(verify=False).parse(f"/signature{path}")
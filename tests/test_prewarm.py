@@ -0,0 +1,146 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.prewarm import Prewarmer, PrewarmReport, image_digest, percentile
+
+from .test_client import ImageServerMixin
+
+
+class PercentileTestCase(TestCase):
+    def test_percentile(self):
+        values = [float(value) for value in range(1, 101)]
+
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 90), 90.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile(values, 100), 100.0)
+        self.assertEqual(percentile([1.0], 50), 1.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+
+class ImageDigestTestCase(TestCase):
+    def test_image_digest(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", key="1" * 16, salt="2" * 16)
+        image = imgproxy.image("demo.png").width(100)
+
+        self.assertEqual(image_digest(image), image_digest(imgproxy.image("demo.png").width(100)))
+        self.assertNotEqual(image_digest(image), image_digest(image.height(100)))
+        self.assertNotEqual(
+            image_digest(image),
+            image_digest(ImgProxy(url="https://example.org/thumbnail").image("demo.png")),
+        )
+
+    def test_image_digest_long_chain(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+        image = imgproxy.image("demo.png")
+        for i in range(3000):
+            image = image.quality(i % 100)
+
+        copy = imgproxy.image("demo.png")
+        copy.options = image.options
+
+        self.assertEqual(image_digest(image), image_digest(copy))
+
+
+class PrewarmerTestCase(ImageServerMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        checkpoint_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(checkpoint_dir.cleanup)
+        self.checkpoint = os.path.join(checkpoint_dir.name, "checkpoint")
+
+    def test_repr(self):
+        prewarmer = Prewarmer(self.imgproxy)
+
+        self.assertEqual(repr(prewarmer), f"<Prewarmer {self.imgproxy.url}>")
+
+    def test_run(self):
+        images = [self.imgproxy.image(f"{i}.png").width(100) for i in range(20)]
+        prewarmer = Prewarmer(self.imgproxy, method="GET", max_connections=4)
+
+        report = prewarmer.run(images)
+
+        self.assertIsInstance(report, PrewarmReport)
+        self.assertEqual(report.total, 20)
+        self.assertEqual(report.succeeded, 20)
+        self.assertEqual(report.failed, 0)
+        self.assertEqual(report.skipped, 0)
+        self.assertEqual(report.statuses, {200: 20})
+        self.assertGreater(report.throughput, 0)
+        self.assertLessEqual(report.latency_p50, report.latency_p90)
+        self.assertLessEqual(report.latency_p90, report.latency_p99)
+        self.assertLessEqual(report.latency_p99, report.latency_max)
+        self.assertCountEqual(
+            self.server.paths,
+            [image.url.removeprefix(self.imgproxy.url) for image in images],
+        )
+        self.assertLessEqual(self.server.connections, 4)
+
+    def test_head(self):
+        report = Prewarmer(self.imgproxy).run([self.imgproxy.image("demo.png")])
+
+        self.assertEqual(report.succeeded, 1)
+        # The test server only records GET requests
+        self.assertEqual(self.server.paths, [])
+
+    def test_failures(self):
+        images = [
+            self.imgproxy.image("demo.png"),
+            self.imgproxy.image("missing/demo.png"),
+            self.imgproxy.image("slow/demo.png"),
+        ]
+        prewarmer = Prewarmer(self.imgproxy, method="GET", timeout=0.1)
+
+        report = prewarmer.run(images)
+
+        self.assertEqual(report.total, 3)
+        self.assertEqual(report.succeeded, 1)
+        self.assertEqual(report.failed, 2)
+        self.assertEqual(report.statuses, {200: 1, 404: 1, 0: 1})
+
+    def test_checkpoint(self):
+        images = [self.imgproxy.image(f"{i}.png") for i in range(10)]
+        prewarmer = Prewarmer(self.imgproxy, method="GET", checkpoint=self.checkpoint)
+
+        prewarmer.run(images[:4] + [self.imgproxy.image("missing/demo.png")])
+        self.server.paths.clear()
+        report = prewarmer.run([*images, self.imgproxy.image("missing/demo.png")])
+
+        self.assertEqual(report.total, 11)
+        self.assertEqual(report.skipped, 4)
+        self.assertEqual(report.succeeded, 6)
+        # Failed images are retried
+        self.assertEqual(report.failed, 1)
+        self.assertEqual(len(self.server.paths), 7)
+        self.assertEqual(prewarmer.completed(), {image_digest(image) for image in images})
+
+    def test_checkpoint_partial_line(self):
+        image = self.imgproxy.image("demo.png")
+        with open(self.checkpoint, "w") as f:
+            f.write(image_digest(image)[:10])
+        prewarmer = Prewarmer(self.imgproxy, checkpoint=self.checkpoint)
+
+        report = prewarmer.run([image])
+
+        self.assertEqual(report.skipped, 0)
+        self.assertEqual(report.succeeded, 1)
+        self.assertEqual(prewarmer.run([image]).skipped, 1)
+
+    def test_rate_limit(self):
+        images = [self.imgproxy.image(f"{i}.png") for i in range(6)]
+        prewarmer = Prewarmer(self.imgproxy, rate_limit=50)
+
+        start = time.perf_counter()
+        report = prewarmer.run(images)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(report.succeeded, 6)
+        # The first request starts straight away, then one every 20ms
+        self.assertGreaterEqual(elapsed, 0.1)
+
+    def test_invalid_rate_limit(self):
+        with self.assertRaises(ValueError):
+            Prewarmer(self.imgproxy, rate_limit=0)
@@ -0,0 +1,214 @@
+import io
+import os
+import tempfile
+from unittest import TestCase, skipIf
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.dimensions import output_size
+from pyimgproxy.exceptions import RenderError
+from pyimgproxy.render import LocalRenderer, RenderedImage
+
+try:
+    from PIL import Image as PILImage
+except ImportError:  # pragma: no cover
+    PILImage = None
+
+
+@skipIf(PILImage is None, "Pillow isn't installed")
+class LocalRendererTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls.root.cleanup)
+
+        # Left half red, right half blue
+        photo = PILImage.new("RGB", (800, 400), (255, 0, 0))
+        photo.paste((0, 0, 255), (400, 0, 800, 400))
+        photo.save(os.path.join(cls.root.name, "photo.jpg"), quality=95)
+
+        # Portrait when the EXIF orientation is applied
+        exif = PILImage.Exif()
+        exif[0x0112] = 6
+        photo.save(os.path.join(cls.root.name, "rotated.jpg"), exif=exif)
+
+        # A green square with a white border
+        bordered = PILImage.new("RGB", (300, 200), (255, 255, 255))
+        bordered.paste((0, 255, 0), (50, 20, 150, 120))
+        bordered.save(os.path.join(cls.root.name, "bordered.png"))
+
+        transparent = PILImage.new("RGBA", (100, 100), (0, 0, 0, 0))
+        transparent.save(os.path.join(cls.root.name, "transparent.png"))
+
+    def setUp(self):
+        self.imgproxy = ImgProxy(url="https://example.org/thumbnail")
+        self.renderer = LocalRenderer(root=self.root.name)
+
+    def render(self, image):
+        rendered = self.renderer.render(image)
+        with PILImage.open(io.BytesIO(rendered.data)) as img:
+            img.load()
+        self.assertEqual(img.size, (rendered.width, rendered.height))
+        return rendered, img
+
+    def assertColor(self, img, xy, color, delta=10):  # noqa:N802
+        for actual, expected in zip(img.convert("RGB").getpixel(xy), color):
+            self.assertAlmostEqual(actual, expected, delta=delta)
+
+    def test_repr(self):
+        self.assertEqual(repr(self.renderer), f"<LocalRenderer {self.renderer.root}>")
+
+    def test_render(self):
+        rendered, img = self.render(self.imgproxy.image("local:///photo.jpg"))
+
+        self.assertIsInstance(rendered, RenderedImage)
+        self.assertEqual(rendered.format, "jpg")
+        self.assertEqual(img.format, "JPEG")
+        self.assertEqual(img.size, (800, 400))
+
+    def test_resize(self):
+        for options, expected in [
+            (["size:200:200"], (200, 100)),
+            (["resize:fill:200:200"], (200, 200)),
+            (["resize:force:100:300"], (100, 300)),
+            (["resize:fill-down:1000:1000"], (400, 400)),
+            (["width:1000"], (800, 400)),
+            (["width:1000", "enlarge:1"], (1000, 500)),
+            (["width:1000", "extend:1"], (1000, 400)),
+            (["width:100", "dpr:2"], (200, 100)),
+            (["height:100", "zoom:0.5"], (100, 50)),
+        ]:
+            with self.subTest(options=options):
+                image = self.imgproxy.image("photo.jpg")
+                image.options = options
+
+                self.assertEqual(self.render(image)[1].size, expected)
+
+    def test_draft(self):
+        image = self.imgproxy.image("photo.jpg").width(100)
+        renderer = LocalRenderer(root=self.root.name, draft=False)
+
+        self.assertEqual(self.renderer.render(image).width, 100)
+        self.assertEqual(renderer.render(image).width, 100)
+
+    def test_gravity(self):
+        image = self.imgproxy.image("photo.jpg").resize("fill", 100, 100)
+
+        self.assertColor(self.render(image.gravity("we"))[1], (50, 50), (255, 0, 0))
+        self.assertColor(self.render(image.gravity("ea"))[1], (50, 50), (0, 0, 255))
+
+    def test_crop(self):
+        image = self.imgproxy.image("photo.jpg").crop(200, 200, "ea")
+
+        rendered, img = self.render(image)
+
+        self.assertEqual(img.size, (200, 200))
+        self.assertColor(img, (100, 100), (0, 0, 255))
+        self.assertEqual(self.render(image.crop(0.5, 0.5, "we"))[1].size, (400, 200))
+
+    def test_trim(self):
+        rendered, img = self.render(self.imgproxy.image("bordered.png").trim(10))
+
+        self.assertEqual(img.size, (100, 100))
+        self.assertColor(img, (0, 0), (0, 255, 0))
+
+        img = self.render(self.imgproxy.image("bordered.png").trim(10, equal_hor=True))[1]
+        self.assertEqual(img.size, (200, 100))
+
+    def test_rotate(self):
+        self.assertEqual(
+            self.render(self.imgproxy.image("photo.jpg").rotate(90))[1].size, (400, 800)
+        )
+        self.assertEqual(self.render(self.imgproxy.image("rotated.jpg"))[1].size, (400, 800))
+        image = self.imgproxy.image("rotated.jpg").auto_rotate(False)
+        self.assertEqual(self.render(image)[1].size, (800, 400))
+
+        # The left of the photo ends up at the top
+        img = self.render(self.imgproxy.image("photo.jpg").rotate(90).width(200))[1]
+        self.assertEqual(img.size, (200, 400))
+        self.assertColor(img, (100, 50), (255, 0, 0))
+
+    def test_padding(self):
+        image = self.imgproxy.image("photo.jpg").width(100).padding(10, 20)
+
+        img = self.render(image.background(red=0, green=255, blue=0))[1]
+
+        self.assertEqual(img.size, (140, 70))
+        self.assertColor(img, (5, 5), (0, 255, 0))
+
+    def test_background(self):
+        image = self.imgproxy.image("transparent.png")
+
+        self.assertEqual(self.render(image)[1].mode, "RGBA")
+        img = self.render(image.format("jpg"))[1]
+        self.assertColor(img, (0, 0), (255, 255, 255))
+        img = self.render(image.background(hex_color="ff0000"))[1]
+        self.assertColor(img, (0, 0), (255, 0, 0))
+
+    def test_filters(self):
+        image = self.imgproxy.image("photo.jpg").width(200)
+
+        _, img = self.render(image)
+        _, blurred = self.render(image.blur(5))
+        _, sharpened = self.render(image.sharpen(2))
+
+        self.assertNotEqual(img.getpixel((100, 50)), blurred.getpixel((100, 50)))
+        self.assertEqual(sharpened.size, img.size)
+
+    def test_format(self):
+        image = self.imgproxy.image("photo.jpg").width(100)
+
+        for extension, format_name in [("png", "PNG"), ("webp", "WEBP"), ("jpeg", "JPEG")]:
+            with self.subTest(extension=extension):
+                self.assertEqual(self.render(image.format(extension))[1].format, format_name)
+
+    def test_quality(self):
+        image = self.imgproxy.image("photo.jpg")
+
+        self.assertLess(
+            len(self.renderer.render(image.quality(10)).data),
+            len(self.renderer.render(image.quality(95)).data),
+        )
+
+    def test_source_path(self):
+        self.assertEqual(
+            self.renderer.source_path("local:///photo.jpg"),
+            os.path.join(self.renderer.root, "photo.jpg"),
+        )
+        self.assertEqual(
+            self.renderer.source_path("photo.jpg"), os.path.join(self.renderer.root, "photo.jpg")
+        )
+
+    def test_invalid_source(self):
+        for source_url in ["https://example.org/photo.jpg", "local:///../photo.jpg", "missing"]:
+            with self.subTest(source_url=source_url), self.assertRaises(RenderError):
+                self.renderer.render(self.imgproxy.image(source_url))
+
+    def test_invalid_options(self):
+        image = self.imgproxy.image("photo.jpg")
+        for invalid in [image.resizing_type("squash"), image.gravity("fp")]:
+            with self.subTest(options=invalid.options), self.assertRaises(RenderError):
+                self.renderer.render(invalid)
+
+    def test_render_many(self):
+        images = [self.imgproxy.image("photo.jpg").width(width) for width in range(10, 110, 10)]
+
+        results = list(self.renderer.render_many(images, max_workers=2))
+
+        self.assertEqual([result.width for result in results], list(range(10, 110, 10)))
+
+    def test_output_size(self):
+        # The rendered size is always the size imgproxy would return
+        for options in [
+            ["resize:fill:300:300", "dpr:2"],
+            ["resize:fill-down:1000:1000"],
+            ["width:300", "min-height:200"],
+            ["size:900:900:0:1", "padding:5"],
+            ["size:200:50", "extend_ar:1"],
+            ["crop:0.3:0.7:noea", "width:100", "rotate:270"],
+        ]:
+            with self.subTest(options=options):
+                image = self.imgproxy.image("photo.jpg")
+                image.options = options
+
+                self.assertEqual(self.render(image)[1].size, output_size(800, 400, options))
@@ -0,0 +1,327 @@
+import io
+import os
+import struct
+import tempfile
+from unittest import TestCase, skipIf
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.exceptions import FetchError, InvalidImageError
+from pyimgproxy.fakeserver import FakeImgProxyServer, output_size
+from pyimgproxy.sniff import ImageInfo, sniff, sniff_file, sniff_stream, sniff_url
+
+try:
+    from PIL import Image as PILImage, features
+except ImportError:  # pragma: no cover
+    PILImage = features = None
+
+
+def tiff(endian, width, height, orientation=None):
+    """
+    Return a TIFF structure with a single IFD.
+    """
+    entries = [(0x0100, 4, width), (0x0101, 3, height)]
+    if orientation is not None:
+        entries.append((0x0112, 3, orientation))
+    data = (b"II" if endian == "<" else b"MM") + struct.pack(f"{endian}HI", 42, 8)
+    data += struct.pack(f"{endian}H", len(entries))
+    for tag, value_type, value in entries:
+        value_format = "HH" if value_type == 3 else "I"
+        value_bytes = struct.pack(f"{endian}{value_format}", value, *([0] * (value_type == 3)))
+        data += struct.pack(f"{endian}HHI", tag, value_type, 1) + value_bytes
+    return data + struct.pack(f"{endian}I", 0)
+
+
+def jpeg_segment(marker, data):
+    return bytes([0xFF, marker]) + struct.pack(">H", len(data) + 2) + data
+
+
+def jpeg(width, height, orientation=None, padding=0):
+    data = b"\xff\xd8" + jpeg_segment(0xE0, b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00")
+    if orientation is not None:
+        # Padding stands in for a large EXIF thumbnail
+        data += jpeg_segment(0xE1, b"Exif\x00\x00" + tiff(">", 0, 0, orientation) + bytes(padding))
+    data += jpeg_segment(0xDB, bytes(65))
+    data += jpeg_segment(0xC0, struct.pack(">BHHB", 8, height, width, 3) + bytes(9))
+    return data + jpeg_segment(0xDA, bytes(10)) + bytes(100) + b"\xff\xd9"
+
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(
+        ">I4sIIBBBBB", 13, b"IHDR", width, height, 8, 2, 0, 0, 0
+    )
+
+
+def riff_chunk(chunk_type, data):
+    return struct.pack("<4sI", chunk_type, len(data)) + data + bytes(len(data) & 1)
+
+
+def webp(*chunks):
+    data = b"WEBP" + b"".join(riff_chunk(chunk_type, data) for chunk_type, data in chunks)
+    return b"RIFF" + struct.pack("<I", len(data)) + data
+
+
+def box(box_type, data):
+    return struct.pack(">I4s", len(data) + 8, box_type) + data
+
+
+def full_box(box_type, data, version=0, flags=0):
+    return box(box_type, bytes([version]) + flags.to_bytes(3, "big") + data)
+
+
+def heif(major_brand, compatible_brands, irot=None, thumbnail=True):
+    """
+    Return an AVIF or HEIC header with a 600x400 primary image (item 1) and a 160x120 thumbnail
+    (item 2).
+    """
+    properties = [full_box(b"ispe", struct.pack(">II", 600, 400))]
+    primary = [1]
+    if thumbnail:
+        properties.insert(0, full_box(b"ispe", struct.pack(">II", 160, 120)))
+        primary = [2]
+    if irot is not None:
+        properties.append(box(b"irot", bytes([irot])))
+        primary.append(len(properties))
+    associations = struct.pack(">HB", 1, len(primary)) + bytes(primary)
+    entry_count = 1
+    if thumbnail:
+        associations += struct.pack(">HBB", 2, 1, 1)
+        entry_count = 2
+
+    ftyp = box(b"ftyp", major_brand + bytes(4) + b"".join(compatible_brands))
+    meta = full_box(
+        b"meta",
+        full_box(b"hdlr", bytes(4) + b"pict" + bytes(13))
+        + full_box(b"pitm", struct.pack(">H", 1))
+        + box(
+            b"iprp",
+            box(b"ipco", b"".join(properties))
+            + full_box(b"ipma", struct.pack(">I", entry_count) + associations),
+        ),
+    )
+    return ftyp + meta + box(b"mdat", bytes(100))
+
+
+class ChunkedStream(io.BytesIO):
+    """
+    A stream which records how much has been read from it.
+    """
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+class SniffTestCase(TestCase):
+    def test_jpeg(self):
+        self.assertEqual(sniff(jpeg(640, 480)), ImageInfo("jpg", 640, 480, 1))
+
+    def test_jpeg_orientation(self):
+        self.assertEqual(sniff(jpeg(640, 480, orientation=6)), ImageInfo("jpg", 640, 480, 6))
+        # Invalid orientations are ignored
+        self.assertEqual(sniff(jpeg(640, 480, orientation=9)), ImageInfo("jpg", 640, 480, 1))
+
+    def test_jpeg_fill_bytes(self):
+        data = jpeg(640, 480)
+        data = data[:2] + b"\xff\xff\xff" + data[2:]
+
+        self.assertEqual(sniff(data), ImageInfo("jpg", 640, 480, 1))
+
+    def test_png(self):
+        self.assertEqual(sniff(png(640, 480)), ImageInfo("png", 640, 480, 1))
+
+    def test_gif(self):
+        for signature in (b"GIF87a", b"GIF89a"):
+            with self.subTest(signature=signature):
+                data = signature + struct.pack("<HH", 640, 480) + bytes(10)
+                self.assertEqual(sniff(data), ImageInfo("gif", 640, 480, 1))
+
+    def test_webp_lossy(self):
+        frame = b"\x00\x00\x00\x9d\x01\x2a" + struct.pack("<HH", 640, 480) + bytes(10)
+
+        self.assertEqual(sniff(webp((b"VP8 ", frame))), ImageInfo("webp", 640, 480, 1))
+
+    def test_webp_lossless(self):
+        bits = (640 - 1) | ((480 - 1) << 14)
+        frame = b"\x2f" + struct.pack("<I", bits) + bytes(10)
+
+        self.assertEqual(sniff(webp((b"VP8L", frame))), ImageInfo("webp", 640, 480, 1))
+
+    def test_webp_extended(self):
+        size = (640 - 1).to_bytes(3, "little") + (480 - 1).to_bytes(3, "little")
+        exif = b"Exif\x00\x00" + tiff("<", 0, 0, orientation=8)
+        data = webp(
+            (b"VP8X", b"\x08" + bytes(3) + size),
+            (b"VP8 ", bytes(101)),
+            (b"EXIF", exif),
+        )
+
+        self.assertEqual(sniff(data), ImageInfo("webp", 640, 480, 8))
+
+    def test_webp_extended_without_exif(self):
+        size = (640 - 1).to_bytes(3, "little") + (480 - 1).to_bytes(3, "little")
+        data = webp((b"VP8X", b"\x10" + bytes(3) + size), (b"ALPH", bytes(10)))
+
+        self.assertEqual(sniff(data), ImageInfo("webp", 640, 480, 1))
+
+    def test_avif(self):
+        for major_brand, compatible_brands in [
+            (b"avif", [b"mif1", b"avif"]),
+            # Some encoders use the generic brand, with avif as a compatible brand
+            (b"mif1", [b"mif1", b"avif", b"miaf"]),
+        ]:
+            with self.subTest(major_brand=major_brand):
+                data = heif(major_brand, compatible_brands)
+                self.assertEqual(sniff(data), ImageInfo("avif", 600, 400, 1))
+
+    def test_heic(self):
+        for major_brand in (b"heic", b"mif1"):
+            with self.subTest(major_brand=major_brand):
+                data = heif(major_brand, [b"mif1", b"heic"])
+                self.assertEqual(sniff(data), ImageInfo("heic", 600, 400, 1))
+
+    def test_heif_rotation(self):
+        self.assertEqual(sniff(heif(b"avif", [b"avif"], irot=1)), ImageInfo("avif", 400, 600, 1))
+        self.assertEqual(sniff(heif(b"avif", [b"avif"], irot=2)), ImageInfo("avif", 600, 400, 1))
+
+    def test_heif_single_image(self):
+        data = heif(b"avif", [b"avif"], thumbnail=False)
+
+        self.assertEqual(sniff(data), ImageInfo("avif", 600, 400, 1))
+
+    def test_tiff(self):
+        for endian in ("<", ">"):
+            with self.subTest(endian=endian):
+                data = tiff(endian, 640, 480, orientation=3)
+                self.assertEqual(sniff(data), ImageInfo("tiff", 640, 480, 3))
+
+    def test_memoryview(self):
+        self.assertEqual(sniff(memoryview(png(640, 480))), ImageInfo("png", 640, 480, 1))
+
+    def test_invalid(self):
+        for data in [
+            b"",
+            b"not an image at all",
+            b"\xff\xd8\x00\x00",
+            png(640, 480).replace(b"IHDR", b"IDAT"),
+            webp((b"ABCD", bytes(10))),
+            heif(b"mp42", [b"isom"]),
+            b"MM\x00*" + bytes(8),
+        ]:
+            with self.subTest(data=data[:16]), self.assertRaises(InvalidImageError):
+                sniff(data)
+
+    def test_truncated(self):
+        for data in [jpeg(640, 480), png(640, 480), heif(b"avif", [b"avif"])]:
+            with self.subTest(data=data[:16]), self.assertRaises(InvalidImageError):
+                sniff(data[:20])
+
+    def test_value_error(self):
+        # InvalidImageError is also a ValueError
+        with self.assertRaises(ValueError):
+            sniff(b"")
+
+
+class SniffStreamTestCase(TestCase):
+    def test_stream(self):
+        stream = ChunkedStream(jpeg(640, 480) + bytes(100_000))
+
+        self.assertEqual(sniff_stream(stream), ImageInfo("jpg", 640, 480, 1))
+        self.assertEqual(stream.tell(), 4096)
+
+    def test_short_stream(self):
+        self.assertEqual(sniff_stream(io.BytesIO(png(640, 480))), ImageInfo("png", 640, 480, 1))
+
+    def test_large_header(self):
+        stream = ChunkedStream(jpeg(640, 480, orientation=3, padding=20_000))
+
+        self.assertEqual(sniff_stream(stream), ImageInfo("jpg", 640, 480, 3))
+        self.assertLess(stream.reads, 5)
+
+    def test_max_bytes(self):
+        stream = io.BytesIO(jpeg(640, 480, orientation=3, padding=20_000))
+
+        with self.assertRaises(InvalidImageError):
+            sniff_stream(stream, max_bytes=10_000)
+
+    def test_truncated(self):
+        with self.assertRaises(InvalidImageError):
+            sniff_stream(io.BytesIO(jpeg(640, 480, orientation=3, padding=20_000)[:10_000]))
+
+
+class SniffFileTestCase(TestCase):
+    def write(self, data):
+        with tempfile.NamedTemporaryFile(suffix=".img", delete=False) as f:
+            f.write(data)
+        self.addCleanup(os.unlink, f.name)
+        return f.name
+
+    def test_file(self):
+        path = self.write(jpeg(640, 480, orientation=5))
+
+        self.assertEqual(sniff_file(path), ImageInfo("jpg", 640, 480, 5))
+
+    def test_empty_file(self):
+        path = self.write(b"")
+
+        with self.assertRaises(InvalidImageError):
+            sniff_file(path)
+
+
+class SniffURLTestCase(TestCase):
+    def setUp(self):
+        server = FakeImgProxyServer(ImgProxy(url="http://imgproxy/", key="1" * 16, salt="2" * 16))
+        running = server.running()
+        url = running.__enter__()
+        self.addCleanup(running.__exit__, None, None, None)
+        self.imgproxy = ImgProxy(url=url, key="1" * 16, salt="2" * 16)
+        return super().setUp()
+
+    def test_url(self):
+        image = self.imgproxy.image("demo.png").resize("fill", 300, 300).dpr(2)
+
+        info = sniff_url(image.url)
+
+        self.assertEqual(info, ImageInfo("png", *output_size(image.options), 1))
+
+    def test_error(self):
+        url = f"{self.imgproxy.url}/insecure/plain/demo.png"
+
+        with self.assertRaises(FetchError):
+            sniff_url(url)
+
+
+@skipIf(PILImage is None, "Pillow isn't installed")
+class PillowTestCase(TestCase):
+    def test_formats(self):
+        formats = ["JPEG", "PNG", "GIF", "WEBP", "TIFF"]
+        if features.check("avif"):
+            formats.append("AVIF")
+        for pil_format in formats:
+            with self.subTest(format=pil_format):
+                output = io.BytesIO()
+                PILImage.new("RGB", (123, 45), (255, 0, 0)).save(output, format=pil_format)
+
+                info = sniff(output.getvalue())
+
+                self.assertEqual((info.width, info.height), (123, 45))
+
+    def test_lossless_webp(self):
+        output = io.BytesIO()
+        PILImage.new("RGBA", (123, 45)).save(output, format="WEBP", lossless=True)
+
+        self.assertEqual(sniff(output.getvalue()), ImageInfo("webp", 123, 45, 1))
+
+    def test_exif_orientation(self):
+        for pil_format, image_format in [("JPEG", "jpg"), ("WEBP", "webp"), ("TIFF", "tiff")]:
+            with self.subTest(format=pil_format):
+                img = PILImage.new("RGB", (123, 45))
+                exif = img.getexif()
+                exif[0x0112] = 6
+                output = io.BytesIO()
+                img.save(output, format=pil_format, exif=exif)
+
+                self.assertEqual(sniff(output.getvalue()), ImageInfo(image_format, 123, 45, 6))
@@ -0,0 +1,177 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+import weakref
+from unittest import TestCase
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.store import URLStore
+
+
+class URLStoreTestCase(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "urls.sqlite3")
+        return super().setUp()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def test_repr(self):
+        store = URLStore(self.path)
+
+        self.assertEqual(repr(store), f"<URLStore {self.path}>")
+        store.close()
+
+    def test_get_set(self):
+        store = URLStore(self.path)
+
+        self.assertIsNone(store.get((b"namespace", "a")))
+        store.set((b"namespace", "a"), "https://example.org/a")
+        self.assertEqual(store.get((b"namespace", "a")), "https://example.org/a")
+        self.assertEqual((store.hits, store.misses), (1, 1))
+        store.close()
+
+    def test_persistent(self):
+        store = URLStore(self.path)
+        store.set((b"namespace", "a"), "https://example.org/a")
+        store.close()
+
+        store = URLStore(self.path)
+
+        self.assertEqual(store.get((b"namespace", "a")), "https://example.org/a")
+        store.close()
+
+    def test_batches(self):
+        store = URLStore(self.path, batch_size=2)
+        other_store = URLStore(self.path)
+
+        store.set("a", "https://example.org/a")
+        self.assertIsNone(other_store.get("a"))
+        store.set("b", "https://example.org/b")
+        # Namespaces are loaded once, so a new store is needed to see the batch
+        other_store = URLStore(self.path)
+        self.assertEqual(other_store.get("a"), "https://example.org/a")
+        self.assertEqual(other_store.get("b"), "https://example.org/b")
+        store.close()
+        other_store.close()
+
+    def test_flush(self):
+        store = URLStore(self.path)
+        store.set("a", "https://example.org/a")
+
+        store.flush()
+
+        other_store = URLStore(self.path)
+        self.assertEqual(other_store.get("a"), "https://example.org/a")
+        store.close()
+        other_store.close()
+
+    def test_clear(self):
+        store = URLStore(self.path)
+        store.set("a", "https://example.org/a")
+        store.flush()
+
+        store.clear()
+
+        self.assertIsNone(store.get("a"))
+        self.assertIsNone(URLStore(self.path).get("a"))
+        store.close()
+
+    def test_garbage_collected(self):
+        store = URLStore(self.path)
+        store.set("a", "https://example.org/a")
+        reference = weakref.ref(store)
+
+        del store
+
+        # The store isn't kept alive, and its URLs are written when it's collected
+        self.assertIsNone(reference())
+        other_store = URLStore(self.path)
+        self.assertEqual(other_store.get("a"), "https://example.org/a")
+        other_store.close()
+
+    def test_prune(self):
+        store = URLStore(self.path)
+        store.set((b"old", "a"), "https://example.org/old/a")
+        store.set((b"old", "b"), "https://example.org/old/b")
+        store.set((b"new", "a"), "https://example.org/new/a")
+
+        self.assertEqual(store.prune([b"new"]), 2)
+
+        self.assertIsNone(store.get((b"old", "a")))
+        self.assertEqual(store.get((b"new", "a")), "https://example.org/new/a")
+        store.close()
+        store = URLStore(self.path)
+        self.assertIsNone(store.get((b"old", "b")))
+        self.assertEqual(store.get((b"new", "a")), "https://example.org/new/a")
+        store.close()
+
+    def test_prune_imgproxy(self):
+        settings = {"url": "https://example.org/thumbnail", "salt": "2" * 16}
+        store = URLStore(self.path)
+        old = ImgProxy(**settings, key="1" * 16, url_cache=store)
+        old.image("demo.png").width(100).url
+        new = ImgProxy(**settings, key="3" * 16, url_cache=store)
+        url = new.image("demo.png").width(100).url
+
+        self.assertEqual(store.prune([new.fingerprint]), 1)
+
+        # URLs for the current settings are still used
+        self.assertEqual(new.image("demo.png").width(100).url, url)
+        self.assertEqual(store.hits, 1)
+        store.close()
+
+    def test_pickle(self):
+        store = URLStore(self.path)
+        store.set("a", "https://example.org/a")
+        store.close()
+
+        unpickled = pickle.loads(pickle.dumps(store))  # noqa:S301
+
+        self.assertEqual(unpickled.get("a"), "https://example.org/a")
+        unpickled.close()
+
+    def test_imgproxy(self):
+        settings = {"url": "https://example.org/thumbnail", "key": "1" * 16, "salt": "2" * 16}
+        store = URLStore(self.path)
+        imgproxy = ImgProxy(**settings, url_cache=store)
+        url = imgproxy.image("demo.png").width(100).url
+        store.close()
+
+        store = URLStore(self.path)
+        imgproxy = ImgProxy(**settings, url_cache=store)
+
+        self.assertEqual(imgproxy.image("demo.png").width(100).url, url)
+        self.assertEqual(store.hits, 1)
+        store.close()
+
+    def test_imgproxy_cache_key(self):
+        store = URLStore(self.path)
+        imgproxy = ImgProxy(url="https://example.org/thumbnail", url_cache=store)
+        image = imgproxy.image("demo.png").width(100)
+        url = image.url
+        store.close()
+
+        # Keys are stored as they are, rather than hashed
+        connection = sqlite3.connect(self.path)
+        rows = connection.execute("SELECT namespace, image, url FROM urls").fetchall()
+        connection.close()
+        self.assertEqual(rows, [(*image.cache_key(), url)])
+
+    def test_imgproxy_key_changed(self):
+        store = URLStore(self.path)
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail", key="1" * 16, salt="2" * 16, url_cache=store
+        )
+        url = imgproxy.image("demo.png").width(100).url
+
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail", key="3" * 16, salt="2" * 16, url_cache=store
+        )
+
+        self.assertNotEqual(imgproxy.image("demo.png").width(100).url, url)
+        self.assertEqual(store.hits, 0)
+        store.close()
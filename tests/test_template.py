@@ -0,0 +1,111 @@
+from unittest import TestCase
+
+from pyimgproxy import ImgProxy
+from pyimgproxy.template import URLTemplate
+
+
+class URLTemplateTestCase(TestCase):
+    def setUp(self):
+        self.imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+        )
+        return super().setUp()
+
+    def test_repr(self):
+        template = self.imgproxy.template(["size:640:480", "format:webp"])
+
+        self.assertEqual(repr(template), "<URLTemplate size:640:480/format:webp>")
+
+    def test_compile(self):
+        image = self.imgproxy.image("demo.png").size(width=640, height=480)
+
+        template = image.compile()
+
+        self.assertIsInstance(template, URLTemplate)
+        self.assertEqual(template.options, ["size:640:480"])
+
+    def test_url_matches_image(self):
+        template = self.imgproxy.template(["size:640:480"])
+
+        for source_url in ["demo.png", "demo.png?hello=world", "another_image.png"]:
+            with self.subTest(source_url=source_url):
+                image = self.imgproxy.image(source_url).size(width=640, height=480)
+                self.assertEqual(template(source_url), image.url)
+
+    def test_url_standard(self):
+        template = self.imgproxy.template(["size:640:480"])
+
+        self.assertEqual(
+            template("demo.png"),
+            (
+                "https://example.org/"
+                "thumbnail/muzV--3ARhtX_iCFwE_kLkzvohwQIJLZloJpBBg7MkQ/size:640:480/plain/demo.png"
+            ),
+        )
+
+    def test_url_truncated_signature(self):
+        imgproxy = ImgProxy(
+            url="https://example.org/thumbnail",
+            key="1" * 16,
+            salt="2" * 16,
+            signature_size=8,
+        )
+        template = imgproxy.template(["size:640:480"])
+
+        self.assertEqual(
+            template("demo.png"),
+            "https://example.org/thumbnail/muzV--3ARhs/size:640:480/plain/demo.png",
+        )
+        self.assertEqual(
+            template("demo.png"), imgproxy.image("demo.png").size(width=640, height=480).url
+        )
+
+    def test_url_no_options(self):
+        template = self.imgproxy.template()
+
+        self.assertEqual(
+            template("demo.png"),
+            (
+                "https://example.org/"
+                "thumbnail/qHrDO4lTysklvMcR1YNDeupe94JCjzzSA0rdEgfq2rc/plain/demo.png"
+            ),
+        )
+
+    def test_url_no_key_or_salt(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+        template = imgproxy.template(["size:640:480"])
+
+        self.assertEqual(
+            template("demo.png"),
+            "https://example.org/thumbnail/size:640:480/plain/demo.png",
+        )
+
+    def test_url_no_options_no_key_or_salt(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+        template = imgproxy.template()
+
+        self.assertEqual(template("demo.png"), "https://example.org/thumbnail/plain/demo.png")
+
+    def test_urls(self):
+        template = self.imgproxy.template(["size:640:480"])
+        source_urls = ["demo.png", "demo.png?hello=world", "another_image.png"]
+
+        urls = template.urls(iter(source_urls))
+
+        self.assertEqual(list(urls), [template(source_url) for source_url in source_urls])
+
+    def test_urls_no_key_or_salt(self):
+        imgproxy = ImgProxy(url="https://example.org/thumbnail")
+        template = imgproxy.template(["size:640:480"])
+
+        urls = template.urls(["demo.png", "another_image.png"])
+
+        self.assertEqual(
+            list(urls),
+            [
+                "https://example.org/thumbnail/size:640:480/plain/demo.png",
+                "https://example.org/thumbnail/size:640:480/plain/another_image.png",
+            ],
+        )